@@ -13,10 +13,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
 import time
 
 from tempest import clients
+from tempest.common import teardown
 from tempest.common.utils import data_utils
+from tempest.common import waiters
 from tempest import config
 from tempest import exceptions
 from tempest.openstack.common import log as logging
@@ -77,29 +80,38 @@ class BaseComputeTest(tempest.test.BaseTestCase):
 
     @classmethod
     def clear_servers(cls):
+        cleaner = teardown.ResourceCleaner()
         for server in cls.servers:
-            try:
-                cls.servers_client.delete_server(server['id'])
-            except Exception:
-                pass
+            cleaner.add(server['id'],
+                        teardown.client_call(cls.servers_client,
+                                             'delete_server', server['id']),
+                        kind='server')
+        cleaner.run()
 
-        for server in cls.servers:
-            try:
-                cls.servers_client.wait_for_server_termination(server['id'])
-            except Exception:
-                pass
+        # Wait for all the deletions with a single server list per interval
+        try:
+            waiters.wait_for_servers_status(
+                cls.servers_client, [server['id'] for server in cls.servers],
+                'DELETED', raise_on_error=False)
+        except Exception:
+            pass
+
+    @classmethod
+    def _delete_image(cls, image_id):
+        try:
+            teardown.thread_client(cls.images_client).delete_image(image_id)
+        except exceptions.NotFound:
+            # The image may have already been deleted which is OK.
+            pass
 
     @classmethod
     def clear_images(cls):
+        cleaner = teardown.ResourceCleaner()
         for image_id in cls.images:
-            try:
-                cls.images_client.delete_image(image_id)
-            except exceptions.NotFound:
-                # The image may have already been deleted which is OK.
-                pass
-            except Exception:
-                LOG.exception('Exception raised deleting image %s' % image_id)
-                pass
+            cleaner.add('image %s' % image_id,
+                        functools.partial(cls._delete_image, image_id),
+                        kind='image')
+        cleaner.run()
 
     @classmethod
     def tearDownClass(cls):
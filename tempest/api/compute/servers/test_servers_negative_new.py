@@ -13,23 +13,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import testscenarios
-
 from tempest.api.compute import base
 from tempest import test
 
 
-load_tests = testscenarios.load_tests_apply_scenarios
-
-
 class GetConsoleOutputNegativeTestJSON(base.BaseV2ComputeTest,
                                        test.NegativeAutoTest):
     _interface = 'json'
     _service = 'compute'
     _schema_file = 'compute/servers/get_console_output.json'
 
-    scenarios = test.NegativeAutoTest.generate_scenario(_schema_file)
-
     @classmethod
     def setUpClass(cls):
         super(GetConsoleOutputNegativeTestJSON, cls).setUpClass()
@@ -38,4 +31,5 @@ class GetConsoleOutputNegativeTestJSON(base.BaseV2ComputeTest,
 
     @test.attr(type=['negative', 'gate'])
     def test_get_console_output(self):
-        self.execute(self._schema_file)
+        # All the variants run in this test, see execute_batch
+        self.execute_batch(self._schema_file)
@@ -26,6 +26,9 @@ class BaseIdentityAdminTest(tempest.test.BaseTestCase):
         super(BaseIdentityAdminTest, cls).setUpClass()
         os = clients.AdminManager(interface=cls._interface)
         cls.client = os.identity_client
+        # NOTE: the negative tests revoke the token of this client, which
+        # must not be shared with the other admin clients of the process
+        cls.client.auth_provider.disable_token_cache()
         cls.token_client = os.token_client
         cls.endpoints_client = os.endpoints_client
         cls.v3_client = os.identity_v3_client
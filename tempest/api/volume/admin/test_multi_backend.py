@@ -12,6 +12,7 @@
 
 from tempest.api.volume import base
 from tempest.common.utils import data_utils
+from tempest.common import waiters
 from tempest import config
 from tempest.openstack.common import log as logging
 from tempest.services.volume.json.admin import volume_types_client
@@ -64,8 +65,6 @@ class VolumeMultiBackendTest(base.BaseVolumeV1AdminTest):
             resp, cls.volume1 = cls.volume_client.create_volume(
                 size=1, display_name=vol1_name, volume_type=type1_name)
             cls.volume_id_list.append(cls.volume1['id'])
-            cls.volume_client.wait_for_volume_status(cls.volume1['id'],
-                                                     'available')
 
             if cls.backend1_name != cls.backend2_name:
                 # Volume/Type creation (uses backend2_name)
@@ -79,8 +78,10 @@ class VolumeMultiBackendTest(base.BaseVolumeV1AdminTest):
                 resp, cls.volume2 = cls.volume_client.create_volume(
                     size=1, display_name=vol2_name, volume_type=type2_name)
                 cls.volume_id_list.append(cls.volume2['id'])
-                cls.volume_client.wait_for_volume_status(cls.volume2['id'],
-                                                         'available')
+
+            # The volumes of both backends are built at the same time
+            waiters.wait_for_volumes_status(cls.volume_client,
+                                            cls.volume_id_list, 'available')
         except Exception as e:
             LOG.exception("setup failed: %s" % e)
             cls.tearDownClass()
@@ -15,10 +15,18 @@
 
 import copy
 import exceptions
+import hashlib
+import json
+import logging as orig_logging
+import os
 import re
+import tempfile
+import threading
 import urlparse
 
 from datetime import datetime
+from datetime import timedelta
+from tempest.common import http
 from tempest import config
 from tempest.services.identity.json import identity_client as json_id
 from tempest.services.identity.v3.json import identity_client as json_v3id
@@ -31,11 +39,133 @@ CONF = config.CONF
 LOG = logging.getLogger(__name__)
 
 
+class TokenCache(object):
+    """
+    Process wide cache of authentication data, shared by all the auth
+    providers with the same credentials.
+
+    Entries are dropped expiry_margin seconds before the token expires.
+    When cache_dir is set, entries stored as persistent are also written
+    there, so that other processes (e.g. parallel test workers) can reuse
+    them.
+    """
+
+    DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+    def __init__(self, expiry_margin=60, cache_dir=None):
+        self.expiry_margin = timedelta(seconds=expiry_margin)
+        self.cache_dir = cache_dir
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        if self.cache_dir is None:
+            return None
+        name = hashlib.sha1(repr(key)).hexdigest()
+        return os.path.join(self.cache_dir, 'token-%s.json' % name)
+
+    def _is_valid(self, expiry):
+        return expiry - self.expiry_margin > datetime.now()
+
+    def _read(self, key):
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            expiry = datetime.strptime(entry['expires'], self.DATE_FORMAT)
+            return expiry, tuple(entry['auth_data'])
+        except (IOError, ValueError, KeyError):
+            return None
+
+    def _write(self, key, auth_data, expiry):
+        path = self._path(key)
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'expires': expiry.strftime(self.DATE_FORMAT),
+                           'auth_data': auth_data}, f)
+            os.rename(tmp_path, path)
+        except (IOError, OSError):
+            LOG.warning("Unable to write token cache file %s", path)
+
+    def get(self, key):
+        """
+        Returns the cached auth data for key, or None if there is no valid
+        entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            expiry, auth_data, persistent = entry
+            # NOTE: a persistent entry removed from disk has been
+            # invalidated by another process
+            if persistent and not os.path.exists(self._path(key)):
+                entry = None
+            elif not self._is_valid(expiry):
+                entry = None
+        if entry is None and self.cache_dir is not None:
+            disk_entry = self._read(key)
+            if disk_entry is not None and self._is_valid(disk_entry[0]):
+                entry = disk_entry + (True,)
+        with self._lock:
+            if entry is None:
+                self._entries.pop(key, None)
+                return None
+            self._entries[key] = entry
+        return entry[1]
+
+    def put(self, key, auth_data, expiry, persistent=False):
+        """
+        Stores auth_data for key. Persistent entries are also written to
+        cache_dir, if configured.
+        """
+        persistent = persistent and self.cache_dir is not None
+        with self._lock:
+            self._entries[key] = (expiry, auth_data, persistent)
+        if persistent:
+            self._write(key, auth_data, expiry)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.cache_dir is not None:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+
+_token_cache = None
+
+
+def get_token_cache():
+    """
+    Returns the process wide TokenCache, or None if token caching is
+    disabled.
+    """
+    global _token_cache
+    if not CONF.identity.token_cache:
+        return None
+    if _token_cache is None:
+        _token_cache = TokenCache(
+            expiry_margin=CONF.identity.token_cache_expiry_margin,
+            cache_dir=CONF.identity.token_cache_dir)
+    return _token_cache
+
+
 class AuthProvider(object):
     """
     Provide authentication
     """
 
+    # Filters selecting a base URL out of the catalog
+    URL_FILTERS = ('service', 'region', 'endpoint_type', 'api_version',
+                   'skip_path')
+    # Catalogs of the current and alternate tokens
+    MAX_CACHED_CATALOGS = 4
+
     def __init__(self, credentials, client_type='tempest',
                  interface=None):
         """
@@ -55,6 +185,8 @@ class AuthProvider(object):
         self.cache = None
         self.alt_auth_data = None
         self.alt_part = None
+        self._connection_pool = None
+        self._base_urls = {}
 
     def __str__(self):
         return "Creds :{creds}, client type: {client_type}, interface: " \
@@ -80,6 +212,20 @@ class AuthProvider(object):
         """
         return isinstance(credentials, dict)
 
+    @property
+    def connection_pool(self):
+        """
+        Keep-alive connection pool shared by all the clients using
+        this auth provider.
+        """
+        if self._connection_pool is None:
+            self._connection_pool = http.ConnectionPool(
+                max_size=CONF.identity.http_pool_size,
+                idle_timeout=CONF.identity.http_pool_idle_timeout,
+                disable_ssl_certificate_validation=(
+                    CONF.identity.disable_ssl_certificate_validation))
+        return self._connection_pool
+
     @property
     def auth_data(self):
         if self.cache is None or self.is_expired(self.cache):
@@ -110,9 +256,8 @@ class AuthProvider(object):
         :param filters: select a base URL out of the catalog
         :returns a Tuple (url, headers, body)
         """
-        LOG.debug("Auth request m:{m}, u:{u}, h:{h}, b:{b}, f:{f}".format(
-            m=method, u=url, h=headers, b=body, f=filters
-        ))
+        LOG.debug("Auth request m:%s, u:%s, h:%s, b:%s, f:%s",
+                  method, url, headers, body, filters)
         orig_req = dict(url=url, headers=headers, body=body)
 
         auth_url, auth_headers, auth_body = self._decorate_request(
@@ -142,12 +287,14 @@ class AuthProvider(object):
         return auth_req['url'], auth_req['headers'], auth_req['body']
 
     def _log_auth_request(self, auth_req, tag):
+        # Nothing is built for a message which would not be logged
+        if not LOG.isEnabledFor(orig_logging.DEBUG):
+            return
         url = auth_req.get('url', None)
-        headers = copy.deepcopy(auth_req.get('headers', None))
+        headers = auth_req.get('headers', None)
         body = auth_req.get('body', None)
-        if headers is not None:
-            if 'X-Auth-Token' in headers.keys():
-                headers['X-Auth-Token'] = '<Token Omitted>'
+        if headers is not None and 'X-Auth-Token' in headers:
+            headers = dict(headers, **{'X-Auth-Token': '<Token Omitted>'})
         LOG.debug("[{tag}]: u: {url}, h: {headers}, b: {body}".format(
             tag=tag, url=url, headers=headers, body=body
         ))
@@ -175,6 +322,29 @@ class AuthProvider(object):
     def base_url(self, filters, auth_data=None):
         """
         Extracts the base_url based on provided filters
+
+        The catalog is only looked up once per token and set of filters,
+        the resulting base URLs are indexed by token.
+        """
+        if auth_data is None:
+            auth_data = self.auth_data
+        token = auth_data[0]
+        key = tuple(filters.get(name) for name in self.URL_FILTERS)
+        base_urls = self._base_urls.get(token)
+        if base_urls is None:
+            if len(self._base_urls) >= self.MAX_CACHED_CATALOGS:
+                # Tokens expired or were revoked, forget their catalogs
+                self._base_urls.clear()
+            base_urls = self._base_urls[token] = {}
+        try:
+            return base_urls[key]
+        except KeyError:
+            base_urls[key] = self._base_url(filters, auth_data)
+            return base_urls[key]
+
+    def _base_url(self, filters, auth_data):
+        """
+        Looks the base_url matching filters up in the catalog of auth_data
         """
         raise NotImplemented
 
@@ -185,6 +355,49 @@ class KeystoneAuthProvider(AuthProvider):
         super(KeystoneAuthProvider, self).__init__(credentials, client_type,
                                                    interface)
         self.auth_client = self._auth_client()
+        self.token_cache = get_token_cache()
+
+    @property
+    def auth_data(self):
+        if self.token_cache is None:
+            return super(KeystoneAuthProvider, self).auth_data
+        # NOTE: always go through the shared cache, so that auth data
+        # cleared by any provider is refreshed by all of them
+        self.cache = self._get_auth()
+        return self.cache
+
+    @auth_data.deleter
+    def auth_data(self):
+        self.clear_auth()
+
+    def clear_auth(self):
+        super(KeystoneAuthProvider, self).clear_auth()
+        if self.token_cache is not None:
+            self.token_cache.invalidate(self.token_cache_key)
+
+    def disable_token_cache(self):
+        """
+        Stops sharing tokens with the other providers of the process.
+        Used by the providers whose tokens get revoked by the tests, the
+        shared entry is left alone since the others still rely on it.
+        """
+        self.token_cache = None
+        self.cache = None
+
+    @property
+    def token_cache_key(self):
+        password = self.credentials.get('password') or ''
+        return (self.__class__.__name__, self.interface,
+                self.auth_client.auth_url,
+                self.credentials.get('username'),
+                hashlib.sha1(password).hexdigest(),
+                self.credentials.get('tenant_name'),
+                self.credentials.get('domain_name'))
+
+    def _is_static_user(self):
+        return self.credentials.get('username') in (
+            CONF.identity.username, CONF.identity.alt_username,
+            CONF.identity.admin_username, CONF.compute_admin.username)
 
     def _decorate_request(self, filters, method, url, headers=None, body=None,
                           auth_data=None):
@@ -215,6 +428,17 @@ class KeystoneAuthProvider(AuthProvider):
 
     def _get_auth(self):
         # Bypasses the cache
+        if self.token_cache is None:
+            return self._request_auth()
+        key = self.token_cache_key
+        auth_data = self.token_cache.get(key)
+        if auth_data is None:
+            auth_data = self._request_auth()
+            self.token_cache.put(key, auth_data, self.get_expiry(auth_data),
+                                 persistent=self._is_static_user())
+        return auth_data
+
+    def _request_auth(self):
         if self.client_type == 'tempest':
             auth_func = getattr(self.auth_client, 'get_token')
             auth_params = self._auth_params()
@@ -225,6 +449,15 @@ class KeystoneAuthProvider(AuthProvider):
         else:
             raise NotImplemented
 
+    def get_expiry(self, auth_data):
+        """
+        Returns the expiry date of the token as a naive datetime
+        """
+        raise NotImplemented
+
+    def is_expired(self, auth_data):
+        return self.get_expiry(auth_data) <= datetime.now()
+
     def get_token(self):
         return self.auth_data[0]
 
@@ -262,7 +495,7 @@ class KeystoneV2AuthProvider(KeystoneAuthProvider):
         else:
             raise NotImplemented
 
-    def base_url(self, filters, auth_data=None):
+    def _base_url(self, filters, auth_data):
         """
         Filters can be:
         - service: compute, image, etc
@@ -271,8 +504,6 @@ class KeystoneV2AuthProvider(KeystoneAuthProvider):
         - api_version: replace catalog version with this
         - skip_path: take just the base URL
         """
-        if auth_data is None:
-            auth_data = self.auth_data
         token, _auth_data = auth_data
         service = filters.get('service')
         region = filters.get('region')
@@ -306,11 +537,10 @@ class KeystoneV2AuthProvider(KeystoneAuthProvider):
 
         return _base_url
 
-    def is_expired(self, auth_data):
+    def get_expiry(self, auth_data):
         _, access = auth_data
-        expiry = datetime.strptime(access['token']['expires'],
-                                   self.EXPIRY_DATE_FORMAT)
-        return expiry <= datetime.now()
+        return datetime.strptime(access['token']['expires'],
+                                 self.EXPIRY_DATE_FORMAT)
 
 
 class KeystoneV3AuthProvider(KeystoneAuthProvider):
@@ -347,7 +577,7 @@ class KeystoneV3AuthProvider(KeystoneAuthProvider):
         else:
             raise NotImplemented
 
-    def base_url(self, filters, auth_data=None):
+    def _base_url(self, filters, auth_data):
         """
         Filters can be:
         - service: compute, image, etc
@@ -356,8 +586,6 @@ class KeystoneV3AuthProvider(KeystoneAuthProvider):
         - api_version: replace catalog version with this
         - skip_path: take just the base URL
         """
-        if auth_data is None:
-            auth_data = self.auth_data
         token, _auth_data = auth_data
         service = filters.get('service')
         region = filters.get('region')
@@ -406,8 +634,7 @@ class KeystoneV3AuthProvider(KeystoneAuthProvider):
 
         return _base_url
 
-    def is_expired(self, auth_data):
+    def get_expiry(self, auth_data):
         _, access = auth_data
-        expiry = datetime.strptime(access['expires_at'],
-                                   self.EXPIRY_DATE_FORMAT)
-        return expiry <= datetime.now()
+        return datetime.strptime(access['expires_at'],
+                                 self.EXPIRY_DATE_FORMAT)
@@ -13,6 +13,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
+import sys
+import threading
+
+import six
+
 from tempest import auth
 from tempest.common.rest_client import NegativeRestClient
 from tempest import config
@@ -168,11 +174,138 @@ from tempest.services.volume.xml.volumes_client import VolumesClientXML
 CONF = config.CONF
 LOG = logging.getLogger(__name__)
 
+# Client classes by Manager attribute name, for each interface. They are
+# only created on first access, with the auth provider of the Manager.
+XML_CLIENTS = {
+    'certificates_client': CertificatesClientXML,
+    'servers_client': ServersClientXML,
+    'limits_client': LimitsClientXML,
+    'images_client': ImagesClientXML,
+    'keypairs_client': KeyPairsClientXML,
+    'quotas_client': QuotasClientXML,
+    'flavors_client': FlavorsClientXML,
+    'extensions_client': ExtensionsClientXML,
+    'volumes_extensions_client': VolumesExtensionsClientXML,
+    'floating_ips_client': FloatingIPsClientXML,
+    'snapshots_client': SnapshotsClientXML,
+    'volumes_client': VolumesClientXML,
+    'volume_types_client': VolumeTypesClientXML,
+    'identity_client': IdentityClientXML,
+    'identity_v3_client': IdentityV3ClientXML,
+    'security_groups_client': SecurityGroupsClientXML,
+    'interfaces_client': InterfacesClientXML,
+    'endpoints_client': EndPointClientXML,
+    'fixed_ips_client': FixedIPsClientXML,
+    'availability_zone_client': AvailabilityZoneClientXML,
+    'service_client': ServiceClientXML,
+    'aggregates_client': AggregatesClientXML,
+    'services_client': ServicesClientXML,
+    'tenant_usages_client': TenantUsagesClientXML,
+    'policy_client': PolicyClientXML,
+    'hosts_client': HostsClientXML,
+    'hypervisor_client': HypervisorClientXML,
+    'network_client': NetworkClientXML,
+    'credentials_client': CredentialsClientXML,
+    'instance_usages_audit_log_client': InstanceUsagesAuditLogClientXML,
+    'volume_hosts_client': VolumeHostsClientXML,
+    'volumes_extension_client': VolumeExtensionClientXML,
+    'telemetry_client': TelemetryClientXML,
+}
+
+JSON_CLIENTS = {
+    'certificates_client': CertificatesClientJSON,
+    'certificates_v3_client': CertificatesV3ClientJSON,
+    'baremetal_client': BaremetalClientJSON,
+    'servers_client': ServersClientJSON,
+    'servers_v3_client': ServersV3ClientJSON,
+    'limits_client': LimitsClientJSON,
+    'images_client': ImagesClientJSON,
+    'keypairs_client': KeyPairsClientJSON,
+    'keypairs_v3_client': KeyPairsV3ClientJSON,
+    'quotas_client': QuotasClientJSON,
+    'quotas_v3_client': QuotasV3ClientJSON,
+    'flavors_client': FlavorsClientJSON,
+    'flavors_v3_client': FlavorsV3ClientJSON,
+    'extensions_v3_client': ExtensionsV3ClientJSON,
+    'extensions_client': ExtensionsClientJSON,
+    'volumes_extensions_client': VolumesExtensionsClientJSON,
+    'floating_ips_client': FloatingIPsClientJSON,
+    'snapshots_client': SnapshotsClientJSON,
+    'volumes_client': VolumesClientJSON,
+    'volume_types_client': VolumeTypesClientJSON,
+    'identity_client': IdentityClientJSON,
+    'identity_v3_client': IdentityV3ClientJSON,
+    'security_groups_client': SecurityGroupsClientJSON,
+    'interfaces_v3_client': InterfacesV3ClientJSON,
+    'interfaces_client': InterfacesClientJSON,
+    'endpoints_client': EndPointClientJSON,
+    'fixed_ips_client': FixedIPsClientJSON,
+    'availability_zone_v3_client': AvailabilityZoneV3ClientJSON,
+    'availability_zone_client': AvailabilityZoneClientJSON,
+    'services_v3_client': ServicesV3ClientJSON,
+    'service_client': ServiceClientJSON,
+    'aggregates_v3_client': AggregatesV3ClientJSON,
+    'aggregates_client': AggregatesClientJSON,
+    'services_client': ServicesClientJSON,
+    'tenant_usages_v3_client': TenantUsagesV3ClientJSON,
+    'tenant_usages_client': TenantUsagesClientJSON,
+    'version_v3_client': VersionV3ClientJSON,
+    'policy_client': PolicyClientJSON,
+    'hosts_client': HostsClientJSON,
+    'hypervisor_v3_client': HypervisorV3ClientJSON,
+    'hypervisor_client': HypervisorClientJSON,
+    'network_client': NetworkClientJSON,
+    'credentials_client': CredentialsClientJSON,
+    'instance_usages_audit_log_client': InstanceUsagesAuditLogClientJSON,
+    'instance_usages_audit_log_v3_client':
+        InstanceUsagesAuditLogV3ClientJSON,
+    'volume_hosts_client': VolumeHostsClientJSON,
+    'volumes_extension_client': VolumeExtensionClientJSON,
+    'hosts_v3_client': HostsV3ClientJSON,
+    'telemetry_client': TelemetryClientJSON,
+    'negative_client': NegativeRestClient,
+}
+
+COMMON_CLIENTS = {
+    'account_client': AccountClient,
+    'image_client': ImageClientJSON,
+    'image_client_v2': ImageClientV2JSON,
+    'container_client': ContainerClient,
+    'object_client': ObjectClient,
+    'orchestration_client': OrchestrationClient,
+    'custom_object_client': ObjectClientCustomizedHeader,
+    'custom_account_client': AccountClientCustomizedHeader,
+    'data_processing_client': DataProcessingClient,
+}
+
+# Token clients do not use an auth provider
+TOKEN_CLIENTS = {
+    'xml': {'token_client': TokenClientXML,
+            'token_v3_client': V3TokenClientXML},
+    'json': {'token_client': TokenClientJSON,
+             'token_v3_client': V3TokenClientJSON},
+}
+
+# TODO(andreaf) EC2 client still do their auth, v2 only
+EC2_CLIENTS = {
+    'ec2api_client': botoclients.APIClientEC2,
+    's3_client': botoclients.ObjectClientS3,
+}
+
+# Clients only available when their service is, by service_available option
+SERVICE_CLIENTS = {
+    'telemetry_client': 'ceilometer',
+    'image_client': 'glance',
+    'image_client_v2': 'glance',
+}
+
 
 class Manager(object):
 
     """
     Top level manager for OpenStack Compute clients
+
+    The clients are created on first access to their attribute and cached.
     """
 
     def __init__(self, username=None, password=None, tenant_name=None,
@@ -186,7 +319,10 @@ class Manager(object):
         :param password: Override of the password
         :param tenant_name: Override of the tenant name
         """
+        # Creates the clients once when threads share the manager
+        self._lock = threading.RLock()
         self.interface = interface
+        self.service = service
         self.auth_version = CONF.identity.auth_version
         # FIXME(andreaf) Change Manager __init__ to accept a credentials dict
         if username is None or password is None:
@@ -198,171 +334,56 @@ class Manager(object):
         if self.auth_version == 'v3':
             self.credentials['domain_name'] = 'Default'
         # Setup an auth provider
-        auth_provider = self.get_auth_provider(self.credentials)
+        self.auth_provider = self.get_auth_provider(self.credentials)
 
         if self.interface == 'xml':
-            self.certificates_client = CertificatesClientXML(
-                auth_provider)
-            self.servers_client = ServersClientXML(auth_provider)
-            self.limits_client = LimitsClientXML(auth_provider)
-            self.images_client = ImagesClientXML(auth_provider)
-            self.keypairs_client = KeyPairsClientXML(auth_provider)
-            self.quotas_client = QuotasClientXML(auth_provider)
-            self.flavors_client = FlavorsClientXML(auth_provider)
-            self.extensions_client = ExtensionsClientXML(auth_provider)
-            self.volumes_extensions_client = VolumesExtensionsClientXML(
-                auth_provider)
-            self.floating_ips_client = FloatingIPsClientXML(
-                auth_provider)
-            self.snapshots_client = SnapshotsClientXML(auth_provider)
-            self.volumes_client = VolumesClientXML(auth_provider)
-            self.volume_types_client = VolumeTypesClientXML(
-                auth_provider)
-            self.identity_client = IdentityClientXML(auth_provider)
-            self.identity_v3_client = IdentityV3ClientXML(
-                auth_provider)
-            self.security_groups_client = SecurityGroupsClientXML(
-                auth_provider)
-            self.interfaces_client = InterfacesClientXML(auth_provider)
-            self.endpoints_client = EndPointClientXML(auth_provider)
-            self.fixed_ips_client = FixedIPsClientXML(auth_provider)
-            self.availability_zone_client = AvailabilityZoneClientXML(
-                auth_provider)
-            self.service_client = ServiceClientXML(auth_provider)
-            self.aggregates_client = AggregatesClientXML(auth_provider)
-            self.services_client = ServicesClientXML(auth_provider)
-            self.tenant_usages_client = TenantUsagesClientXML(
-                auth_provider)
-            self.policy_client = PolicyClientXML(auth_provider)
-            self.hosts_client = HostsClientXML(auth_provider)
-            self.hypervisor_client = HypervisorClientXML(auth_provider)
-            self.network_client = NetworkClientXML(auth_provider)
-            self.credentials_client = CredentialsClientXML(
-                auth_provider)
-            self.instance_usages_audit_log_client = \
-                InstanceUsagesAuditLogClientXML(auth_provider)
-            self.volume_hosts_client = VolumeHostsClientXML(
-                auth_provider)
-            self.volumes_extension_client = VolumeExtensionClientXML(
-                auth_provider)
-            if CONF.service_available.ceilometer:
-                self.telemetry_client = TelemetryClientXML(
-                    auth_provider)
-            self.token_client = TokenClientXML()
-            self.token_v3_client = V3TokenClientXML()
-
+            self.client_classes = dict(XML_CLIENTS)
         elif self.interface == 'json':
-            self.certificates_client = CertificatesClientJSON(
-                auth_provider)
-            self.certificates_v3_client = CertificatesV3ClientJSON(
-                auth_provider)
-            self.baremetal_client = BaremetalClientJSON(auth_provider)
-            self.servers_client = ServersClientJSON(auth_provider)
-            self.servers_v3_client = ServersV3ClientJSON(auth_provider)
-            self.limits_client = LimitsClientJSON(auth_provider)
-            self.images_client = ImagesClientJSON(auth_provider)
-            self.keypairs_v3_client = KeyPairsV3ClientJSON(
-                auth_provider)
-            self.keypairs_client = KeyPairsClientJSON(auth_provider)
-            self.keypairs_v3_client = KeyPairsV3ClientJSON(
-                auth_provider)
-            self.quotas_client = QuotasClientJSON(auth_provider)
-            self.quotas_v3_client = QuotasV3ClientJSON(auth_provider)
-            self.flavors_client = FlavorsClientJSON(auth_provider)
-            self.flavors_v3_client = FlavorsV3ClientJSON(auth_provider)
-            self.extensions_v3_client = ExtensionsV3ClientJSON(
-                auth_provider)
-            self.extensions_client = ExtensionsClientJSON(
-                auth_provider)
-            self.volumes_extensions_client = VolumesExtensionsClientJSON(
-                auth_provider)
-            self.floating_ips_client = FloatingIPsClientJSON(
-                auth_provider)
-            self.snapshots_client = SnapshotsClientJSON(auth_provider)
-            self.volumes_client = VolumesClientJSON(auth_provider)
-            self.volume_types_client = VolumeTypesClientJSON(
-                auth_provider)
-            self.identity_client = IdentityClientJSON(auth_provider)
-            self.identity_v3_client = IdentityV3ClientJSON(
-                auth_provider)
-            self.security_groups_client = SecurityGroupsClientJSON(
-                auth_provider)
-            self.interfaces_v3_client = InterfacesV3ClientJSON(
-                auth_provider)
-            self.interfaces_client = InterfacesClientJSON(
-                auth_provider)
-            self.endpoints_client = EndPointClientJSON(auth_provider)
-            self.fixed_ips_client = FixedIPsClientJSON(auth_provider)
-            self.availability_zone_v3_client = AvailabilityZoneV3ClientJSON(
-                auth_provider)
-            self.availability_zone_client = AvailabilityZoneClientJSON(
-                auth_provider)
-            self.services_v3_client = ServicesV3ClientJSON(
-                auth_provider)
-            self.service_client = ServiceClientJSON(auth_provider)
-            self.aggregates_v3_client = AggregatesV3ClientJSON(
-                auth_provider)
-            self.aggregates_client = AggregatesClientJSON(
-                auth_provider)
-            self.services_client = ServicesClientJSON(auth_provider)
-            self.tenant_usages_v3_client = TenantUsagesV3ClientJSON(
-                auth_provider)
-            self.tenant_usages_client = TenantUsagesClientJSON(
-                auth_provider)
-            self.version_v3_client = VersionV3ClientJSON(auth_provider)
-            self.policy_client = PolicyClientJSON(auth_provider)
-            self.hosts_client = HostsClientJSON(auth_provider)
-            self.hypervisor_v3_client = HypervisorV3ClientJSON(
-                auth_provider)
-            self.hypervisor_client = HypervisorClientJSON(
-                auth_provider)
-            self.network_client = NetworkClientJSON(auth_provider)
-            self.credentials_client = CredentialsClientJSON(
-                auth_provider)
-            self.instance_usages_audit_log_client = \
-                InstanceUsagesAuditLogClientJSON(auth_provider)
-            self.instance_usages_audit_log_v3_client = \
-                InstanceUsagesAuditLogV3ClientJSON(auth_provider)
-            self.volume_hosts_client = VolumeHostsClientJSON(
-                auth_provider)
-            self.volumes_extension_client = VolumeExtensionClientJSON(
-                auth_provider)
-            self.hosts_v3_client = HostsV3ClientJSON(auth_provider)
-            if CONF.service_available.ceilometer:
-                self.telemetry_client = TelemetryClientJSON(
-                    auth_provider)
-            self.token_client = TokenClientJSON()
-            self.token_v3_client = V3TokenClientJSON()
-            self.negative_client = NegativeRestClient(auth_provider)
-            self.negative_client.service = service
-
+            self.client_classes = dict(JSON_CLIENTS)
         else:
             msg = "Unsupported interface type `%s'" % interface
             raise exceptions.InvalidConfiguration(msg)
+        self.client_classes.update(COMMON_CLIENTS)
+
+    def __getattr__(self, name):
+        # Only called when the client was not created yet
+        if name.startswith('__') or 'client_classes' not in self.__dict__:
+            raise AttributeError(name)
+        with self._lock:
+            # Another thread may have created it meanwhile
+            if name not in self.__dict__:
+                setattr(self, name, self._create_client(name))
+        return self.__dict__[name]
 
-        # TODO(andreaf) EC2 client still do their auth, v2 only
-        ec2_client_args = (self.credentials.get('username'),
-                           self.credentials.get('password'),
-                           CONF.identity.uri,
-                           self.credentials.get('tenant_name'))
-
-        # common clients
-        self.account_client = AccountClient(auth_provider)
-        if CONF.service_available.glance:
-            self.image_client = ImageClientJSON(auth_provider)
-            self.image_client_v2 = ImageClientV2JSON(auth_provider)
-        self.container_client = ContainerClient(auth_provider)
-        self.object_client = ObjectClient(auth_provider)
-        self.orchestration_client = OrchestrationClient(
-            auth_provider)
-        self.ec2api_client = botoclients.APIClientEC2(*ec2_client_args)
-        self.s3_client = botoclients.ObjectClientS3(*ec2_client_args)
-        self.custom_object_client = ObjectClientCustomizedHeader(
-            auth_provider)
-        self.custom_account_client = \
-            AccountClientCustomizedHeader(auth_provider)
-        self.data_processing_client = DataProcessingClient(
-            auth_provider)
+    def _create_client(self, name):
+        service = SERVICE_CLIENTS.get(name)
+        if service and not getattr(CONF.service_available, service):
+            raise AttributeError("%s is not available, %s is disabled" %
+                                 (name, service))
+        if name in self.client_classes:
+            factory = functools.partial(self.client_classes[name],
+                                        self.auth_provider)
+        elif name in TOKEN_CLIENTS[self.interface]:
+            factory = TOKEN_CLIENTS[self.interface][name]
+        elif name in EC2_CLIENTS:
+            factory = functools.partial(EC2_CLIENTS[name],
+                                        self.credentials.get('username'),
+                                        self.credentials.get('password'),
+                                        CONF.identity.uri,
+                                        self.credentials.get('tenant_name'))
+        else:
+            raise AttributeError("'%s' object has no attribute '%s'" %
+                                 (self.__class__.__name__, name))
+        try:
+            client = factory()
+        except AttributeError as e:
+            # getattr and hasattr would take it for a missing client
+            six.reraise(exceptions.ClientCreationError,
+                        exceptions.ClientCreationError(name=name, reason=e),
+                        sys.exc_info()[2])
+        if name == 'negative_client':
+            client.service = self.service
+        return client
 
     @classmethod
     def get_auth_provider_class(cls, auth_version):
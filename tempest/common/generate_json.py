@@ -13,7 +13,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import copy
 import jsonschema
 
 from tempest.openstack.common import log as logging
@@ -25,7 +24,7 @@ def generate_valid(schema):
     """
     Create a valid dictionary based on the types in a json schema.
     """
-    LOG.debug("generate_valid: %s" % schema)
+    LOG.debug("generate_valid: %s", schema)
     schema_type = schema["type"]
     if isinstance(schema_type, list):
         # Just choose the first one since all are valid.
@@ -73,8 +72,11 @@ def generate_invalid(schema):
       result[0]: Name of the test
       result[1]: json schema for the test
       result[2]: expected result of the test (can be None)
+
+    The invalid objects share the values they do not change with each
+    other, they must not be modified.
     """
-    LOG.debug("generate_invalid: %s" % schema)
+    LOG.debug("generate_invalid: %s", schema)
     schema_type = schema["type"]
     if isinstance(schema_type, list):
         if "integer" in schema_type:
@@ -92,7 +94,7 @@ def generate_invalid(schema):
             else:
                 raise Exception("generator (%s) returns invalid result"
                                 % generator)
-    LOG.debug("result: %s" % result)
+    LOG.debug("result: %s", result)
     return result
 
 
@@ -170,7 +172,8 @@ def gen_obj_remove_attr(schema):
     valid = generate_valid(schema)
     required = schema.get("required", [])
     for r in required:
-        new_valid = copy.deepcopy(valid)
+        # Only the top level changes, the values are shared
+        new_valid = dict(valid)
         del new_valid[r]
         invalids.append(("gen_obj_remove_attr", new_valid, None))
     return invalids
@@ -180,13 +183,13 @@ def gen_obj_remove_attr(schema):
 def gen_obj_add_attr(schema):
     valid = generate_valid(schema)
     if not schema.get("additionalProperties", True):
-        new_valid = copy.deepcopy(valid)
+        new_valid = dict(valid)
         new_valid["$$$$$$$$$$"] = "xxx"
         return new_valid
 
 
 def gen_inv_prop_obj(schema):
-    LOG.debug("generate_invalid_object: %s" % schema)
+    LOG.debug("generate_invalid_object: %s", schema)
     valid = generate_valid(schema)
     invalids = []
     properties = schema["properties"]
@@ -194,12 +197,14 @@ def gen_inv_prop_obj(schema):
     for k, v in properties.iteritems():
         for invalid in generate_invalid(v):
             LOG.debug(v)
-            new_valid = copy.deepcopy(valid)
+            # Only the invalid property changes, the other values are
+            # shared, and so are the unchanged values of a nested object
+            new_valid = dict(valid)
             new_valid[k] = invalid[1]
             name = "prop_%s_%s" % (k, invalid[0])
             invalids.append((name, new_valid, invalid[2]))
 
-    LOG.debug("generate_invalid_object return: %s" % invalids)
+    LOG.debug("generate_invalid_object return: %s", invalids)
     return invalids
 
 
@@ -14,12 +14,259 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import httplib
+import socket
+import threading
+import time
+import urlparse
+
 import httplib2
 
+from tempest.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+# Errors raised when the server has closed a kept-alive connection
+STALE_CONNECTION_ERRORS = (httplib.BadStatusLine,
+                           httplib.CannotSendRequest,
+                           httplib.ResponseNotReady,
+                           socket.error)
+
+# Methods whose requests can be sent again without side effects
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE')
+
+
+class _RequestTiming(threading.local):
+    """Timings of the request in progress in the current thread."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, start=None):
+        self.start = start
+        # Time spent opening connections (DNS, TCP and TLS handshakes),
+        # None if an open connection was used
+        self.connect = None
+        # Time from the start to the end of the response headers
+        self.first_byte = None
+
+
+timing = _RequestTiming()
+
+
+class TimedHTTPConnection(httplib2.HTTPConnectionWithTimeout):
+
+    def connect(self):
+        start = time.time()
+        httplib2.HTTPConnectionWithTimeout.connect(self)
+        timing.connect = (timing.connect or 0) + time.time() - start
+
+    def getresponse(self, *args, **kwargs):
+        response = httplib2.HTTPConnectionWithTimeout.getresponse(
+            self, *args, **kwargs)
+        if timing.start is not None:
+            timing.first_byte = time.time() - timing.start
+        return response
+
+
+class TimedHTTPSConnection(httplib2.HTTPSConnectionWithTimeout):
+
+    def connect(self):
+        start = time.time()
+        httplib2.HTTPSConnectionWithTimeout.connect(self)
+        timing.connect = (timing.connect or 0) + time.time() - start
+
+    def getresponse(self, *args, **kwargs):
+        response = httplib2.HTTPSConnectionWithTimeout.getresponse(
+            self, *args, **kwargs)
+        if timing.start is not None:
+            timing.first_byte = time.time() - timing.start
+        return response
+
+
+TIMED_CONNECTIONS = {'http': TimedHTTPConnection,
+                     'https': TimedHTTPSConnection}
+
+
+def _timed(uri, kwargs):
+    """Makes httplib2 open a connection which records the timing."""
+    if kwargs.get('connection_type') is None:
+        scheme = uri.split(':', 1)[0].lower()
+        kwargs['connection_type'] = TIMED_CONNECTIONS.get(scheme)
+    return kwargs
+
 
 class ClosingHttp(httplib2.Http):
-    def request(self, *args, **kwargs):
+    def request(self, uri, *args, **kwargs):
         original_headers = kwargs.get('headers', {})
         new_headers = dict(original_headers, connection='close')
-        new_kwargs = dict(kwargs, headers=new_headers)
-        return super(ClosingHttp, self).request(*args, **new_kwargs)
+        new_kwargs = _timed(uri, dict(kwargs, headers=new_headers))
+        return super(ClosingHttp, self).request(uri, *args, **new_kwargs)
+
+
+def _no_status_line(error):
+    # httplib raises BadStatusLine also for a malformed status line, which
+    # means that the server started answering. An empty line is stored as
+    # its repr.
+    line = getattr(error, 'line', '')
+    return (line in ('', repr('')) or
+            line.startswith('No status line received'))
+
+
+class SingleAttemptHttp(httplib2.Http):
+    """
+    httplib2.Http which sends every request once. httplib2 retries on its
+    own the requests failing on a closed connection, whatever their method
+    and even once the server started answering, PooledHttp decides instead.
+
+    After a failed request, no_response tells whether it failed before any
+    byte of the response arrived.
+    """
+
+    no_response = False
+
+    def _conn_request(self, conn, request_uri, method, body, headers):
+        self.no_response = True
+        try:
+            if getattr(conn, 'sock', None) is None:
+                conn.connect()
+            conn.request(method, request_uri, body, headers)
+        except socket.gaierror:
+            conn.close()
+            raise httplib2.ServerNotFoundError(
+                "Unable to find the server at %s" % conn.host)
+        except socket.timeout:
+            # The server may be processing the request
+            self.no_response = False
+            conn.close()
+            raise
+        except Exception:
+            conn.close()
+            raise
+        try:
+            response = conn.getresponse()
+        except httplib.BadStatusLine as e:
+            self.no_response = _no_status_line(e)
+            conn.close()
+            raise
+        except Exception:
+            self.no_response = False
+            conn.close()
+            raise
+        self.no_response = False
+        content = ''
+        if method == 'HEAD':
+            conn.close()
+        else:
+            content = response.read()
+        response = httplib2.Response(response)
+        if method != 'HEAD':
+            content = httplib2._decompressContent(response, content)
+        return response, content
+
+
+class ConnectionPool(object):
+    """
+    Thread safe pool of keep-alive HTTP connections, grouped per host.
+
+    Each pooled entry is a SingleAttemptHttp object, which keeps its socket
+    open between requests. At most max_size idle entries are kept per host,
+    entries idle for longer than idle_timeout seconds are closed and
+    evicted.
+    """
+
+    def __init__(self, max_size=10, idle_timeout=30,
+                 disable_ssl_certificate_validation=False):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.dscv = disable_ssl_certificate_validation
+        self._idle = collections.defaultdict(list)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _close(http_obj):
+        for conn in http_obj.connections.values():
+            conn.close()
+        http_obj.connections.clear()
+
+    def _evict_idle(self, now):
+        # NOTE: must be called with the lock held
+        for key, entries in self._idle.items():
+            fresh = []
+            for last_used, http_obj in entries:
+                if now - last_used > self.idle_timeout:
+                    self._close(http_obj)
+                else:
+                    fresh.append((last_used, http_obj))
+            self._idle[key] = fresh
+
+    def get(self, key):
+        """
+        Returns a (http_obj, reused) tuple for the host identified by key.
+        reused is True when the connection comes from the pool.
+        """
+        with self._lock:
+            self._evict_idle(time.time())
+            if self._idle[key]:
+                return self._idle[key].pop()[1], True
+        return SingleAttemptHttp(
+            disable_ssl_certificate_validation=self.dscv), False
+
+    def put(self, key, http_obj):
+        """Gives a connection back to the pool."""
+        with self._lock:
+            if len(self._idle[key]) < self.max_size:
+                self._idle[key].append((time.time(), http_obj))
+                return
+        self._close(http_obj)
+
+    def discard(self, http_obj):
+        """Closes a connection which must not be given back to the pool."""
+        self._close(http_obj)
+
+    def clear(self):
+        """Closes all the idle connections."""
+        with self._lock:
+            for entries in self._idle.values():
+                for _, http_obj in entries:
+                    self._close(http_obj)
+            self._idle.clear()
+
+
+class PooledHttp(object):
+    """
+    Drop-in replacement for ClosingHttp which borrows keep-alive connections
+    from a ConnectionPool. An idempotent request failing on a reused
+    connection before any byte of the response arrived, because the server
+    closed it in the meantime, is retried once on a new one.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def request(self, uri, method='GET', *args, **kwargs):
+        kwargs = _timed(uri, dict(kwargs))
+        parts = urlparse.urlparse(uri)
+        key = '%s:%s' % (parts.scheme, parts.netloc)
+        http_obj, reused = self.pool.get(key)
+        try:
+            resp = http_obj.request(uri, method, *args, **kwargs)
+        except Exception:
+            self.pool.discard(http_obj)
+            if not (reused and http_obj.no_response and
+                    method.upper() in IDEMPOTENT_METHODS):
+                raise
+            LOG.debug("Stale keep-alive connection to %s, retrying", key)
+            http_obj = SingleAttemptHttp(
+                disable_ssl_certificate_validation=self.pool.dscv)
+            try:
+                resp = http_obj.request(uri, method, *args, **kwargs)
+            except Exception:
+                self.pool.discard(http_obj)
+                raise
+        if resp[0].get('connection', '').lower() == 'close':
+            self.pool.discard(http_obj)
+        else:
+            self.pool.put(key, http_obj)
+        return resp
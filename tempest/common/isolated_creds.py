@@ -12,6 +12,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import fcntl
+import json
+import os
+import threading
+
 import netaddr
 
 import keystoneclient.v2_0.client as keystoneclient
@@ -27,6 +32,126 @@ CONF = config.CONF
 LOG = logging.getLogger(__name__)
 
 
+class _PooledResource(dict):
+    """
+    Pooled user, tenant or network resource. Supports both the item access
+    of the tempest clients and the attribute access of the official ones.
+    """
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class CredentialPool(object):
+    """
+    Pool of pre-provisioned isolated credential sets.
+
+    Each set holds primary, alt and admin credentials and their network
+    resources. A test class leases a whole set, holding an external file
+    lock on it until the lease is released, so that every set is used by
+    a single test class at a time across all test workers. The lock is
+    held on a file descriptor, hence it is dropped if the worker dies.
+    """
+
+    POOL_FILE = 'credential-pool.json'
+    CRED_TYPES = ('primary', 'alt', 'admin')
+
+    _leased = set()
+    _leased_lock = threading.Lock()
+
+    def __init__(self, path=None):
+        self.path = path or CONF.identity.credential_pool_path
+        self.pool_file = os.path.join(self.path, self.POOL_FILE)
+
+    def exists(self):
+        return os.path.isfile(self.pool_file)
+
+    def load(self):
+        if not self.exists():
+            return []
+        with open(self.pool_file) as f:
+            return json.load(f)
+
+    def save(self, cred_sets):
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        with open(self.pool_file, 'w') as f:
+            json.dump(cred_sets, f, indent=2)
+
+    def _lock_file(self, index):
+        return os.path.join(self.path, 'credential-pool-%d.lock' % index)
+
+    def lease(self, network_resources=None):
+        """
+        Leases a free credential set created for the same network
+        resources. Returns a (cred_set, lease) tuple, or (None, None) if
+        all the matching sets are in use.
+        """
+        network_resources = network_resources or None
+        for index, cred_set in enumerate(self.load()):
+            if cred_set['network_resources'] != network_resources:
+                continue
+            with self._leased_lock:
+                if index in self._leased:
+                    continue
+                lock_file = open(self._lock_file(index), 'w')
+                try:
+                    fcntl.lockf(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except IOError:
+                    lock_file.close()
+                    continue
+                self._leased.add(index)
+            LOG.info("Leased credential set %d from %s" %
+                     (index, self.pool_file))
+            return cred_set, (index, lock_file)
+        return None, None
+
+    def release(self, lease):
+        index, lock_file = lease
+        with self._leased_lock:
+            try:
+                fcntl.lockf(lock_file, fcntl.LOCK_UN)
+            finally:
+                lock_file.close()
+                self._leased.discard(index)
+        LOG.info("Released credential set %d" % index)
+
+    def provision(self, size, network_resources=None):
+        """
+        Creates size credential sets and adds them to the pool.
+        """
+        network_resources = network_resources or None
+        cred_sets = self.load()
+        for _ in xrange(size):
+            creds = IsolatedCreds('credential-pool',
+                                  network_resources=network_resources)
+            for cred_type in self.CRED_TYPES:
+                getattr(creds, 'get_%s_creds' % cred_type)()
+            cred_sets.append({
+                'network_resources': network_resources,
+                'creds': creds.isolated_creds,
+                'net_resources': creds.isolated_net_resources})
+            # Save as we go, so that a failure does not leak credentials
+            self.save(cred_sets)
+        return cred_sets
+
+    def destroy(self):
+        """
+        Deletes all the pooled credentials and their network resources.
+        """
+        for cred_set in self.load():
+            creds = IsolatedCreds('credential-pool',
+                                  network_resources=(
+                                      cred_set['network_resources']))
+            creds.isolated_creds = cred_set['creds']
+            creds.isolated_net_resources = cred_set['net_resources']
+            creds.clear_isolated_creds()
+        os.remove(self.pool_file)
+
+
 class IsolatedCreds(object):
 
     def __init__(self, name, tempest_client=True, interface='json',
@@ -41,6 +166,8 @@ class IsolatedCreds(object):
         self.password = password
         self.identity_admin_client, self.network_admin_client = (
             self._get_admin_clients())
+        self.pool_lease = None
+        self._pool_checked = False
 
     def _get_official_admin_clients(self):
         username = CONF.identity.admin_username
@@ -314,6 +441,36 @@ class IsolatedCreds(object):
             body = {'subnet_id': subnet_id}
             self.network_admin_client.add_interface_router(router_id, body)
 
+    def _lease_pooled_creds(self):
+        """
+        Takes the credentials from the credential pool, if one is
+        configured. Falls back to creating them when no set is free.
+        """
+        if self._pool_checked:
+            return
+        self._pool_checked = True
+        if not CONF.identity.credential_pool_path:
+            return
+        pool = CredentialPool()
+        cred_set, self.pool_lease = pool.lease(self.network_resources)
+        if cred_set is None:
+            LOG.warning("No free credential set in %s, creating isolated "
+                        "credentials for %s" % (pool.pool_file, self.name))
+            return
+        for cred_type, (user, tenant) in cred_set['creds'].iteritems():
+            self.isolated_creds[cred_type] = (_PooledResource(user),
+                                              _PooledResource(tenant))
+        for cred_type, resources in cred_set['net_resources'].iteritems():
+            self.isolated_net_resources[cred_type] = tuple(
+                _PooledResource(r) if r is not None else None
+                for r in resources)
+
+    def _release_pooled_creds(self):
+        CredentialPool().release(self.pool_lease)
+        self.pool_lease = None
+        self.isolated_creds = {}
+        self.isolated_net_resources = {}
+
     def get_primary_tenant(self):
         return self.isolated_creds.get('primary')[1]
 
@@ -360,6 +517,7 @@ class IsolatedCreds(object):
         return self.isolated_net_resources.get('alt')[2]
 
     def get_primary_creds(self):
+        self._lease_pooled_creds()
         if self.isolated_creds.get('primary'):
             user, tenant = self.isolated_creds['primary']
             username, tenant_name = self._get_cred_names(user, tenant)
@@ -379,6 +537,7 @@ class IsolatedCreds(object):
         return username, tenant_name, self.password
 
     def get_admin_creds(self):
+        self._lease_pooled_creds()
         if self.isolated_creds.get('admin'):
             user, tenant = self.isolated_creds['admin']
             username, tenant_name = self._get_cred_names(user, tenant)
@@ -398,6 +557,7 @@ class IsolatedCreds(object):
         return username, tenant_name, self.password
 
     def get_alt_creds(self):
+        self._lease_pooled_creds()
         if self.isolated_creds.get('alt'):
             user, tenant = self.isolated_creds['alt']
             username, tenant_name = self._get_cred_names(user, tenant)
@@ -501,6 +661,10 @@ class IsolatedCreds(object):
                 self._clear_isolated_network(network['id'], network['name'])
 
     def clear_isolated_creds(self):
+        if self.pool_lease is not None:
+            # Pooled credentials are reused, give them back to the pool
+            self._release_pooled_creds()
+            return
         if not self.isolated_creds:
             return
         self._clear_isolated_net_resources()
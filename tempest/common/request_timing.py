@@ -0,0 +1,260 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Timing of the REST requests.
+
+RestClient sends a RequestEvent to the listeners added with add_listener
+after each request. EndpointStatistics is a listener aggregating them per
+API endpoint, it is installed by install_report when the request_timing
+option of the debug group is set.
+
+EventLog is a listener writing the requests to a file along with the sleeps
+and the SSH commands, tagged with the test running, for
+tools/timing_report.py. It is installed by install_event_log when the
+request_timing_log option of the debug group is set.
+"""
+
+import atexit
+import collections
+import contextlib
+import json
+import os
+import re
+import threading
+import time
+import urlparse
+
+from tempest.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+# Path segments replaced by {id} in the URL templates: UUIDs, hex ids like
+# the tenant ids, and numbers
+ID_REGEX = re.compile(
+    r"^([0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?"
+    r"[0-9a-fA-F]{12}|[0-9a-fA-F]{32}|[0-9]+)$")
+
+RequestEvent = collections.namedtuple('RequestEvent', [
+    'start',           # time of the request, in seconds since the epoch
+    'service',         # catalog type of the client's service
+    'method',
+    'url',             # URL template, see url_template
+    'status',          # HTTP status code of the response
+    'request_bytes',
+    'response_bytes',
+    'connect',         # seconds to open connections, None if reused
+    'first_byte',      # seconds to the end of the response headers
+    'total',           # seconds to the end of the response body
+])
+
+_listeners = []
+_lock = threading.Lock()
+
+
+def add_listener(listener):
+    """Adds a callable called with the RequestEvent of each request."""
+    global _listeners
+    with _lock:
+        _listeners = _listeners + [listener]
+
+
+def remove_listener(listener):
+    global _listeners
+    with _lock:
+        _listeners = [other for other in _listeners if other != listener]
+
+
+def has_listeners():
+    return bool(_listeners)
+
+
+def notify(event):
+    # The list is replaced, never modified, so it can be iterated unlocked
+    for listener in _listeners:
+        try:
+            listener(event)
+        except Exception:
+            LOG.exception("Request timing listener %s failed", listener)
+
+
+def url_template(url):
+    """
+    Returns the path of a URL with the ids replaced by {id}, so that the
+    requests to the same API endpoint share a template.
+    """
+    path = urlparse.urlparse(url).path
+    return '/'.join('{id}' if ID_REGEX.match(segment) else segment
+                    for segment in path.split('/'))
+
+
+def _percentile(values, percent):
+    """Returns the percentile of sorted values, by the nearest rank."""
+    if not values:
+        return None
+    rank = max(0, int(round(len(values) * percent / 100.0)) - 1)
+    return values[rank]
+
+
+class EndpointStatistics(object):
+    """Aggregates the request timings per service, method and URL."""
+
+    def __init__(self):
+        self._durations = collections.defaultdict(list)
+        self._bytes = collections.defaultdict(int)
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        key = (event.service, event.method, event.url)
+        with self._lock:
+            self._durations[key].append(event.total)
+            self._bytes[key] += event.request_bytes + event.response_bytes
+
+    def report(self):
+        """
+        Returns a list of dicts of the service, method, url, count, total
+        and p95 time, and bytes transferred of each endpoint, from the one
+        which took the most time.
+        """
+        with self._lock:
+            items = [(key, sorted(durations), self._bytes[key])
+                     for key, durations in self._durations.items()]
+        report = []
+        for (service, method, url), durations, size in items:
+            report.append({'service': service,
+                           'method': method,
+                           'url': url,
+                           'count': len(durations),
+                           'total': sum(durations),
+                           'p95': _percentile(durations, 95),
+                           'bytes': size})
+        report.sort(key=lambda entry: entry['total'], reverse=True)
+        return report
+
+    def dump(self, path=None):
+        """Logs the report, and writes it in JSON to path if given."""
+        report = self.report()
+        if not report:
+            return
+        LOG.info("Time spent per API endpoint:")
+        for entry in report:
+            LOG.info(" %(total)8.3fs %(count)6d requests (p95 %(p95).3fs) "
+                     "%(service)s %(method)s %(url)s" % entry)
+        if path:
+            with open(path, 'w') as report_file:
+                json.dump(report, report_file, indent=2)
+
+
+_report = None
+
+
+def install_report(path=None):
+    """
+    Adds an EndpointStatistics listener, whose report is dumped when the
+    process exits. Only the first call has an effect.
+    """
+    global _report
+    with _lock:
+        if _report is not None:
+            return _report
+        _report = EndpointStatistics()
+    add_listener(_report)
+    atexit.register(_report.dump, path)
+    return _report
+
+
+# Id of the test running, or of its class while it is set up or torn down
+current_test = None
+
+_event_log = None
+_state = threading.local()
+
+
+def set_test(test_id):
+    global current_test
+    current_test = test_id
+
+
+class EventLog(object):
+    """
+    Appends timing events to a file in JSON lines.
+
+    Each line is written at once to a file opened in append mode, so the
+    parallel test workers can share the same file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                           0o644)
+
+    def write(self, kind, start, duration, **fields):
+        fields.update(kind=kind, test=current_test, start=round(start, 6),
+                      duration=round(duration, 6))
+        os.write(self._fd, json.dumps(fields) + '\n')
+
+    def __call__(self, event):
+        self.write('request', event.start, event.total,
+                   service=event.service, method=event.method, url=event.url,
+                   status=event.status)
+
+    def close(self):
+        os.close(self._fd)
+
+
+@contextlib.contextmanager
+def span(kind, **fields):
+    """
+    Writes an event of the time spent in the block to the event log, if
+    installed. The sleeps of the block are part of it and not written as
+    sleep events, and so are nested spans.
+    """
+    if _event_log is None or getattr(_state, 'span', False):
+        yield
+        return
+    _state.span = True
+    start = time.time()
+    try:
+        yield
+    finally:
+        _state.span = False
+        _event_log.write(kind, start, time.time() - start, **fields)
+
+
+def install_event_log(path):
+    """
+    Writes the request events to path, and the calls to time.sleep, which
+    are the waits of the polling loops. Only the first call has an effect.
+    """
+    global _event_log
+    with _lock:
+        if _event_log is not None:
+            return _event_log
+        _event_log = EventLog(path)
+    add_listener(_event_log)
+    sleep = time.sleep
+
+    def timed_sleep(seconds):
+        if getattr(_state, 'span', False):
+            return sleep(seconds)
+        start = time.time()
+        try:
+            sleep(seconds)
+        finally:
+            _event_log.write('sleep', start, time.time() - start)
+
+    # The sleeps are spread all over the clients and tests, patching the
+    # function is the only way to see them all
+    time.sleep = timed_sleep
+    return _event_log
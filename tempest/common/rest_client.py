@@ -17,11 +17,13 @@
 import collections
 import hashlib
 import json
+import logging as orig_logging
 from lxml import etree
 import re
 import time
 
 from tempest.common import http
+from tempest.common import request_timing
 from tempest import config
 from tempest import exceptions
 from tempest.openstack.common import log as logging
@@ -36,6 +38,12 @@ TOKEN_CHARS_RE = re.compile('^[-A-Za-z0-9+/=]*$')
 # All the successful HTTP status codes from RFC 2616
 HTTP_SUCCESS = (200, 201, 202, 203, 204, 205, 206)
 
+# Region of each service type, see RestClient._get_region
+_service_regions = {}
+
+# Number of requests to each endpoint, see RestClient._sample_request
+_request_counts = collections.defaultdict(int)
+
 
 class RestClient(object):
     TYPE = "json"
@@ -61,9 +69,30 @@ class RestClient(object):
                                        'location', 'proxy-authenticate',
                                        'retry-after', 'server',
                                        'vary', 'www-authenticate'))
+        self.http_obj = self._get_http()
+        self.log_sample_rate = CONF.debug.request_log_sample_rate
+        if CONF.debug.request_timing:
+            request_timing.install_report(CONF.debug.request_timing_report)
+        if CONF.debug.request_timing_log:
+            request_timing.install_event_log(CONF.debug.request_timing_log)
+
+    def _get_http(self):
+        """
+        Builds the HTTP transport, either closing the connection after each
+        request or borrowing keep-alive connections from the pool of the
+        auth provider.
+        """
         dscv = CONF.identity.disable_ssl_certificate_validation
-        self.http_obj = http.ClosingHttp(
-            disable_ssl_certificate_validation=dscv)
+        if CONF.identity.http_keep_alive:
+            if self.auth_provider is not None:
+                pool = self.auth_provider.connection_pool
+            else:
+                pool = http.ConnectionPool(
+                    max_size=CONF.identity.http_pool_size,
+                    idle_timeout=CONF.identity.http_pool_idle_timeout,
+                    disable_ssl_certificate_validation=dscv)
+            return http.PooledHttp(pool)
+        return http.ClosingHttp(disable_ssl_certificate_validation=dscv)
 
     def __str__(self):
         STRING_LIMIT = 80
@@ -80,6 +109,12 @@ class RestClient(object):
         """
         Returns the region for a specific service
         """
+        # Scanning all the config groups is expensive and the result does
+        # not change, so it is done once per service type
+        try:
+            return _service_regions[service]
+        except KeyError:
+            pass
         service_region = None
         for cfgname in dir(CONF._config):
             # Find all config.FOO.catalog_type and assume FOO is a service.
@@ -89,6 +124,7 @@ class RestClient(object):
                 service_region = getattr(cfg, 'region', None)
         if not service_region:
             service_region = CONF.identity.region
+        _service_regions[service] = service_region
         return service_region
 
     @property
@@ -174,8 +210,24 @@ class RestClient(object):
         versions = map(lambda x: x['id'], body)
         return resp, versions
 
+    def _sample_request(self, method, req_url):
+        """
+        Tells whether a request is logged, only one of every
+        log_sample_rate requests to an endpoint is.
+        """
+        if self.log_sample_rate <= 1:
+            return True
+        key = (self.service, method, request_timing.url_template(req_url))
+        # A race between two threads only makes a request more or less logged
+        count = _request_counts[key]
+        _request_counts[key] = count + 1
+        return count % self.log_sample_rate == 0
+
     def _log_request(self, method, req_url, headers, body):
         self.LOG.info('Request: ' + method + ' ' + req_url)
+        # The headers and body are only formatted when they are logged
+        if not self.LOG.isEnabledFor(orig_logging.DEBUG):
+            return
         if headers:
             print_headers = headers
             if 'X-Auth-Token' in headers and headers['X-Auth-Token']:
@@ -195,14 +247,21 @@ class RestClient(object):
     def _log_response(self, resp, resp_body):
         status = resp['status']
         self.LOG.info("Response Status: " + status)
+        if resp.get('x-compute-request-id'):
+            self.LOG.info("Nova request id: %s" %
+                          resp['x-compute-request-id'])
+        elif resp.get('x-openstack-request-id'):
+            self.LOG.info("Glance request id %s" %
+                          resp['x-openstack-request-id'])
+        if not self.LOG.isEnabledFor(orig_logging.DEBUG):
+            return
         headers = resp.copy()
         del headers['status']
+        # The request id already logged is not repeated
         if headers.get('x-compute-request-id'):
-            self.LOG.info("Nova request id: %s" %
-                          headers.pop('x-compute-request-id'))
+            del headers['x-compute-request-id']
         elif headers.get('x-openstack-request-id'):
-            self.LOG.info("Glance request id %s" %
-                          headers.pop('x-openstack-request-id'))
+            del headers['x-openstack-request-id']
         if len(headers):
             self.LOG.debug('Response Headers: ' + str(headers))
         if resp_body:
@@ -216,6 +275,29 @@ class RestClient(object):
     def _parse_resp(self, body):
         return json.loads(body)
 
+    def _http_request(self, url, method, headers=None, body=None):
+        """
+        Sends a request with http_obj, and the RequestEvent of its timing to
+        the request_timing listeners.
+        """
+        if not request_timing.has_listeners():
+            return self.http_obj.request(url, method, headers=headers,
+                                         body=body)
+        start = time.time()
+        http.timing.reset(start)
+        resp, resp_body = self.http_obj.request(url, method, headers=headers,
+                                                body=body)
+        total = time.time() - start
+        request_timing.notify(request_timing.RequestEvent(
+            start=start, service=self.service, method=method,
+            url=request_timing.url_template(url), status=resp.status,
+            request_bytes=len(body) if isinstance(body, basestring) else 0,
+            response_bytes=(len(resp_body)
+                            if isinstance(resp_body, basestring) else 0),
+            connect=http.timing.connect, first_byte=http.timing.first_byte,
+            total=total))
+        return resp, resp_body
+
     def response_checker(self, method, url, headers, body, resp, resp_body):
         if (resp.status in set((204, 205, 304)) or resp.status < 200 or
                 method.upper() == 'HEAD') and resp_body:
@@ -250,11 +332,18 @@ class RestClient(object):
         # Authenticate the request with the auth provider
         req_url, req_headers, req_body = self.auth_provider.auth_request(
             method, url, headers, body, self.filters)
-        self._log_request(method, req_url, req_headers, req_body)
+        logged = self._sample_request(method, req_url)
+        if logged:
+            self._log_request(method, req_url, req_headers, req_body)
         # Do the actual request
-        resp, resp_body = self.http_obj.request(
+        resp, resp_body = self._http_request(
             req_url, method, headers=req_headers, body=req_body)
-        self._log_response(resp, resp_body)
+        # The failed requests are always logged
+        if not logged and resp.status >= 400:
+            self._log_request(method, req_url, req_headers, req_body)
+            logged = True
+        if logged:
+            self._log_response(resp, resp_body)
         # Verify HTTP response codes
         self.response_checker(method, url, req_headers, req_body, resp,
                               resp_body)
@@ -15,11 +15,14 @@
 
 
 import cStringIO
+import Queue
 import select
 import socket
+import threading
 import time
 import warnings
 
+from tempest.common import request_timing
 from tempest import exceptions
 from tempest.openstack.common import log as logging
 
@@ -34,8 +37,18 @@ LOG = logging.getLogger(__name__)
 
 class Client(object):
 
+    # Bytes of stderr kept for the error of streamed commands
+    STDERR_TAIL_SIZE = 64 * 1024
+
     def __init__(self, host, username, password=None, timeout=300, pkey=None,
-                 channel_timeout=10, look_for_keys=False, key_filename=None):
+                 channel_timeout=10, look_for_keys=False, key_filename=None,
+                 buf_size=1024, persistent=False):
+        """
+        :param buf_size: size of the reads of the command outputs
+        :param persistent: keep the ssh connection open and run all the
+                           commands over it, each in its own channel, until
+                           close() is called
+        """
         self.host = host
         self.username = username
         self.password = password
@@ -47,7 +60,10 @@ class Client(object):
         self.key_filename = key_filename
         self.timeout = int(timeout)
         self.channel_timeout = float(channel_timeout)
-        self.buf_size = 1024
+        self.buf_size = int(buf_size)
+        self.persistent = persistent
+        self._ssh = None
+        self._lock = threading.Lock()
 
     def _get_ssh_connection(self, sleep=1.5, backoff=1):
         """Returns an ssh connection to the specified host."""
@@ -95,25 +111,44 @@ class Client(object):
     def _is_timed_out(self, start_time):
         return (time.time() - self.timeout) > start_time
 
-    def exec_command(self, cmd):
-        """
-        Execute the specified command on the server.
+    def _get_connection(self):
+        """Returns the persistent connection, or a new one."""
+        if not self.persistent:
+            return self._get_ssh_connection()
+        with self._lock:
+            transport = None
+            if self._ssh is not None:
+                transport = self._ssh.get_transport()
+            if transport is None or not transport.is_active():
+                self._ssh = self._get_ssh_connection()
+            return self._ssh
 
-        Note that this method is reading whole command outputs to memory, thus
-        shouldn't be used for large outputs.
+    def _release_connection(self, ssh):
+        if not self.persistent:
+            ssh.close()
 
-        :returns: data read from standard output of the command.
-        :raises: SSHExecCommandFailed if command returns nonzero
-                 status. The exception contains command status stderr content.
+    def _drop_connection(self, ssh):
+        """Closes ssh, a persistent connection found broken."""
+        with self._lock:
+            if self._ssh is ssh:
+                self._ssh = None
+        ssh.close()
+
+    def close(self):
+        """Closes the persistent connection, if any."""
+        with self._lock:
+            if self._ssh is not None:
+                self._ssh.close()
+                self._ssh = None
+
+    def __del__(self):
+        # Do not leave the transport thread of a forgotten client running
+        if getattr(self, '_ssh', None) is not None:
+            self._ssh.close()
+
+    def _read_channel(self, channel, cmd):
+        """Yields (stdout, stderr) chunks read from channel until it closes.
         """
-        ssh = self._get_ssh_connection()
-        transport = ssh.get_transport()
-        channel = transport.open_session()
-        channel.fileno()  # Register event pipe
-        channel.exec_command(cmd)
-        channel.shutdown_write()
-        out_data = []
-        err_data = []
         poll = select.poll()
         poll.register(channel, select.POLLIN)
         start_time = time.time()
@@ -131,20 +166,182 @@ class Client(object):
             out_chunk = err_chunk = None
             if channel.recv_ready():
                 out_chunk = channel.recv(self.buf_size)
-                out_data += out_chunk,
             if channel.recv_stderr_ready():
                 err_chunk = channel.recv_stderr(self.buf_size)
-                err_data += err_chunk,
+            if out_chunk or err_chunk:
+                yield out_chunk, err_chunk
             if channel.closed and not err_chunk and not out_chunk:
                 break
-        exit_status = channel.recv_exit_status()
-        if 0 != exit_status:
-            raise exceptions.SSHExecCommandFailed(
-                command=cmd, exit_status=exit_status,
-                strerror=''.join(err_data))
+
+    def _start_command(self, ssh, cmd):
+        """Returns a new channel of ssh running cmd."""
+        channel = ssh.get_transport().open_session()
+        try:
+            channel.fileno()  # Register event pipe
+            channel.exec_command(cmd)
+            channel.shutdown_write()
+        except Exception:
+            channel.close()
+            raise
+        return channel
+
+    def _open_channel(self, cmd):
+        """
+        Returns the connection and a new channel of it running cmd.
+
+        A persistent connection can look active while it is half-open, e.g.
+        after a reboot of the host. When starting the command fails on it,
+        the connection is dropped and the command started once on a new one.
+        """
+        ssh = self._get_connection()
+        try:
+            return ssh, self._start_command(ssh, cmd)
+        except (paramiko.SSHException, socket.error, EOFError) as e:
+            if not self.persistent:
+                self._release_connection(ssh)
+                raise
+            LOG.warning("Reconnecting to %s@%s, the ssh connection is "
+                        "broken (%s)", self.username, self.host, e)
+            self._drop_connection(ssh)
+        except Exception:
+            self._release_connection(ssh)
+            raise
+        ssh = self._get_connection()
+        try:
+            return ssh, self._start_command(ssh, cmd)
+        except Exception:
+            self._release_connection(ssh)
+            raise
+
+    def _exec_channel(self, cmd):
+        """
+        Runs cmd in a new channel, yields its (stdout, stderr) chunks and
+        finally its exit status.
+        """
+        with request_timing.span('ssh', host=self.host, command=cmd):
+            ssh, channel = self._open_channel(cmd)
+            try:
+                try:
+                    for chunks in self._read_channel(channel, cmd):
+                        yield chunks
+                    yield channel.recv_exit_status()
+                finally:
+                    channel.close()
+            finally:
+                self._release_connection(ssh)
+
+    def exec_command(self, cmd):
+        """
+        Execute the specified command on the server.
+
+        Note that this method is reading whole command outputs to memory, thus
+        shouldn't be used for large outputs, see iter_command and
+        stream_command.
+
+        :returns: data read from standard output of the command.
+        :raises: SSHExecCommandFailed if command returns nonzero
+                 status. The exception contains command status stderr content.
+        """
+        out_data = []
+        err_data = []
+        for item in self._exec_channel(cmd):
+            if isinstance(item, tuple):
+                out_chunk, err_chunk = item
+                if out_chunk:
+                    out_data.append(out_chunk)
+                if err_chunk:
+                    err_data.append(err_chunk)
+            elif item != 0:
+                raise exceptions.SSHExecCommandFailed(
+                    command=cmd, exit_status=item,
+                    strerror=''.join(err_data))
         return ''.join(out_data)
 
+    def iter_command(self, cmd):
+        """
+        Execute the specified command on the server, yielding its output.
+
+        :returns: an iterator of ('stdout', data) and ('stderr', data) tuples,
+                  in the order the data is received.
+        :raises: SSHExecCommandFailed if command returns nonzero status, once
+                 all the output was yielded. The exception contains the last
+                 STDERR_TAIL_SIZE bytes of stderr.
+        """
+        err_tail = ''
+        for item in self._exec_channel(cmd):
+            if isinstance(item, tuple):
+                out_chunk, err_chunk = item
+                if out_chunk:
+                    yield 'stdout', out_chunk
+                if err_chunk:
+                    err_tail = (err_tail + err_chunk)[-self.STDERR_TAIL_SIZE:]
+                    yield 'stderr', err_chunk
+            elif item != 0:
+                raise exceptions.SSHExecCommandFailed(
+                    command=cmd, exit_status=item, strerror=err_tail)
+
+    def stream_command(self, cmd, stdout, stderr=None):
+        """
+        Execute the specified command on the server, writing its output to
+        the stdout and stderr file objects as it is received.
+
+        :raises: SSHExecCommandFailed if command returns nonzero status.
+        """
+        for stream, data in self.iter_command(cmd):
+            if stream == 'stdout':
+                stdout.write(data)
+            elif stderr is not None:
+                stderr.write(data)
+
     def test_connection_auth(self):
         """Raises an exception when we can not connect to server via ssh."""
-        connection = self._get_ssh_connection()
-        connection.close()
+        with request_timing.span('ssh', host=self.host):
+            connection = self._get_connection()
+            self._release_connection(connection)
+
+
+def exec_command_on_hosts(clients, command, max_workers=16):
+    """
+    Runs the same command on many hosts in parallel.
+
+    :param clients: ssh Clients of the hosts, carrying their credentials and
+                    timeouts
+    :param command: command to run, None to only check the authentication,
+                    or a callable returning the command for a given host
+    :param max_workers: maximum number of hosts reached at the same time
+    :returns: a dict mapping each host to the output of the command, or to
+              the exception raised running it there
+    """
+    queue = Queue.Queue()
+    for client in clients:
+        queue.put(client)
+    results = {}
+
+    def worker():
+        while True:
+            try:
+                client = queue.get_nowait()
+            except Queue.Empty:
+                return
+            host_command = command
+            if callable(command):
+                host_command = command(client.host)
+            try:
+                if host_command is None:
+                    client.test_connection_auth()
+                    result = None
+                else:
+                    result = client.exec_command(host_command)
+            except Exception as e:
+                result = e
+            # Assignments of distinct keys are atomic
+            results[client.host] = result
+
+    threads = [threading.Thread(target=worker)
+               for _ in range(min(max_workers, len(clients)))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
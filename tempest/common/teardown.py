@@ -0,0 +1,226 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import copy
+import Queue
+import sys
+import threading
+
+from tempest.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+# Kinds of the resources created through the official clients, by class name
+RESOURCE_KINDS = {
+    'Server': 'server',
+    'FloatingIP': 'floating_ip',
+    'DeletableFloatingIp': 'floating_ip',
+    'Volume': 'volume',
+    'Snapshot': 'snapshot',
+    'Keypair': 'keypair',
+    'SecurityGroup': 'security_group',
+    'DeletableSecurityGroup': 'security_group',
+    'SecurityGroupRule': 'security_group_rule',
+    'DeletableSecurityGroupRule': 'security_group_rule',
+    'DeletableNetwork': 'network',
+    'DeletableSubnet': 'subnet',
+    'DeletableRouter': 'router',
+    'DeletablePort': 'port',
+    'DeletablePool': 'pool',
+    'DeletableMember': 'member',
+    'DeletableVip': 'vip',
+}
+
+# Kinds of resources which may depend on each other, the deletion of two
+# such resources keeps the reverse order of their creation
+DEPENDENT_KINDS = frozenset(frozenset(pair) for pair in [
+    ('server', 'floating_ip'),
+    ('server', 'volume'),
+    ('server', 'snapshot'),
+    ('server', 'keypair'),
+    ('server', 'security_group'),
+    ('server', 'network'),
+    ('server', 'subnet'),
+    ('server', 'port'),
+    ('volume', 'snapshot'),
+    ('floating_ip', 'port'),
+    ('floating_ip', 'router'),
+    ('floating_ip', 'subnet'),
+    ('floating_ip', 'vip'),
+    ('security_group', 'security_group_rule'),
+    ('security_group', 'port'),
+    ('network', 'subnet'),
+    ('network', 'port'),
+    ('network', 'router'),
+    ('subnet', 'port'),
+    ('subnet', 'router'),
+    ('router', 'port'),
+    ('pool', 'member'),
+    ('pool', 'vip'),
+    ('pool', 'subnet'),
+    ('vip', 'subnet'),
+    ('vip', 'port'),
+    ('tenant', 'user'),
+] + [
+    # Tenants and users own all the other resources
+    (owner, kind) for owner in ('tenant', 'user')
+    for kind in set(RESOURCE_KINDS.values())
+])
+
+
+_thread_clients = threading.local()
+
+
+def thread_client(client):
+    """
+    Returns a copy of a RestClient with its own HTTP transport, the same for
+    every call from the current thread. An httplib2.Http object must not be
+    shared between threads.
+    """
+    clients = getattr(_thread_clients, 'clients', None)
+    if clients is None:
+        clients = _thread_clients.clients = {}
+    entry = clients.get(id(client))
+    if entry is None:
+        local_client = copy.copy(client)
+        local_client.http_obj = local_client._get_http()
+        # The client is kept referenced so that its id is not reused
+        entry = clients[id(client)] = (client, local_client)
+    return entry[1]
+
+
+def client_call(client, method, *args):
+    """
+    Returns a callable calling a method of a RestClient with args, through
+    the thread_client of the thread running it.
+    """
+    def call():
+        return getattr(thread_client(client), method)(*args)
+    return call
+
+
+def resource_kind(resource):
+    """Returns the kind of a resource object, None if it is unknown."""
+    return RESOURCE_KINDS.get(resource.__class__.__name__)
+
+
+class _Task(object):
+
+    def __init__(self, name, delete, wait, kind):
+        self.name = name
+        self.delete = delete
+        self.wait = wait
+        self.kind = kind
+        # Tasks which have to complete before this one starts
+        self.blockers = set()
+        # Tasks waiting for this one
+        self.dependents = []
+
+
+class ResourceCleaner(object):
+    """Deletes resources concurrently, honouring their dependencies.
+
+    Resources are added in the order they were created. A resource is only
+    deleted once all the resources created after it which may depend on it
+    are gone, every other deletion runs in parallel in a bounded pool of
+    threads. The time spent is the one of the slowest dependency chain
+    instead of the sum of all the deletions.
+
+    The deletions run in the threads of the pool, so they must not share an
+    HTTP transport: the RestClient calls go through client_call, and the
+    callers of clients which cannot be copied use a single worker.
+    """
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self._tasks = []
+
+    @staticmethod
+    def _dependent(kind, other_kind):
+        # Resources of an unknown kind keep the strict reverse order
+        if kind is None or other_kind is None:
+            return True
+        return frozenset((kind, other_kind)) in DEPENDENT_KINDS
+
+    def add(self, name, delete, wait=None, kind=None):
+        """Registers a resource to delete.
+
+        :param name: used to log and report the failures
+        :param delete: callable issuing the deletion
+        :param wait: optional callable blocking until the resource is gone
+        :param kind: kind of the resource, see DEPENDENT_KINDS
+        """
+        task = _Task(name, delete, wait, kind)
+        for other in self._tasks:
+            if self._dependent(other.kind, kind):
+                other.blockers.add(task)
+                task.dependents.append(other)
+        self._tasks.append(task)
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def run(self):
+        """Deletes all the registered resources.
+
+        A failed deletion does not stop the others, the resources depending
+        on it are still attempted.
+
+        :returns: a list of (name, exc_info) tuples of the failed deletions
+        """
+        tasks, self._tasks = self._tasks, []
+        if not tasks:
+            return []
+        queue = Queue.Queue()
+        lock = threading.Lock()
+        errors = []
+        remaining = [len(tasks)]
+        workers = min(self.max_workers, len(tasks))
+
+        def worker():
+            while True:
+                task = queue.get()
+                if task is None:
+                    return
+                LOG.debug("Deleting %s", task.name)
+                try:
+                    task.delete()
+                    if task.wait is not None:
+                        task.wait()
+                except Exception:
+                    LOG.exception("Failed to delete %s", task.name)
+                    with lock:
+                        errors.append((task.name, sys.exc_info()))
+                ready = []
+                with lock:
+                    for dependent in task.dependents:
+                        dependent.blockers.discard(task)
+                        if not dependent.blockers:
+                            ready.append(dependent)
+                    remaining[0] -= 1
+                    if not remaining[0]:
+                        ready.extend([None] * workers)
+                for item in ready:
+                    queue.put(item)
+
+        for task in tasks:
+            if not task.blockers:
+                queue.put(task)
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
@@ -38,9 +38,15 @@ class RemoteClient():
                     break
             else:
                 raise ServerUnreachable()
-        self.ssh_client = Client(ip_address, username, password, ssh_timeout,
-                                 pkey=pkey,
-                                 channel_timeout=ssh_channel_timeout)
+        self.ssh_client = Client(
+            ip_address, username, password, ssh_timeout, pkey=pkey,
+            channel_timeout=ssh_channel_timeout,
+            buf_size=CONF.compute.ssh_buffer_size,
+            persistent=CONF.compute.ssh_persistent_connection)
+
+    def close(self):
+        """Closes the ssh connection kept open between commands."""
+        self.ssh_client.close()
 
     def validate_authentication(self):
         """Validate ssh connection and authentication
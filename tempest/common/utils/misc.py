@@ -13,6 +13,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import Queue
+import sys
+import threading
+
 
 def singleton(cls):
     """Simple wrapper for classes that should only have a single instance."""
@@ -23,3 +27,39 @@ def singleton(cls):
             instances[cls] = cls()
         return instances[cls]
     return getinstance
+
+
+def run_concurrently(function, args_list, max_workers):
+    """
+    Calls function with each tuple of args_list, from at most max_workers
+    threads, and returns the results in the same order. The first exception
+    raised is raised once all the calls are done, the calls not started by
+    then are skipped.
+    """
+    queue = Queue.Queue()
+    for index, args in enumerate(args_list):
+        queue.put((index, args))
+    results = [None] * len(args_list)
+    errors = []
+
+    def worker():
+        while not errors:
+            try:
+                index, args = queue.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                results[index] = function(*args)
+            except Exception:
+                errors.append(sys.exc_info())
+
+    threads = [threading.Thread(target=worker)
+               for _ in range(min(max_workers, len(args_list)))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0][0], errors[0][1], errors[0][2]
+    return results
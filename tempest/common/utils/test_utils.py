@@ -14,15 +14,22 @@
 
 from tempest.common.utils import misc
 from tempest import config
+from tempest.openstack.common import log as logging
 from tempest.scenario import manager
 
+import glob
+import hashlib
 import json
+import os
 import re
 import string
+import time
 import unicodedata
 
 CONF = config.CONF
 
+LOG = logging.getLogger(__name__)
+
 
 @misc.singleton
 class ImageUtils(object):
@@ -34,11 +41,16 @@ class ImageUtils(object):
         self.ssh_users = json.loads(CONF.input_scenario.ssh_user_regex)
         self.non_ssh_image_pattern = \
             CONF.input_scenario.non_ssh_image_regex
-        # Setup clients
-        ocm = manager.OfficialClientManager(CONF.identity.username,
-                                            CONF.identity.password,
-                                            CONF.identity.tenant_name)
-        self.client = ocm.compute_client
+
+    @property
+    def client(self):
+        # Setup clients on first use
+        if not hasattr(self, '_client'):
+            ocm = manager.OfficialClientManager(CONF.identity.username,
+                                                CONF.identity.password,
+                                                CONF.identity.tenant_name)
+            self._client = ocm.compute_client
+        return self._client
 
     def ssh_user(self, image_id):
         _image = self.client.images.get(image_id)
@@ -66,6 +78,79 @@ class ImageUtils(object):
         return self._is_flavor_enough(_flavor, _image)
 
 
+class ScenarioCache(object):
+    """
+    Directory caching the image and flavor scenarios of the input scenario
+    tests, so that they are listed once per run instead of at the discovery
+    of the tests by each worker.
+
+    The entries are keyed by the cloud and the regexes which selected them,
+    each stored in its own file, and listed again once older than ttl
+    seconds.
+    """
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+
+    @staticmethod
+    def key(*values):
+        return hashlib.sha1(json.dumps(values)).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.path, key + '.json')
+
+    def read(self, key):
+        try:
+            with open(self._path(key)) as cache_file:
+                return json.load(cache_file)
+        except (IOError, ValueError):
+            return None
+
+    def write(self, key, scenarios):
+        path = self._path(key)
+        # Concurrent writers of a key replace its file, never leaving it
+        # partial, and leave the other keys alone
+        temp_path = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            with open(temp_path, 'w') as cache_file:
+                json.dump(dict(scenarios, time=time.time()), cache_file,
+                          indent=2, sort_keys=True)
+            os.rename(temp_path, path)
+        except (IOError, OSError) as e:
+            LOG.warning("Could not write the scenario cache %s: %s", path, e)
+
+    def clear(self):
+        for path in glob.glob(os.path.join(self.path, '*.json')):
+            os.remove(path)
+
+    def load(self, key, discover, refresh=False):
+        """
+        Returns the cached scenarios of key, a dict of lists of (name,
+        parameters) tuples, or the ones returned by discover if they are
+        missing or expired, or if refresh is True. The expired ones are
+        used if discover fails.
+        """
+        entry = None if refresh else self.read(key)
+        if entry and time.time() - entry['time'] <= self.ttl:
+            scenarios = entry
+        else:
+            try:
+                scenarios = discover()
+            except Exception:
+                if not entry:
+                    raise
+                LOG.exception("Failed to list the input scenarios, using "
+                              "the ones cached in %s", self.path)
+                scenarios = entry
+            else:
+                self.write(key, scenarios)
+        return dict((kind, [tuple(scenario) for scenario in values])
+                    for kind, values in scenarios.items() if kind != 'time')
+
+
 @misc.singleton
 class InputScenarioUtils(object):
 
@@ -95,29 +180,68 @@ class InputScenarioUtils(object):
                                             digit=string.digits)
 
     def __init__(self):
-        ocm = manager.OfficialClientManager(CONF.identity.username,
-                                            CONF.identity.password,
-                                            CONF.identity.tenant_name)
-        self.client = ocm.compute_client
         self.image_pattern = CONF.input_scenario.image_regex
         self.flavor_pattern = CONF.input_scenario.flavor_regex
+        self.cache = None
+        if CONF.input_scenario.cache_dir:
+            self.cache = ScenarioCache(CONF.input_scenario.cache_dir,
+                                       CONF.input_scenario.cache_ttl)
+
+    @property
+    def client(self):
+        # The cloud is only reached when the scenarios are not cached
+        if not hasattr(self, '_client'):
+            ocm = manager.OfficialClientManager(CONF.identity.username,
+                                                CONF.identity.password,
+                                                CONF.identity.tenant_name)
+            self._client = ocm.compute_client
+        return self._client
 
     def _normalize_name(self, name):
         nname = unicodedata.normalize('NFKD', name).encode('ASCII', 'ignore')
         nname = ''.join(c for c in nname if c in self.validchars)
         return nname
 
+    @property
+    def cache_key(self):
+        return ScenarioCache.key(CONF.identity.uri, CONF.identity.tenant_name,
+                                 self.image_pattern, self.flavor_pattern)
+
+    def _discover(self):
+        images = self.client.images.list(detailed=False)
+        flavors = self.client.flavors.list(detailed=False)
+        return {
+            'images': [
+                (self._normalize_name(i.name), dict(image_ref=i.id))
+                for i in images if re.search(self.image_pattern, str(i.name))
+            ],
+            'flavors': [
+                (self._normalize_name(f.name), dict(flavor_ref=f.id))
+                for f in flavors if re.search(self.flavor_pattern, str(f.name))
+            ],
+        }
+
+    def load(self, refresh=False):
+        """
+        Lists the images and flavors of the scenarios, or reads them from
+        the cache_dir of the input-scenario section, if set. refresh
+        ignores the cached ones.
+        """
+        if self.cache is None:
+            scenarios = self._discover()
+        else:
+            scenarios = self.cache.load(self.cache_key, self._discover,
+                                        refresh)
+        self._scenario_images = scenarios['images']
+        self._scenario_flavors = scenarios['flavors']
+
     @property
     def scenario_images(self):
         """
         :return: a scenario with name and uuid of images
         """
         if not hasattr(self, '_scenario_images'):
-            images = self.client.images.list(detailed=False)
-            self._scenario_images = [
-                (self._normalize_name(i.name), dict(image_ref=i.id))
-                for i in images if re.search(self.image_pattern, str(i.name))
-            ]
+            self.load()
         return self._scenario_images
 
     @property
@@ -126,9 +250,5 @@ class InputScenarioUtils(object):
         :return: a scenario with name and uuid of flavors
         """
         if not hasattr(self, '_scenario_flavors'):
-            flavors = self.client.flavors.list(detailed=False)
-            self._scenario_flavors = [
-                (self._normalize_name(f.name), dict(flavor_ref=f.id))
-                for f in flavors if re.search(self.flavor_pattern, str(f.name))
-            ]
+            self.load()
         return self._scenario_flavors
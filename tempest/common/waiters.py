@@ -120,3 +120,139 @@ def wait_for_image_status(client, image_id, status):
                         'timeout': client.build_timeout})
             message += ' Current status: %s.' % image['status']
             raise exceptions.TimeoutException(message)
+
+
+def _get_field(resource, field):
+    # Tempest clients return dicts, the official clients resource objects
+    if isinstance(resource, dict):
+        return resource.get(field)
+    return getattr(resource, field, None)
+
+
+def _get_missing(get_resource, resource_id):
+    try:
+        return get_resource(resource_id)
+    except Exception as e:
+        # Both the tempest and the official clients raise an exception
+        # called 'NotFound' when the resource does not exist
+        if e.__class__.__name__ == 'NotFound':
+            return None
+        raise
+
+
+def wait_for_resources_status(list_resources, resource_ids, status,
+                              build_interval, build_timeout,
+                              max_interval=None, error_status='ERROR',
+                              raise_on_error=True, get_resource=None):
+    """Waits for many resources to reach a given status.
+
+    Instead of getting every resource, list_resources() is called once per
+    interval. It must return the resources (dicts or objects with id and
+    status) including the waited ones. A waited resource missing from the
+    listing is considered DELETED, so status='DELETED' waits for deletions.
+
+    Since the listings are paginated, a waited resource can also be missing
+    because it is on another page. When get_resource is set, it is called
+    with the id of every missing resource and the resource is only DELETED
+    if it raises NotFound.
+
+    The interval doubles as long as no resource changes status, up to
+    max_interval (4 times build_interval by default), and is reset to
+    build_interval on every state transition.
+
+    :returns: a dict mapping each resource id to the list of its
+              (status, seconds since start) state transitions.
+    """
+    if max_interval is None:
+        max_interval = build_interval * 4
+    pending = set(resource_ids)
+    statuses = dict.fromkeys(pending)
+    transitions = dict((resource_id, []) for resource_id in pending)
+    interval = build_interval
+    start_time = time.time()
+    while True:
+        resources = dict((_get_field(r, 'id'), r) for r in list_resources())
+        elapsed = time.time() - start_time
+        changed = False
+        for resource_id in list(pending):
+            resource = resources.get(resource_id)
+            if resource is None and get_resource is not None:
+                resource = _get_missing(get_resource, resource_id)
+            if resource is None:
+                new_status = 'DELETED'
+            else:
+                new_status = _get_field(resource, 'status')
+            if new_status != statuses[resource_id]:
+                if statuses[resource_id] is not None:
+                    LOG.info('Resource %s state transition "%s" ==> "%s" '
+                             'after %d second wait', resource_id,
+                             statuses[resource_id], new_status, elapsed)
+                statuses[resource_id] = new_status
+                transitions[resource_id].append((new_status, elapsed))
+                changed = True
+            if new_status == status:
+                pending.discard(resource_id)
+            elif (raise_on_error and new_status is not None and
+                  new_status.lower() == error_status.lower()):
+                raise exceptions.ResourceErrorException(
+                    resource_id=resource_id, status=new_status)
+        if not pending:
+            return transitions
+
+        if elapsed >= build_timeout:
+            message = ('%(count)d resources failed to reach %(status)s '
+                       'status within the required time (%(timeout)s s).' %
+                       {'count': len(pending), 'status': status,
+                        'timeout': build_timeout})
+            message += ' Current status: %s.' % ', '.join(
+                '%s: %s' % (resource_id, statuses[resource_id])
+                for resource_id in sorted(pending))
+            raise exceptions.TimeoutException(message)
+        if changed:
+            interval = build_interval
+        else:
+            interval = min(interval * 2, max_interval)
+        time.sleep(max(0, min(interval, build_timeout - elapsed)))
+
+
+def wait_for_servers_status(client, server_ids, status, params=None,
+                            raise_on_error=True):
+    """Waits for many servers to reach a given status.
+
+    All the servers are checked with a single list_servers_with_detail call
+    per interval, params can be used to filter the listing.
+    """
+    def list_servers():
+        resp, body = client.list_servers_with_detail(params)
+        return body['servers']
+
+    def get_server(server_id):
+        resp, body = client.get_server(server_id)
+        return body
+
+    return wait_for_resources_status(list_servers, server_ids, status,
+                                     client.build_interval,
+                                     client.build_timeout,
+                                     raise_on_error=raise_on_error,
+                                     get_resource=get_server)
+
+
+def wait_for_volumes_status(client, volume_ids, status, params=None):
+    """Waits for many volumes to reach a given status.
+
+    All the volumes are checked with a single list_volumes_with_detail call
+    per interval, params can be used to filter the listing.
+    """
+    def list_volumes():
+        resp, volumes = client.list_volumes_with_detail(params)
+        return volumes
+
+    def get_volume(volume_id):
+        resp, volume = client.get_volume(volume_id)
+        return volume
+
+    return wait_for_resources_status(list_volumes, volume_ids, status,
+                                     client.build_interval,
+                                     client.build_timeout,
+                                     error_status='error',
+                                     get_resource=get_volume)
@@ -38,6 +38,32 @@ IdentityGroup = [
     cfg.BoolOpt('disable_ssl_certificate_validation',
                 default=False,
                 help="Set to True if using self-signed SSL certificates."),
+    cfg.BoolOpt('http_keep_alive',
+                default=False,
+                help="Keep HTTP connections open and share them between all "
+                     "the clients of a client manager, instead of "
+                     "closing the connection after every request."),
+    cfg.IntOpt('http_pool_size',
+               default=10,
+               help="Maximum number of idle keep-alive connections kept "
+                    "per host when http_keep_alive is enabled."),
+    cfg.IntOpt('http_pool_idle_timeout',
+               default=30,
+               help="Time (in seconds) after which an idle keep-alive "
+                    "connection is closed and evicted from the pool."),
+    cfg.BoolOpt('token_cache',
+                default=False,
+                help="Share tokens between all the auth providers of a "
+                     "process which use the same credentials."),
+    cfg.IntOpt('token_cache_expiry_margin',
+               default=60,
+               help="Time (in seconds) before its expiry at which a cached "
+                    "token is dropped and a new one requested."),
+    cfg.StrOpt('token_cache_dir',
+               default=None,
+               help="Directory where the tokens of the configured users are "
+                    "stored, so that parallel test workers can reuse them. "
+                    "Tokens are only cached in memory when not set."),
     cfg.StrOpt('uri',
                default=None,
                help="Full URI of the OpenStack Identity API (Keystone), v2"),
@@ -48,6 +74,16 @@ IdentityGroup = [
                help="Identity API version to be used for authentication "
                     "for API tests. Planned to extend to tenant isolation, "
                     "scenario tests and CLI tests."),
+    cfg.StrOpt('credential_pool_path',
+               default=None,
+               help="Directory holding the pool of pre-provisioned isolated "
+                    "credentials created by tools/credential_pool.py. When "
+                    "set, tenant isolation leases credentials from the pool "
+                    "instead of creating them for each test class."),
+    cfg.IntOpt('credential_pool_size',
+               default=10,
+               help="Number of credential sets created by default by "
+                    "tools/credential_pool.py."),
     cfg.StrOpt('region',
                default='RegionOne',
                help="The identity region name to use. Also used as the other "
@@ -167,6 +203,13 @@ ComputeGroup = [
                default=60,
                help="Timeout in seconds to wait for output from ssh "
                     "channel."),
+    cfg.IntOpt('ssh_buffer_size',
+               default=16384,
+               help="Size in bytes of the reads of ssh command outputs."),
+    cfg.BoolOpt('ssh_persistent_connection',
+                default=False,
+                help="Run all the commands of a remote client over a single "
+                     "ssh connection instead of connecting for each one."),
     cfg.StrOpt('fixed_network_name',
                default='private',
                help="Visible fixed network name "),
@@ -585,9 +628,21 @@ StressGroup = [
     cfg.IntOpt('log_check_interval',
                default=60,
                help='time (in seconds) between log file error checks.'),
+    cfg.StrOpt('log_whitelist',
+               default=None,
+               help='Path to a whitelist of the log errors to ignore, in '
+                    'the format of etc/whitelist.yaml.'),
     cfg.IntOpt('default_thread_number_per_action',
                default=4,
                help='The number of threads created while stress test.'),
+    cfg.IntOpt('ssh_concurrency',
+               default=16,
+               help='Maximum number of nodes reached in parallel over ssh '
+                    'to check or clear their logs.'),
+    cfg.IntOpt('ssh_timeout',
+               default=60,
+               help='Timeout in seconds to connect and run a command on a '
+                    'node over ssh.'),
     cfg.BoolOpt('leave_dirty_stack',
                 default=False,
                 help='Prevent the cleaning (tearDownClass()) between'
@@ -666,6 +721,24 @@ DebugGroup = [
     cfg.BoolOpt('enable',
                 default=True,
                 help="Enable diagnostic commands"),
+    cfg.BoolOpt('request_timing',
+                default=False,
+                help="Time the REST requests, and log the time spent per "
+                     "API endpoint when the process exits"),
+    cfg.StrOpt('request_timing_report',
+               default=None,
+               help="File in which the time spent per API endpoint is also "
+                    "written, in JSON, when request_timing is enabled"),
+    cfg.IntOpt('request_log_sample_rate',
+               default=1,
+               help="Only log one of every N requests to each API "
+                    "endpoint, and the failed ones, to lower the logging "
+                    "cost of load runs. 1 logs all the requests"),
+    cfg.StrOpt('request_timing_log',
+               default=None,
+               help="File to which the REST requests, sleeps and SSH "
+                    "commands are appended with the test running them, to "
+                    "be analyzed by tools/timing_report.py"),
 ]
 
 input_scenario_group = cfg.OptGroup(name="input-scenario",
@@ -687,6 +760,15 @@ InputScenarioGroup = [
                default="[[\"^.*[Cc]irros.*$\", \"root\"]]",
                help="List of user mapped to regex "
                     "to matching image names."),
+    cfg.StrOpt('cache_dir',
+               default=None,
+               help="Directory caching the images and flavors matching the "
+                    "regexes, so that the tests are discovered without "
+                    "listing them, see tools/scenario_cache.py"),
+    cfg.IntOpt('cache_ttl',
+               default=3600,
+               help="Seconds after which the cached images and flavors "
+                    "are listed again"),
 ]
 
 
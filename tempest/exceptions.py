@@ -50,6 +50,10 @@ class InvalidConfiguration(TempestException):
     message = "Invalid Configuration"
 
 
+class ClientCreationError(TempestException):
+    message = "Creating the client %(name)s failed: %(reason)s"
+
+
 class RestClientException(TempestException,
                           testtools.TestCase.failureException):
     pass
@@ -79,6 +83,10 @@ class BuildErrorException(TempestException):
     message = "Server %(server_id)s failed to build and is in ERROR status"
 
 
+class ResourceErrorException(TempestException):
+    message = "Resource %(resource_id)s is in %(status)s status"
+
+
 class ImageKilledException(TempestException):
     message = "Image %(image_id)s 'killed' while waiting for '%(status)s'"
 
@@ -181,3 +189,14 @@ class ResponseWithEntity(RFCViolation):
 
 class InvalidHTTPResponseBody(RestClientException):
     message = "HTTP response body is invalid json or xml"
+
+
+class ChecksumMismatch(TempestException):
+    message = ("Checksum of %(name)s is %(actual)s, while %(expected)s "
+               "was expected")
+
+
+class InvalidRangeResponse(TempestException):
+    message = ("Range %(range)s of %(name)s returned %(length)d bytes with "
+               "status %(status)d, while %(size)d bytes with status 206 "
+               "were expected")
@@ -14,6 +14,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
 import logging
 import os
 import subprocess
@@ -29,10 +30,13 @@ from neutronclient.common import exceptions as exc
 import neutronclient.v2_0.client
 import novaclient.client
 from novaclient import exceptions as nova_exceptions
+import six
 import swiftclient
 
 from tempest.api.network import common as net_common
 from tempest.common import isolated_creds
+from tempest.common import ssh
+from tempest.common import teardown
 from tempest.common.utils import data_utils
 from tempest.common.utils.linux.remote_client import RemoteClient
 from tempest import config
@@ -281,43 +285,54 @@ class OfficialClientTest(tempest.test.BaseTestCase):
         # specific order, and because test methods in scenario tests
         # generally create resources in a particular order, we destroy
         # resources in the reverse order in which resources are added to
-        # the scenario test class object
-        while cls.os_resources:
-            thing = cls.os_resources.pop()
-            LOG.debug("Deleting %r from shared resources of %s" %
-                      (thing, cls.__name__))
+        # the scenario test class object.
+        # NOTE: the official clients share a single HTTP transport, which is
+        # not thread safe, so the resources are deleted one at a time.
+        cleaner = teardown.ResourceCleaner(max_workers=1)
+        for thing in cls.os_resources:
+            cleaner.add(repr(thing), functools.partial(cls._delete_thing,
+                                                       thing),
+                        kind=teardown.resource_kind(thing))
+        del cls.os_resources[:]
+        errors = cleaner.run()
+        if errors:
+            six.reraise(*errors[0][1])
+        cls.isolated_creds.clear_isolated_creds()
+        super(OfficialClientTest, cls).tearDownClass()
 
+    @classmethod
+    def _delete_thing(cls, thing):
+        LOG.debug("Deleting %r from shared resources of %s" %
+                  (thing, cls.__name__))
+        try:
+            # OpenStack resources are assumed to have a delete()
+            # method which destroys the resource...
+            thing.delete()
+        except Exception as e:
+            # If the resource is already missing, mission accomplished.
+            # add status code as workaround for bug 1247568
+            if (e.__class__.__name__ == 'NotFound' or
+                hasattr(e, 'status_code') and e.status_code == 404):
+                return
+            raise
+
+        def is_deletion_complete():
+            # Deletion testing is only required for objects whose
+            # existence cannot be checked via retrieval.
+            if isinstance(thing, dict):
+                return True
             try:
-                # OpenStack resources are assumed to have a delete()
-                # method which destroys the resource...
-                thing.delete()
+                thing.get()
             except Exception as e:
-                # If the resource is already missing, mission accomplished.
-                # add status code as workaround for bug 1247568
-                if (e.__class__.__name__ == 'NotFound' or
-                    hasattr(e, 'status_code') and e.status_code == 404):
-                    continue
-                raise
-
-            def is_deletion_complete():
-                # Deletion testing is only required for objects whose
-                # existence cannot be checked via retrieval.
-                if isinstance(thing, dict):
+                # Clients are expected to return an exception
+                # called 'NotFound' if retrieval fails.
+                if e.__class__.__name__ == 'NotFound':
                     return True
-                try:
-                    thing.get()
-                except Exception as e:
-                    # Clients are expected to return an exception
-                    # called 'NotFound' if retrieval fails.
-                    if e.__class__.__name__ == 'NotFound':
-                        return True
-                    raise
-                return False
+                raise
+            return False
 
-            # Block until resource deletion has completed or timed-out
-            tempest.test.call_until_true(is_deletion_complete, 10, 1)
-        cls.isolated_creds.clear_isolated_creds()
-        super(OfficialClientTest, cls).tearDownClass()
+        # Block until resource deletion has completed or timed-out
+        tempest.test.call_until_true(is_deletion_complete, 10, 1)
 
     @classmethod
     def set_resource(cls, key, thing):
@@ -528,7 +543,9 @@ class OfficialClientTest(tempest.test.BaseTestCase):
             username = CONF.scenario.ssh_user
         if private_key is None:
             private_key = self.keypair.private_key
-        return RemoteClient(ip, username, pkey=private_key)
+        linux_client = RemoteClient(ip, username, pkey=private_key)
+        self.addCleanup(linux_client.close)
+        return linux_client
 
     def _log_console_output(self, servers=None):
         if not servers:
@@ -784,18 +801,42 @@ class NetworkScenarioTest(OfficialClientTest):
         :raises: AssertError if the result of the connectivity check does
             not match the value of the should_connect param
         """
-        if should_connect:
-            msg = "Timed out waiting for %s to become reachable" % ip_address
-        else:
-            msg = "ip address %s is reachable" % ip_address
-        self.assertTrue(self._ping_ip_address(ip_address,
-                                              should_succeed=should_connect),
-                        msg=msg)
-        if should_connect:
+        self._check_vms_connectivity([(ip_address, private_key)], username,
+                                     should_connect=should_connect)
+
+    def _check_vms_connectivity(self, targets, username=None,
+                                should_connect=True):
+        """
+        Checks the connectivity of many servers like _check_vm_connectivity,
+        the ssh authentications run in parallel.
+
+        :param targets: list of (ip_address, private_key) tuples
+        """
+        for ip_address, _ in targets:
+            if should_connect:
+                msg = ("Timed out waiting for %s to become reachable" %
+                       ip_address)
+            else:
+                msg = "ip address %s is reachable" % ip_address
+            self.assertTrue(
+                self._ping_ip_address(ip_address,
+                                      should_succeed=should_connect),
+                msg=msg)
+        if not should_connect:
             # no need to check ssh for negative connectivity
-            linux_client = self.get_remote_client(ip_address, username,
-                                                  private_key)
-            linux_client.validate_authentication()
+            return
+        ssh_clients = [
+            self.get_remote_client(ip_address, username,
+                                   private_key).ssh_client
+            for ip_address, private_key in targets]
+        results = ssh.exec_command_on_hosts(ssh_clients, None)
+        failures = [(ip_address, result) for ip_address, result in
+                    sorted(results.items()) if result is not None]
+        for ip_address, result in failures:
+            LOG.error("ssh authentication to %s failed: %s",
+                      ip_address, result)
+        if failures:
+            raise failures[0][1]
 
     def _create_security_group_nova(self, client=None,
                                     namestart='secgroup-smoke-',
@@ -14,6 +14,7 @@
 #    under the License.
 
 from tempest.common.utils import data_utils
+from tempest.common import waiters
 from tempest import config
 from tempest.openstack.common import log as logging
 from tempest.scenario import manager
@@ -43,9 +44,12 @@ class TestLargeOpsScenario(manager.NetworkScenarioTest):
         super(TestLargeOpsScenario, cls).setUpClass()
 
     def _wait_for_server_status(self, status):
-        for server in self.servers:
-            self.status_timeout(
-                self.compute_client.servers, server.id, status)
+        # A single server list per interval instead of one get per server
+        waiters.wait_for_resources_status(
+            self.compute_client.servers.list,
+            [server.id for server in self.servers], status,
+            CONF.compute.build_interval, CONF.compute.build_timeout,
+            get_resource=self.compute_client.servers.get)
 
     def _wait_for_volume_status(self, status):
         volume_id = self.volume.id
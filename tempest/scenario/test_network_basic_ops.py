@@ -179,11 +179,12 @@ class TestNetworkBasicOps(manager.NetworkScenarioTest):
         # key-based authentication by cloud-init.
         ssh_login = CONF.compute.image_ssh_user
         try:
+            targets = []
             for server, key in self.servers.items():
                 for net_name, ip_addresses in server.networks.iteritems():
                     for ip_address in ip_addresses:
-                        self._check_vm_connectivity(ip_address, ssh_login,
-                                                    key.private_key)
+                        targets.append((ip_address, key.private_key))
+            self._check_vms_connectivity(targets, ssh_login)
         except Exception:
             LOG.exception('Tenant connectivity check failed')
             self._log_console_output(servers=self.servers.keys())
@@ -203,15 +204,15 @@ class TestNetworkBasicOps(manager.NetworkScenarioTest):
         ssh_login = CONF.compute.image_ssh_user
         LOG.debug('checking network connections')
         try:
+            targets = []
             for floating_ip, server in self.floating_ips.iteritems():
                 ip_address = floating_ip.floating_ip_address
                 private_key = None
                 if should_connect:
                     private_key = self.servers[server].private_key
-                self._check_vm_connectivity(ip_address,
-                                            ssh_login,
-                                            private_key,
-                                            should_connect=should_connect)
+                targets.append((ip_address, private_key))
+            self._check_vms_connectivity(targets, ssh_login,
+                                         should_connect=should_connect)
         except Exception:
             ex_msg = 'Public network connectivity check failed'
             if msg:
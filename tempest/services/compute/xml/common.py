@@ -14,11 +14,36 @@
 #    under the License.
 
 import collections
+from xml.sax import saxutils
 
 XMLNS_11 = "http://docs.openstack.org/compute/api/v1.1"
 XMLNS_V3 = "http://docs.openstack.org/compute/api/v1.1"
 
 
+# Characters to replace in the attribute values, and in the text
+_ATTR_ENTITIES = {'"': '&quot;'}
+_SPECIAL_CHARS = frozenset('&<>"')
+
+
+def _escape_text(value):
+    if not isinstance(value, basestring):
+        value = str(value)
+    # Most values have nothing to escape
+    if _SPECIAL_CHARS.isdisjoint(value):
+        return value
+    return saxutils.escape(value)
+
+
+def _escape_attr(value):
+    if value is None:
+        return ""
+    if not isinstance(value, basestring):
+        value = str(value)
+    if _SPECIAL_CHARS.isdisjoint(value):
+        return value
+    return saxutils.escape(value, _ATTR_ENTITIES)
+
+
 # NOTE(danms): This is just a silly implementation to help make generating
 # XML faster for prototyping. Could be replaced with proper etree gorp
 # if desired
@@ -34,23 +59,38 @@ class Element(object):
     def append(self, element):
         self._elements.append(element)
 
-    def __str__(self):
-        args = " ".join(['%s="%s"' %
-                        (k, v if v is not None else "")
-                        for k, v in self._attrs.items()])
-        string = '<%s %s' % (self.element_name, args)
-        if not self._elements:
-            string += '/>'
-            return string
-
-        string += '>'
+    def _start_tag(self, name):
+        if not self._attrs:
+            return '<%s ' % name
+        return '<%s %s' % (name, " ".join(['%s="%s"' % (k, _escape_attr(v))
+                                           for k, v in self._attrs.items()]))
 
+    def _write_children(self, write):
         for element in self._elements:
-            string += str(element)
-
-        string += '</%s>' % self.element_name
+            if isinstance(element, Element):
+                element.write(write)
+            else:
+                write(_escape_text(element))
+
+    def write(self, write):
+        """
+        Serializes the element by calling write with each part of it in
+        turn, the attribute values and the text being escaped. write may
+        append to a list, or send the parts to a file or a socket.
+        """
+        if not self._elements:
+            write(self._start_tag(self.element_name) + '/>')
+            return
+        write(self._start_tag(self.element_name) + '>')
+        self._write_children(write)
+        write('</%s>' % self.element_name)
 
-        return string
+    def __str__(self):
+        # The parts are joined once, instead of each element copying the
+        # serialization of its children
+        parts = []
+        self.write(parts.append)
+        return ''.join(parts)
 
     def __getitem__(self, name):
         for element in self._elements:
@@ -78,14 +118,9 @@ class Document(Element):
             kwargs['encoding'] = 'UTF-8'
         Element.__init__(self, '?xml', *args, **kwargs)
 
-    def __str__(self):
-        args = " ".join(['%s="%s"' %
-                        (k, v if v is not None else "")
-                        for k, v in self._attrs.items()])
-        string = '<?xml %s?>\n' % args
-        for element in self._elements:
-            string += str(element)
-        return string
+    def write(self, write):
+        write(self._start_tag('?xml') + '?>\n')
+        self._write_children(write)
 
 
 class Text(Element):
@@ -93,8 +128,8 @@ class Text(Element):
         Element.__init__(self, None)
         self.__content = content
 
-    def __str__(self):
-        return self.__content
+    def write(self, write):
+        write(_escape_text(self.__content))
 
 
 def parse_array(node, plurals=None):
@@ -111,34 +146,36 @@ def xml_to_json(node, plurals=None):
     and json structures are the same, then this "just works". In
     others, it requires a little hand-editing of the result.
     """
+    # NOTE: this runs for every element of every XML response, the
+    # children and attributes of the node are only fetched once
     json = {}
-    bool_flag = False
-    int_flag = False
-    long_flag = False
-    for attr in node.keys():
+    value_type = None
+    for attr, value in node.items():
         if not attr.startswith("xmlns"):
-            json[attr] = node.get(attr)
-            if json[attr] == 'bool':
-                bool_flag = True
-            elif json[attr] == 'int':
-                int_flag = True
-            elif json[attr] == 'long':
-                long_flag = True
-    if not node.getchildren():
-        if bool_flag:
+            json[attr] = value
+            # The bool type wins over int, which wins over long
+            if value == 'bool':
+                value_type = value
+            elif value == 'int' and value_type != 'bool':
+                value_type = value
+            elif value == 'long' and value_type is None:
+                value_type = value
+    children = node.getchildren()
+    if not children:
+        if value_type is None:
+            return node.text or json
+        elif value_type == 'bool':
             return node.text == 'True'
-        elif int_flag:
+        elif value_type == 'int':
             return int(node.text)
-        elif long_flag:
-            return long(node.text)
         else:
-            return node.text or json
-    for child in node.getchildren():
+            return long(node.text)
+    for child in children:
         tag = child.tag
-        if tag.startswith("{"):
+        if tag[0] == "{":
             ns, tag = tag.split("}", 1)
         if plurals is not None and tag in plurals:
-                json[tag] = parse_array(child, plurals)
+            json[tag] = parse_array(child, plurals)
         else:
             json[tag] = xml_to_json(child, plurals)
     return json
@@ -271,8 +271,8 @@ class TokenClientJSON(RestClient):
             headers = {}
 
         self._log_request(method, url, headers, body)
-        resp, resp_body = self.http_obj.request(url, method,
-                                                headers=headers, body=body)
+        resp, resp_body = self._http_request(url, method,
+                                             headers=headers, body=body)
         self._log_response(resp, resp_body)
 
         if resp.status in [401, 403]:
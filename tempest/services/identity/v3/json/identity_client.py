@@ -513,8 +513,8 @@ class V3TokenClientJSON(RestClient):
     def request(self, method, url, headers=None, body=None):
         """A simple HTTP request interface."""
         self._log_request(method, url, headers, body)
-        resp, resp_body = self.http_obj.request(url, method,
-                                                headers=headers, body=body)
+        resp, resp_body = self._http_request(url, method,
+                                             headers=headers, body=body)
         self._log_response(resp, resp_body)
 
         if resp.status in [401, 403]:
@@ -52,12 +52,10 @@ class CredentialsClientXML(RestClientXML):
     def create_credential(self, access_key, secret_key, user_id, project_id):
         """Creates a credential."""
         cred_type = 'ec2'
-        access = "&quot;access&quot;: &quot;%s&quot;" % access_key
-        secret = "&quot;secret&quot;: &quot;%s&quot;" % secret_key
         blob = Element('blob',
                        xmlns=XMLNS)
-        blob.append(Text("{%s , %s}"
-                         % (access, secret)))
+        blob.append(Text(json.dumps({'access': access_key,
+                                     'secret': secret_key})))
         credential = Element('credential', project_id=project_id,
                              type=cred_type, user_id=user_id)
         credential.append(blob)
@@ -75,12 +73,10 @@ class CredentialsClientXML(RestClientXML):
         secret_key = kwargs.get('secret_key', body['blob']['secret'])
         project_id = kwargs.get('project_id', body['project_id'])
         user_id = kwargs.get('user_id', body['user_id'])
-        access = "&quot;access&quot;: &quot;%s&quot;" % access_key
-        secret = "&quot;secret&quot;: &quot;%s&quot;" % secret_key
         blob = Element('blob',
                        xmlns=XMLNS)
-        blob.append(Text("{%s , %s}"
-                         % (access, secret)))
+        blob.append(Text(json.dumps({'access': access_key,
+                                     'secret': secret_key})))
         credential = Element('credential', project_id=project_id,
                              type=cred_type, user_id=user_id)
         credential.append(blob)
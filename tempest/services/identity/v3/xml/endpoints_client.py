@@ -15,7 +15,6 @@
 
 from lxml import etree
 
-from tempest.common import http
 from tempest.common.rest_client import RestClientXML
 from tempest import config
 from tempest.services.compute.xml.common import Document
@@ -49,9 +48,7 @@ class EndPointClientXML(RestClientXML):
 
     def request(self, method, url, headers=None, body=None, wait=None):
         """Overriding the existing HTTP request in super class RestClient."""
-        dscv = CONF.identity.disable_ssl_certificate_validation
-        self.http_obj = http.ClosingHttp(
-            disable_ssl_certificate_validation=dscv)
+        self.http_obj = self._get_http()
         return super(EndPointClientXML, self).request(method, url,
                                                       headers=headers,
                                                       body=body)
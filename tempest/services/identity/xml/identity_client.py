@@ -291,8 +291,8 @@ class TokenClientXML(RestClientXML):
         # converted to the corresponding JSON one
         headers['Accept'] = 'application/json'
         self._log_request(method, url, headers, body)
-        resp, resp_body = self.http_obj.request(url, method,
-                                                headers=headers, body=body)
+        resp, resp_body = self._http_request(url, method,
+                                             headers=headers, body=body)
         self._log_response(resp, resp_body)
 
         if resp.status in [401, 403]:
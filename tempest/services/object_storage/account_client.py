@@ -16,7 +16,6 @@
 import json
 import urllib
 
-from tempest.common import http
 from tempest.common.rest_client import RestClient
 from tempest import config
 from tempest import exceptions
@@ -151,7 +150,7 @@ class AccountClientCustomizedHeader(RestClient):
 
     def request(self, method, url, headers=None, body=None):
         """A simple HTTP request interface."""
-        self.http_obj = http.ClosingHttp()
+        self.http_obj = self._get_http()
         if headers is None:
             headers = {}
 
@@ -162,9 +161,9 @@ class AccountClientCustomizedHeader(RestClient):
         )
         self._log_request(method, req_url, headers, body)
         # use original body
-        resp, resp_body = self.http_obj.request(req_url, method,
-                                                headers=req_headers,
-                                                body=req_body)
+        resp, resp_body = self._http_request(req_url, method,
+                                             headers=req_headers,
+                                             body=req_body)
         self._log_response(resp, resp_body)
 
         if resp.status == 401 or resp.status == 403:
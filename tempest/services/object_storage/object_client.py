@@ -13,31 +13,381 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import hashlib
+import json
+import mmap
+import os
+import socket
+import time
 import urllib
+import urlparse
+
+import httplib2
 
 from tempest.common import http
+from tempest.common import request_timing
+from tempest.common.rest_client import MAX_RECURSION_DEPTH
 from tempest.common.rest_client import RestClient
+from tempest.common.utils import misc
 from tempest import config
 from tempest import exceptions
 
 CONF = config.CONF
 
+# Size of the chunks read from the upload sources and from the responses
+CHUNK_SIZE = 64 * 1024
+
+# Default size of the segments of the large objects
+SEGMENT_SIZE = 16 * 1024 * 1024
+
+
+def is_stream(data):
+    """
+    Tells whether the data of an object is a file object, an mmap or an
+    iterator of strings, which are sent without being read in memory.
+    """
+    return data is not None and not isinstance(data, basestring)
+
+
+def content_length(data):
+    """
+    Returns the number of bytes left to read from the data, or None if it is
+    not known, e.g. for an iterator or a pipe.
+    """
+    if isinstance(data, basestring):
+        return len(data)
+    if isinstance(data, mmap.mmap):
+        return len(data) - data.tell()
+    try:
+        return os.fstat(data.fileno()).st_size - data.tell()
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+
+
+def iter_chunks(data, chunk_size=CHUNK_SIZE):
+    """Yields the data in strings of at most chunk_size bytes."""
+    if isinstance(data, basestring):
+        yield data
+    elif hasattr(data, 'read'):
+        while True:
+            chunk = data.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        for chunk in data:
+            if chunk:
+                yield chunk
+
+
+class FileSegment(object):
+    """
+    File object reading size bytes of a file from offset, and computing
+    their MD5 checksum as they are read.
+    """
+
+    def __init__(self, path, offset, size):
+        self.size = size
+        self.checksum = hashlib.md5()
+        self._file = open(path, 'rb')
+        self._file.seek(offset)
+        self._left = size
+
+    def read(self, size=-1):
+        if size < 0 or size > self._left:
+            size = self._left
+        data = self._file.read(size)
+        self._left -= len(data)
+        self.checksum.update(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def rewinder(data):
+    """
+    Returns a callable moving the data back to its current position, to
+    send it again, or None if it can only be read once, e.g. an iterator or
+    a pipe.
+    """
+    if data is None or isinstance(data, basestring):
+        return lambda: None
+    try:
+        position = data.tell()
+        data.seek(position)
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+    return lambda: data.seek(position)
+
+
+def _file_checksum(path, chunk_size=CHUNK_SIZE):
+    checksum = hashlib.md5()
+    with open(path, 'rb') as data_file:
+        for chunk in iter_chunks(data_file, chunk_size):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+class StreamingResponse(object):
+    """
+    Iterator of the chunks of a response body, which releases the connection
+    once read. It must be closed if it is not read to the end.
+
+    :param on_close: callable called once with the StreamingResponse, instead
+                     of closing the connection
+    """
+
+    def __init__(self, connection, response, chunk_size=CHUNK_SIZE,
+                 on_close=None):
+        self.connection = connection
+        self.response = response
+        self.chunk_size = chunk_size
+        self.on_close = on_close
+        # Bytes of the body read so far, and whether it was read to the end
+        self.length = 0
+        self.complete = False
+        self._closed = False
+
+    def __iter__(self):
+        try:
+            while True:
+                chunk = self.response.read(self.chunk_size)
+                if not chunk:
+                    self.complete = True
+                    return
+                self.length += len(chunk)
+                yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self.on_close is not None:
+            self.on_close(self)
+        else:
+            self.connection.close()
+
+
+class BaseObjectClient(RestClient):
+    """
+    Sends the requests of the object storage clients, and streams the
+    object data which RestClient would hold in memory, and log, as a whole.
+    """
 
-class ObjectClient(RestClient):
     def __init__(self, auth_provider):
-        super(ObjectClient, self).__init__(auth_provider)
-
+        super(BaseObjectClient, self).__init__(auth_provider)
         self.service = CONF.object_storage.catalog_type
 
-    def create_object(self, container, object_name, data, params=None):
-        """Create storage object."""
+    def stream_request(self, method, url, headers=None, body=None,
+                       length=None, chunk_size=CHUNK_SIZE):
+        """
+        Sends a request whose body is read from body, a string, a file
+        object, an mmap or an iterator of strings, chunk_size bytes at a
+        time. The body is sent with a Content-Length of length, if given or
+        known, and chunked otherwise.
+
+        Like RestClient.request, it borrows the keep-alive connections of
+        the client, reports its timing to the request_timing listeners once
+        the body is read, and retries the requests rate limited with a 413.
+        A request is only sent again, on a 413 or on a stale keep-alive
+        connection, if its body can be rewound: an iterator or a pipe fails
+        instead.
+
+        Returns the response and a StreamingResponse of its body. The error
+        responses are read and raise the exceptions of RestClient.
+        """
+        headers = dict(headers or {})
+        if body is not None:
+            if length is None:
+                length = content_length(body)
+            if length is None:
+                headers['Transfer-Encoding'] = 'chunked'
+            else:
+                headers['Content-Length'] = str(length)
+        rewind = rewinder(body)
+        retry = 0
+        while True:
+            resp, resp_body = self._stream_request(
+                method, url, headers, body, length, chunk_size, rewind)
+            if resp.status < 400:
+                return resp, resp_body
+            resp_body = ''.join(resp_body)
+            if (resp.status != 413 or 'retry-after' not in resp or
+                    rewind is None or retry >= MAX_RECURSION_DEPTH or
+                    self.is_absolute_limit(resp,
+                                           self._parse_resp(resp_body))):
+                break
+            retry += 1
+            time.sleep(int(resp['retry-after']))
+            rewind()
+        # NOTE: raises for every error status
+        self._error_checker(method, url, headers, None, resp, resp_body)
+
+    def _get_connection(self, parts, pool, reuse=True):
+        """
+        Returns a (connection, http_obj, reused) tuple. With a keep-alive
+        pool, the connection is the one of http_obj, an entry of the pool,
+        and reused tells whether it was open already.
+        """
+        key = '%s:%s' % (parts.scheme, parts.netloc)
+        http_obj, reused = None, False
+        if pool is not None:
+            if reuse:
+                http_obj, reused = pool.get(key)
+            else:
+                http_obj = httplib2.Http(
+                    disable_ssl_certificate_validation=pool.dscv)
+            if key in http_obj.connections:
+                return http_obj.connections[key], http_obj, reused
+        kwargs = {}
+        if parts.scheme == 'https':
+            kwargs['disable_ssl_certificate_validation'] = (
+                CONF.identity.disable_ssl_certificate_validation)
+        connection = http.TIMED_CONNECTIONS[parts.scheme](parts.netloc,
+                                                          **kwargs)
+        if http_obj is not None:
+            http_obj.connections[key] = connection
+        return connection, http_obj, reused
+
+    @staticmethod
+    def _send(connection, method, path, headers, body, length, chunk_size):
+        """Sends a request, returns the number of bytes of its body."""
+        connection.putrequest(method, path, skip_accept_encoding=True)
+        for name, value in headers.items():
+            connection.putheader(name, value)
+        connection.endheaders()
+        sent = 0
+        if body is not None:
+            chunked = length is None
+            for chunk in iter_chunks(body, chunk_size):
+                if chunked:
+                    connection.send('%x\r\n' % len(chunk))
+                connection.send(chunk)
+                if chunked:
+                    connection.send('\r\n')
+                sent += len(chunk)
+            if chunked:
+                connection.send('0\r\n\r\n')
+        return sent
+
+    def _stream_request(self, method, url, headers, body, length, chunk_size,
+                        rewind, reuse=True):
+        req_url, req_headers, _ = self.auth_provider.auth_request(
+            method, url, headers, None, self.filters)
+        self._log_request(method, req_url, req_headers, None)
+
+        parts = urlparse.urlparse(req_url)
+        path = parts.path
+        if parts.query:
+            path += '?' + parts.query
+        pool = getattr(self.http_obj, 'pool', None)
+        start = time.time()
+        http.timing.reset(start)
+        connection, http_obj, reused = self._get_connection(parts, pool,
+                                                            reuse)
+        try:
+            sent = self._send(connection, method, path, req_headers, body,
+                              length, chunk_size)
+            response = connection.getresponse()
+        except http.STALE_CONNECTION_ERRORS as e:
+            connection.close()
+            if pool is not None:
+                pool.discard(http_obj)
+            if not reused or isinstance(e, socket.timeout) or rewind is None:
+                raise
+            self.LOG.debug("Stale keep-alive connection to %s, retrying",
+                           parts.netloc)
+            rewind()
+            return self._stream_request(method, url, headers, body, length,
+                                        chunk_size, rewind, reuse=False)
+        except Exception:
+            connection.close()
+            if pool is not None:
+                pool.discard(http_obj)
+            raise
+        # The timing of the thread may be reset before the body is read
+        connect, first_byte = http.timing.connect, http.timing.first_byte
+        resp = httplib2.Response(response)
+        self._log_response(resp, None)
+
+        def on_close(stream):
+            if (pool is not None and stream.complete and
+                    not response.will_close):
+                pool.put('%s:%s' % (parts.scheme, parts.netloc), http_obj)
+            else:
+                connection.close()
+                if pool is not None:
+                    pool.discard(http_obj)
+            if request_timing.has_listeners():
+                request_timing.notify(request_timing.RequestEvent(
+                    start=start, service=self.service, method=method,
+                    url=request_timing.url_template(req_url),
+                    status=resp.status, request_bytes=sent,
+                    response_bytes=stream.length, connect=connect,
+                    first_byte=first_byte, total=time.time() - start))
+
+        return resp, StreamingResponse(connection, response, chunk_size,
+                                       on_close)
+
+    def _put_stream(self, url, data, headers, length=None,
+                    chunk_size=CHUNK_SIZE):
+        resp, body = self.stream_request('PUT', url, headers, data,
+                                         length=length, chunk_size=chunk_size)
+        return resp, ''.join(body)
+
+    def get_object_stream(self, container, object_name, headers=None,
+                          chunk_size=CHUNK_SIZE):
+        """
+        Retrieves an object's data as an iterator of chunks of at most
+        chunk_size bytes.
+        """
+        url = "%s/%s" % (str(container), str(object_name))
+        return self.stream_request('GET', url, headers,
+                                   chunk_size=chunk_size)
+
+    def download_object(self, container, object_name, dest, headers=None,
+                        chunk_size=CHUNK_SIZE):
+        """
+        Writes an object's data to dest, a path or a file object, holding at
+        most chunk_size bytes in memory. Returns the response and the MD5
+        checksum of the data, to compare with its etag.
+        """
+        resp, body = self.get_object_stream(container, object_name, headers,
+                                            chunk_size)
+        checksum = hashlib.md5()
+        dest_file = open(dest, 'wb') if isinstance(dest, basestring) else dest
+        try:
+            for chunk in body:
+                checksum.update(chunk)
+                dest_file.write(chunk)
+        finally:
+            body.close()
+            if dest_file is not dest:
+                dest_file.close()
+        return resp, checksum.hexdigest()
+
+
+class ObjectClient(BaseObjectClient):
+
+    def create_object(self, container, object_name, data, params=None,
+                      length=None, chunk_size=CHUNK_SIZE):
+        """
+        Create storage object. data is either a string or a file object, an
+        mmap or an iterator of strings, which is streamed; see
+        stream_request.
+        """
 
         headers = dict(self.headers)
-        if not data:
-            headers['content-length'] = '0'
         url = "%s/%s" % (str(container), str(object_name))
         if params:
             url += '?%s' % urllib.urlencode(params)
+        if is_stream(data):
+            return self._put_stream(url, data, headers, length, chunk_size)
+        if not data:
+            headers['content-length'] = '0'
 
         resp, body = self.put(url, data, headers)
         return resp, body
@@ -128,14 +478,138 @@ class ObjectClient(RestClient):
         resp, body = self.copy(url, headers=headers)
         return resp, body
 
-    def create_object_segments(self, container, object_name, segment, data):
-        """Creates object segments."""
+    def create_object_segments(self, container, object_name, segment, data,
+                               length=None, chunk_size=CHUNK_SIZE):
+        """Creates object segments, data may be streamed like in
+        create_object.
+        """
         url = "{0}/{1}/{2}".format(container, object_name, segment)
+        if is_stream(data):
+            return self._put_stream(url, data, self.headers, length,
+                                    chunk_size)
         resp, body = self.put(url, data, self.headers)
         return resp, body
 
-
-class ObjectClientCustomizedHeader(RestClient):
+    def _upload_segment(self, container, object_name, segment, path, offset,
+                        size):
+        data = FileSegment(path, offset, size)
+        try:
+            resp, _ = self.create_object_segments(container, object_name,
+                                                  segment, data, length=size)
+        finally:
+            data.close()
+        checksum = data.checksum.hexdigest()
+        if resp.get('etag', checksum) != checksum:
+            raise exceptions.ChecksumMismatch(
+                name='%s/%s/%s' % (container, object_name, segment),
+                actual=resp['etag'], expected=checksum)
+        return {'path': '/%s/%s/%s' % (container, object_name, segment),
+                'etag': checksum,
+                'size_bytes': size}
+
+    def upload_large_object(self, container, object_name, path,
+                            segment_size=SEGMENT_SIZE, max_workers=4,
+                            static=False, segment_container=None):
+        """
+        Uploads a file as a large object: its segments of segment_size bytes
+        are uploaded in parallel from at most max_workers threads, as
+        object_name/00000000, object_name/00000001... in segment_container,
+        then the manifest is created.
+
+        :param static: create a static large object (SLO) manifest instead
+                       of a dynamic one (DLO)
+        :param segment_container: container of the segments, container by
+                                  default
+        :returns: the response to the creation of the manifest, and the list
+                  of the path, etag and size_bytes of the segments
+        """
+        segment_container = segment_container or container
+        size = os.path.getsize(path)
+        args_list = [(segment_container, object_name, '%08d' % index, path,
+                      offset, min(segment_size, size - offset))
+                     for index, offset in enumerate(
+                         xrange(0, size, segment_size))]
+        segments = misc.run_concurrently(self._upload_segment, args_list,
+                                         max_workers)
+        if static:
+            resp, _ = self.create_object(container, object_name,
+                                         json.dumps(segments),
+                                         params={'multipart-manifest': 'put'})
+        else:
+            headers = dict(self.headers)
+            headers['X-Object-Manifest'] = '%s/%s/' % (segment_container,
+                                                       object_name)
+            headers['content-length'] = '0'
+            url = "%s/%s" % (str(container), str(object_name))
+            resp, _ = self.put(url, None, headers)
+        return resp, segments
+
+    def _download_range(self, container, object_name, path, offset, size,
+                        chunk_size):
+        byte_range = 'bytes=%d-%d' % (offset, offset + size - 1)
+        resp, body = self.get_object_stream(container, object_name,
+                                            {'Range': byte_range}, chunk_size)
+        checksum = hashlib.md5()
+        length = 0
+        try:
+            # A 200 would write the whole object at the offset
+            if resp.status == 206:
+                with open(path, 'r+b') as dest_file:
+                    dest_file.seek(offset)
+                    for chunk in body:
+                        checksum.update(chunk)
+                        dest_file.write(chunk)
+                        length += len(chunk)
+        finally:
+            body.close()
+        if resp.status != 206 or length != size:
+            raise exceptions.InvalidRangeResponse(
+                range=byte_range, name='%s/%s' % (container, object_name),
+                length=length, status=resp.status, size=size)
+        return checksum.hexdigest()
+
+    def download_large_object(self, container, object_name, path,
+                              range_size=SEGMENT_SIZE, max_workers=4,
+                              checksum=None, chunk_size=CHUNK_SIZE):
+        """
+        Downloads an object to the file path with ranged GETs of range_size
+        bytes, sent in parallel from at most max_workers threads, and
+        verifies the file:
+
+        - against checksum, the MD5 checksum of the whole data, if given
+        - against the etag otherwise; the etag of a large object is the MD5
+          checksum of the checksums of its segments, range_size must then be
+          the size of the segments
+
+        :returns: the response to the HEAD request of the object, and the
+                  MD5 checksum of the file
+        """
+        resp, _ = self.list_object_metadata(container, object_name)
+        size = int(resp['content-length'])
+        with open(path, 'wb') as dest_file:
+            dest_file.truncate(size)
+        args_list = [(container, object_name, path, offset,
+                      min(range_size, size - offset), chunk_size)
+                     for offset in xrange(0, size, range_size)]
+        range_checksums = misc.run_concurrently(self._download_range,
+                                                args_list, max_workers)
+        file_checksum = _file_checksum(path, chunk_size)
+        etag = resp.get('etag', '')
+        if checksum is not None:
+            expected, actual = checksum, file_checksum
+        elif etag.startswith('"'):
+            expected = etag.strip('"')
+            actual = hashlib.md5(''.join(range_checksums)).hexdigest()
+        else:
+            expected, actual = etag, file_checksum
+        if actual != expected:
+            raise exceptions.ChecksumMismatch(
+                name='%s/%s' % (container, object_name), actual=actual,
+                expected=expected)
+        return resp, file_checksum
+
+
+class ObjectClientCustomizedHeader(BaseObjectClient):
 
     # TODO(andreaf) This class is now redundant, to be removed in next patch
 
@@ -143,14 +617,11 @@ class ObjectClientCustomizedHeader(RestClient):
         super(ObjectClientCustomizedHeader, self).__init__(
             auth_provider)
         # Overwrites json-specific header encoding in RestClient
-        self.service = CONF.object_storage.catalog_type
         self.format = 'json'
 
     def request(self, method, url, headers=None, body=None):
         """A simple HTTP request interface."""
-        dscv = CONF.identity.disable_ssl_certificate_validation
-        self.http_obj = http.ClosingHttp(
-            disable_ssl_certificate_validation=dscv)
+        self.http_obj = self._get_http()
         if headers is None:
             headers = {}
 
@@ -161,9 +632,9 @@ class ObjectClientCustomizedHeader(RestClient):
         )
         # Use original method
         self._log_request(method, req_url, headers, body)
-        resp, resp_body = self.http_obj.request(req_url, method,
-                                                headers=req_headers,
-                                                body=req_body)
+        resp, resp_body = self._http_request(req_url, method,
+                                             headers=req_headers,
+                                             body=req_body)
         self._log_response(resp, resp_body)
         if resp.status == 401 or resp.status == 403:
             raise exceptions.Unauthorized()
@@ -181,14 +652,20 @@ class ObjectClientCustomizedHeader(RestClient):
         resp, body = self.get(url, headers=headers)
         return resp, body
 
-    def create_object(self, container, object_name, data, metadata=None):
-        """Create storage object."""
+    def create_object(self, container, object_name, data, metadata=None,
+                      length=None, chunk_size=CHUNK_SIZE):
+        """Create storage object, data may be streamed like in
+        ObjectClient.create_object.
+        """
 
         headers = {}
         if metadata:
             for key in metadata:
                 headers[str(key)] = metadata[key]
 
+        if is_stream(data):
+            url = "%s/%s" % (str(container), str(object_name))
+            return self._put_stream(url, data, headers, length, chunk_size)
         if not data:
             headers['content-length'] = '0'
         url = "%s/%s" % (str(container), str(object_name))
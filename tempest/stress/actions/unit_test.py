@@ -56,6 +56,10 @@ class UnitTest(stressaction.StressAction):
 
         if self.class_setup_per == SetUpClassRunTime.application:
             self.klass.setUpClass()
+        # The class is set up and torn down under the other threads of a
+        # process otherwise
+        self.shares_process = (self.class_setup_per ==
+                               SetUpClassRunTime.application)
         self.setupclass_called = False
 
     @property
@@ -15,88 +15,114 @@
 #    limitations under the License.
 
 from tempest import clients
+from tempest.common import teardown
 from tempest.openstack.common import log as logging
 
 LOG = logging.getLogger(__name__)
 
 
-def cleanup():
-    admin_manager = clients.AdminManager()
-
-    _, body = admin_manager.servers_client.list_servers({"all_tenants": True})
-    LOG.info("Cleanup::remove %s servers" % len(body['servers']))
-    for s in body['servers']:
+def _ignore_errors(func, *args):
+    def call():
         try:
-            admin_manager.servers_client.delete_server(s['id'])
+            func(*args)
         except Exception:
             pass
+    return call
 
-    for s in body['servers']:
-        try:
-            admin_manager.servers_client.wait_for_server_termination(s['id'])
-        except Exception:
-            pass
-
-    _, keypairs = admin_manager.keypairs_client.list_keypairs()
-    LOG.info("Cleanup::remove %s keypairs" % len(keypairs))
-    for k in keypairs:
-        try:
-            admin_manager.keypairs_client.delete_keypair(k['name'])
-        except Exception:
-            pass
 
-    _, floating_ips = admin_manager.floating_ips_client.list_floating_ips()
-    LOG.info("Cleanup::remove %s floating ips" % len(floating_ips))
-    for f in floating_ips:
-        try:
-            admin_manager.floating_ips_client.delete_floating_ip(f['id'])
-        except Exception:
-            pass
+def cleanup():
+    admin_manager = clients.AdminManager()
+    # Resources are added in the reverse order of their deletion: snapshots
+    # go before volumes, floating ips and volumes after servers, tenants and
+    # users after all the rest, everything else is deleted in parallel. The
+    # requests of each thread are sent with its own copy of the clients.
+    cleaner = teardown.ResourceCleaner()
+    call = teardown.client_call
+
+    identity_client = admin_manager.identity_client
+    _, tenants = identity_client.list_tenants()
+    tenants = [t for t in tenants if t['name'].startswith("stress_tenant")]
+    LOG.info("Cleanup::remove %s tenants" % len(tenants))
+    for tenant in tenants:
+        cleaner.add('tenant %s' % tenant['id'],
+                    call(identity_client, 'delete_tenant', tenant['id']),
+                    kind='tenant')
 
-    _, users = admin_manager.identity_client.get_users()
+    _, users = identity_client.get_users()
+    users = [u for u in users if u['name'].startswith("stress_user")]
     LOG.info("Cleanup::remove %s users" % len(users))
     for user in users:
-        if user['name'].startswith("stress_user"):
-            admin_manager.identity_client.delete_user(user['id'])
+        cleaner.add('user %s' % user['id'],
+                    call(identity_client, 'delete_user', user['id']),
+                    kind='user')
 
-    _, tenants = admin_manager.identity_client.list_tenants()
-    LOG.info("Cleanup::remove %s tenants" % len(tenants))
-    for tenant in tenants:
-        if tenant['name'].startswith("stress_tenant"):
-            admin_manager.identity_client.delete_tenant(tenant['id'])
+    volumes_client = admin_manager.volumes_client
+    _, vols = volumes_client.list_volumes({"all_tenants": True})
+    LOG.info("Cleanup::remove %s volumes" % len(vols))
+    for v in vols:
+        cleaner.add(
+            'volume %s' % v['id'],
+            _ignore_errors(_delete_volume, volumes_client, v['id']),
+            wait=_ignore_errors(call(volumes_client,
+                                     'wait_for_resource_deletion', v['id'])),
+            kind='volume')
 
     # We have to delete snapshots first or
     # volume deletion may block
 
-    _, snaps = admin_manager.snapshots_client.\
-        list_snapshots({"all_tenants": True})
+    snapshots_client = admin_manager.snapshots_client
+    _, snaps = snapshots_client.list_snapshots({"all_tenants": True})
     LOG.info("Cleanup::remove %s snapshots" % len(snaps))
     for v in snaps:
-        try:
-            admin_manager.snapshots_client.\
-                wait_for_snapshot_status(v['id'], 'available')
-            admin_manager.snapshots_client.delete_snapshot(v['id'])
-        except Exception:
-            pass
+        cleaner.add(
+            'snapshot %s' % v['id'],
+            _ignore_errors(_delete_snapshot, snapshots_client, v['id']),
+            wait=_ignore_errors(call(snapshots_client,
+                                     'wait_for_resource_deletion', v['id'])),
+            kind='snapshot')
+
+    floating_ips_client = admin_manager.floating_ips_client
+    _, floating_ips = floating_ips_client.list_floating_ips()
+    LOG.info("Cleanup::remove %s floating ips" % len(floating_ips))
+    for f in floating_ips:
+        cleaner.add(
+            'floating ip %s' % f['id'],
+            _ignore_errors(call(floating_ips_client, 'delete_floating_ip',
+                                f['id'])),
+            kind='floating_ip')
+
+    keypairs_client = admin_manager.keypairs_client
+    _, keypairs = keypairs_client.list_keypairs()
+    LOG.info("Cleanup::remove %s keypairs" % len(keypairs))
+    for k in keypairs:
+        cleaner.add(
+            'keypair %s' % k['name'],
+            _ignore_errors(call(keypairs_client, 'delete_keypair',
+                                k['name'])),
+            kind='keypair')
+
+    servers_client = admin_manager.servers_client
+    _, body = servers_client.list_servers({"all_tenants": True})
+    LOG.info("Cleanup::remove %s servers" % len(body['servers']))
+    for s in body['servers']:
+        cleaner.add(
+            'server %s' % s['id'],
+            _ignore_errors(call(servers_client, 'delete_server', s['id'])),
+            wait=_ignore_errors(call(servers_client,
+                                     'wait_for_server_termination', s['id'])),
+            kind='server')
 
-    for v in snaps:
-        try:
-            admin_manager.snapshots_client.wait_for_resource_deletion(v['id'])
-        except Exception:
-            pass
+    cleaner.run()
 
-    _, vols = admin_manager.volumes_client.list_volumes({"all_tenants": True})
-    LOG.info("Cleanup::remove %s volumes" % len(vols))
-    for v in vols:
-        try:
-            admin_manager.volumes_client.\
-                wait_for_volume_status(v['id'], 'available')
-            admin_manager.volumes_client.delete_volume(v['id'])
-        except Exception:
-            pass
 
-    for v in vols:
-        try:
-            admin_manager.volumes_client.wait_for_resource_deletion(v['id'])
-        except Exception:
-            pass
+def _delete_volume(volumes_client, volume_id):
+    # A volume is still detaching for a while after its server is deleted
+    volumes_client = teardown.thread_client(volumes_client)
+    volumes_client.wait_for_volume_status(volume_id, 'available')
+    volumes_client.delete_volume(volume_id)
+
+
+def _delete_snapshot(snapshots_client, snapshot_id):
+    snapshots_client = teardown.thread_client(snapshots_client)
+    snapshots_client.wait_for_snapshot_status(snapshot_id, 'available')
+    snapshots_client.delete_snapshot(snapshot_id)
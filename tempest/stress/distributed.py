@@ -0,0 +1,339 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Runs a stress job from many load generator hosts.
+
+An agent runs on each host and waits for a coordinator to connect. The
+coordinator splits the tests of the stress json file among the agents, and
+they talk over TCP with JSON messages, one per line:
+
+- coordinator -> agent: {"type": "job", ...}, the tests of the agent and
+  the arguments of driver.stress_openstack
+- agent -> coordinator: {"type": "ready"} once the job is received
+- coordinator -> agent: {"type": "start"} once all the agents are ready
+- agent -> coordinator: {"type": "stats", "elapsed": ..., "actions": ...}
+  every report interval, with the stats.Snapshot of each action
+- coordinator -> agent: {"type": "stop"} to stop the run early
+- agent -> coordinator: {"type": "done", "result": ...} with the result
+  code of stress_openstack
+
+The agents do not authenticate the coordinator, and run whatever action
+class it names, so they only listen on the loopback interface unless
+another address is given explicitly.
+"""
+
+import copy
+import json
+import socket
+import threading
+import time
+
+from tempest import config
+from tempest.openstack.common import log as logging
+from tempest.stress import cleanup
+from tempest.stress import driver
+from tempest.stress import stats
+
+CONF = config.CONF
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_PORT = 7351
+REPORT_INTERVAL = 5
+
+
+def parse_address(address, default_host='localhost'):
+    """Returns the (host, port) tuple of a 'host:port' or 'port' string."""
+    host, _, port = address.rpartition(':')
+    return host or default_host, int(port or DEFAULT_PORT)
+
+
+def split_tests(tests, agents):
+    """
+    Splits the tests of a stress job among agents.
+
+    The threads of each test are shared out among the agents, and so is
+    the rate of the tests run in open loop.
+
+    :returns: a list of the tests of each agent
+    """
+    jobs = [[] for _ in xrange(agents)]
+    for test in tests:
+        threads = test.get('threads')
+        if threads is None:
+            threads = CONF.stress.default_thread_number_per_action
+        for index, job in enumerate(jobs):
+            share = threads // agents + (1 if index < threads % agents else 0)
+            if not share:
+                continue
+            agent_test = copy.deepcopy(test)
+            agent_test['threads'] = share
+            ratio = float(share) / threads
+            if 'rate' in test:
+                agent_test['rate'] = test['rate'] * ratio
+            if 'steps' in test:
+                agent_test['steps'] = [[duration, rate * ratio]
+                                       for duration, rate in test['steps']]
+            if test.get('seed') is not None:
+                agent_test['seed'] = test['seed'] + index * 1000
+            job.append(agent_test)
+    return jobs
+
+
+class _Channel(object):
+    """JSON messages over a socket, one per line."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._file = sock.makefile('rb')
+        self._lock = threading.Lock()
+
+    def send(self, **message):
+        data = json.dumps(message) + '\n'
+        with self._lock:
+            self.sock.sendall(data)
+
+    def receive(self):
+        """Returns the next message, None once the connection is closed."""
+        try:
+            line = self._file.readline()
+        except (socket.error, ValueError):
+            # ValueError if the channel was closed meanwhile
+            return None
+        if not line:
+            return None
+        return json.loads(line)
+
+    def close(self):
+        self._file.close()
+        self.sock.close()
+
+
+class Agent(object):
+    """Runs the stress jobs sent by a coordinator."""
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, runner=None):
+        """
+        :param runner: callable running a job, stress_openstack by default
+        """
+        self.runner = runner or driver.stress_openstack
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((host, port))
+        self._server.listen(1)
+
+    @property
+    def address(self):
+        return self._server.getsockname()
+
+    def serve(self, jobs=None):
+        """Runs the jobs of the coordinators connecting, one at a time.
+
+        :param jobs: number of jobs to run, no limit by default
+        """
+        LOG.info("Stress agent listening on %s:%d" % self.address)
+        count = 0
+        while jobs is None or count < jobs:
+            sock, peer = self._server.accept()
+            LOG.info("Coordinator %s:%d connected" % peer)
+            channel = _Channel(sock)
+            try:
+                self.run_job(channel)
+            except Exception:
+                LOG.exception("Failure of the job of %s:%d" % peer)
+            finally:
+                channel.close()
+            count += 1
+
+    def close(self):
+        self._server.close()
+
+    def run_job(self, channel):
+        job = channel.receive()
+        if job is None or job['type'] != 'job':
+            return
+        channel.send(type='ready')
+        message = channel.receive()
+        if message is None or message['type'] != 'start':
+            return
+        stop = threading.Event()
+
+        def listen():
+            # Any message or the loss of the coordinator stops the run
+            channel.receive()
+            stop.set()
+
+        listener = threading.Thread(target=listen)
+        listener.daemon = True
+        listener.start()
+
+        def reporter(processes, elapsed):
+            snapshots = stats.snapshot([(process['action'],
+                                         process['statistic'])
+                                        for process in processes])
+            try:
+                channel.send(type='stats', elapsed=elapsed,
+                             actions=dict((action, snapshot.to_dict())
+                                          for action, snapshot
+                                          in snapshots.items()))
+            except socket.error:
+                LOG.error("Lost the coordinator, stopping")
+                stop.set()
+
+        try:
+            # The cleanup deletes the resources of all the agents, the
+            # coordinator runs it once they all finished
+            result = self.runner(job['tests'], job['duration'],
+                                 job['max_runs'], job['stop_on_error'],
+                                 reporters=[reporter],
+                                 report_interval=job['report_interval'],
+                                 stop_event=stop, clean_up=False)
+        except Exception:
+            LOG.exception("Failure in the stress test framework")
+            result = 1
+        channel.send(type='done', result=result)
+
+
+class Coordinator(object):
+    """Runs a stress job on agents and gathers their statistics."""
+
+    def __init__(self, agents, report_interval=REPORT_INTERVAL,
+                 connect_timeout=60, reporters=(), clean_up=None):
+        """
+        :param agents: list of (host, port) of the agents
+        :param reporters: called like the reporters of stress_openstack,
+                          with the last statistics of all the agents
+        :param clean_up: callable run once all the agents succeeded,
+                         cleanup.cleanup by default
+        """
+        self.agents = agents
+        self.clean_up = clean_up or cleanup.cleanup
+        self.report_interval = report_interval
+        self.reporters = reporters
+        self.connect_timeout = connect_timeout
+        # Last statistics received from each agent, see _receive
+        self.snapshots = {}
+        self.elapsed = {}
+        self.results = {}
+        self._channels = {}
+
+    def stop(self):
+        """Stops the run on all the agents."""
+        for agent, channel in self._channels.items():
+            if agent in self.results:
+                continue
+            try:
+                channel.send(type='stop')
+            except socket.error:
+                pass
+
+    def _receive(self, agent, channel, stop_on_error):
+        while True:
+            message = channel.receive()
+            if message is None:
+                LOG.error("Lost the stress agent %s:%d" % agent)
+                self.results[agent] = 1
+                break
+            if message['type'] == 'stats':
+                self.elapsed[agent] = message['elapsed']
+                self.snapshots[agent] = dict(
+                    (action, stats.Snapshot.from_dict(data))
+                    for action, data in message['actions'].items())
+            elif message['type'] == 'done':
+                self.results[agent] = message['result']
+                break
+        if self.results[agent] != 0:
+            LOG.error("Stress agent %s:%d failed" % agent)
+            if stop_on_error:
+                self.stop()
+
+    def _workers(self):
+        workers = []
+        for snapshots in self.snapshots.values():
+            workers.extend(snapshots.items())
+        return workers, max(self.elapsed.values() or [0])
+
+    def summarize(self):
+        """Aggregates the last statistics of all the agents by action."""
+        return stats.summarize(*self._workers())
+
+    def _report(self):
+        workers, elapsed = self._workers()
+        processes = [{'action': action, 'statistic': snapshot}
+                     for action, snapshot in workers]
+        for reporter in self.reporters:
+            reporter(processes, elapsed)
+
+    def run(self, tests, duration, max_runs=None, stop_on_error=False):
+        """
+        Runs the tests on the agents until they all finished.
+
+        :returns: 0 if all the agents succeeded, 1 otherwise
+        """
+        jobs = [(agent, agent_tests) for agent, agent_tests
+                in zip(self.agents, split_tests(tests, len(self.agents)))
+                if agent_tests]
+        try:
+            for agent, agent_tests in jobs:
+                sock = socket.create_connection(agent, self.connect_timeout)
+                sock.settimeout(None)
+                channel = _Channel(sock)
+                self._channels[agent] = channel
+                channel.send(type='job', tests=agent_tests,
+                             duration=duration, max_runs=max_runs,
+                             stop_on_error=stop_on_error,
+                             report_interval=self.report_interval)
+            # The agents only start once all of them got their job
+            for agent, channel in self._channels.items():
+                message = channel.receive()
+                if message is None or message['type'] != 'ready':
+                    raise socket.error("Stress agent %s:%d not ready" % agent)
+            for channel in self._channels.values():
+                channel.send(type='start')
+            LOG.info("Started the stress job on %d agents" % len(jobs))
+            receivers = [threading.Thread(target=self._receive,
+                                          args=(agent, channel,
+                                                stop_on_error))
+                         for agent, channel in self._channels.items()]
+            for receiver in receivers:
+                receiver.daemon = True
+                receiver.start()
+            next_report = time.time() + self.report_interval
+            try:
+                for receiver in receivers:
+                    # A join with a timeout lets KeyboardInterrupt in
+                    while receiver.is_alive():
+                        receiver.join(1)
+                        if time.time() >= next_report:
+                            next_report += self.report_interval
+                            self._report()
+            except KeyboardInterrupt:
+                LOG.info("Stopping the stress agents")
+                self.stop()
+                for receiver in receivers:
+                    receiver.join()
+        finally:
+            for channel in self._channels.values():
+                channel.close()
+
+        self._report()
+        LOG.info("Statistics (per action, all agents):")
+        for action, summary in self.summarize().items():
+            LOG.info(" %s: %s" % (action, driver.format_summary(summary)))
+        if any(self.results.get(agent) != 0 for agent, _ in jobs):
+            return 1
+        LOG.info("cleaning up")
+        self.clean_up()
+        return 0
@@ -15,6 +15,8 @@
 import multiprocessing
 import os
 import signal
+import sys
+import threading
 import time
 
 from tempest import clients
@@ -25,15 +27,23 @@ from tempest import exceptions
 from tempest.openstack.common import importutils
 from tempest.openstack.common import log as logging
 from tempest.stress import cleanup
+from tempest.stress import logwatch
+from tempest.stress import schedule
+from tempest.stress import stats
 
 CONF = config.CONF
 
 LOG = logging.getLogger(__name__)
+
+# Seconds given to the runs in progress to end on a shutdown, before the
+# actions are torn down
+SHUTDOWN_TIMEOUT = 60
 processes = []
 
 
 def do_ssh(command, host, ssh_user, ssh_key=None):
-    ssh_client = ssh.Client(host, ssh_user, key_filename=ssh_key)
+    ssh_client = ssh.Client(host, ssh_user, key_filename=ssh_key,
+                            timeout=CONF.stress.ssh_timeout)
     try:
         return ssh_client.exec_command(command)
     except exceptions.SSHExecCommandFailed:
@@ -42,6 +52,26 @@ def do_ssh(command, host, ssh_user, ssh_key=None):
         return None
 
 
+def do_ssh_on_hosts(command, hosts, ssh_user, ssh_key=None):
+    """
+    Runs command on all the hosts in parallel, see do_ssh.
+
+    :returns: a dict mapping each host to the command output, None if the
+              command failed there.
+    """
+    clients = [ssh.Client(host, ssh_user, key_filename=ssh_key,
+                          timeout=CONF.stress.ssh_timeout)
+               for host in hosts]
+    results = ssh.exec_command_on_hosts(
+        clients, command, max_workers=CONF.stress.ssh_concurrency)
+    for host, result in results.items():
+        if isinstance(result, Exception):
+            LOG.error('do_ssh raise exception. command:%s, host:%s: %s'
+                      % (command, host, result))
+            results[host] = None
+    return results
+
+
 def _get_compute_nodes(controller, ssh_user, ssh_key=None):
     """
     Returns a list of active compute nodes. List is generated by running
@@ -61,21 +91,21 @@ def _get_compute_nodes(controller, ssh_user, ssh_key=None):
     return nodes
 
 
-def _has_error_in_logs(logfiles, nodes, ssh_user, ssh_key=None,
-                       stop_on_error=False):
-    """
-    Detect errors in the nova log files on the controller and compute nodes.
-    """
-    grep = 'egrep "ERROR|TRACE" %s' % logfiles
-    ret = False
-    for node in nodes:
-        errors = do_ssh(grep, node, ssh_user, ssh_key)
-        if len(errors) > 0:
-            LOG.error('%s: %s' % (node, errors))
-            ret = True
-            if stop_on_error:
-                break
-    return ret
+def format_summary(summary):
+    """Formats the summary of an action made by stats.summarize."""
+    latencies = ', '.join(
+        '%s %s' % (name, 'n/a' if summary[name] is None else
+                   '%.3fs' % summary[name])
+        for name in ['mean'] + ['p%d' % p for p in stats.PERCENTILES])
+    text = ("Run %d actions (%d failed), %.2f actions/s, latency: %s" %
+            (summary['runs'], summary['fails'], summary['throughput'],
+             latencies))
+    if 'missed' in summary:
+        text += ", %d missed deadlines, queueing delay: %s" % (
+            summary['missed'],
+            ', '.join('p%d %.3fs' % (p, summary['queue_p%d' % p])
+                      for p in stats.PERCENTILES))
+    return text
 
 
 def sigchld_handler(signal, frame):
@@ -107,10 +137,100 @@ def terminate_all_processes(check_interval=20):
         process['process'].join()
 
 
-def stress_openstack(tests, duration, max_runs=None, stop_on_error=False):
+def _join(threads, timeout):
+    """Waits at most timeout seconds in all for the threads to end."""
+    deadline = time.time() + timeout
+    for thread in threads:
+        thread.join(max(0, deadline - time.time()))
+    running = len([thread for thread in threads if thread.is_alive()])
+    if running:
+        LOG.warning("%d stress threads still running after %ds" %
+                    (running, timeout))
+
+
+def _tear_down(actions):
+    for action in actions:
+        try:
+            action.tearDown()
+        except Exception:
+            action.logger.exception("Error while tearDown")
+
+
+def run_closed_loop(actions, statistics):
+    """
+    Runs each action in its own thread until it reached its max_runs, see
+    StressAction.run_loop. Target of the closed-loop worker processes.
+
+    The process exits with 1 as soon as an action stopped due to the
+    "stop-on-error" argument, after all the actions were torn down.
+    """
+    stop = threading.Event()
+    failed = []
+
+    def worker(action, statistic):
+        if not action.run_loop(statistic, stop):
+            failed.append(action)
+            stop.set()
+
+    threads = [threading.Thread(target=worker, args=(action, statistic))
+               for action, statistic in zip(actions, statistics)]
+
+    def shutdown_handler(signum, frame):
+        # The actions are only torn down once their runs ended
+        stop.set()
+        _join(threads, SHUTDOWN_TIMEOUT)
+        _tear_down(actions)
+        sys.exit(0)
+
+    signal.signal(signal.SIGHUP, shutdown_handler)
+    signal.signal(signal.SIGTERM, shutdown_handler)
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        # A join with a timeout lets the signal handlers run meanwhile
+        while thread.is_alive():
+            thread.join(1)
+    if failed:
+        _tear_down(actions)
+        sys.exit(1)
+
+
+def run_open_loop(actions, statistics, profile, duration=None,
+                  max_runs=None):
+    """
+    Runs a pool of actions at the rate of an arrival profile, see
+    schedule.OpenLoopScheduler. Target of the open-loop worker processes.
+    """
+    scheduler = schedule.OpenLoopScheduler(actions, statistics, profile)
+
+    def shutdown_handler(signum, frame):
+        scheduler.stop()
+        _join(scheduler.threads, SHUTDOWN_TIMEOUT)
+        _tear_down(actions)
+        sys.exit(0)
+
+    signal.signal(signal.SIGHUP, shutdown_handler)
+    signal.signal(signal.SIGTERM, shutdown_handler)
+    scheduler.run(duration, max_runs)
+
+
+def stress_openstack(tests, duration, max_runs=None, stop_on_error=False,
+                     reporters=(), report_interval=None, stop_event=None,
+                     clean_up=True):
     """
     Workload driver. Executes an action function against a nova-cluster.
+
+    :param reporters: callables called every report_interval seconds, and
+                      once the workers are terminated, with the process
+                      list and the seconds elapsed since the start
+    :param stop_event: threading.Event stopping the run when set
+    :param clean_up: whether to delete all the stress resources of the
+                     cloud once the run succeeded, see cleanup.cleanup
     """
+    del processes[:]
+    if stop_event is None:
+        stop_event = threading.Event()
     admin_manager = clients.AdminManager()
 
     ssh_user = CONF.stress.target_ssh_user
@@ -121,14 +241,26 @@ def stress_openstack(tests, duration, max_runs=None, stop_on_error=False):
     if logfiles:
         controller = CONF.stress.target_controller
         computes = _get_compute_nodes(controller, ssh_user, ssh_key)
-        for node in computes:
-            do_ssh("rm -f %s" % logfiles, node, ssh_user, ssh_key)
+        do_ssh_on_hosts("rm -f %s" % logfiles, computes, ssh_user, ssh_key)
+        whitelist = None
+        if CONF.stress.log_whitelist:
+            whitelist = logwatch.load_whitelist(CONF.stress.log_whitelist)
+        log_watcher = logwatch.LogWatcher(
+            logfiles, ssh_user, ssh_key, whitelist=whitelist,
+            timeout=CONF.stress.ssh_timeout,
+            max_workers=CONF.stress.ssh_concurrency)
+    workers = sum(test.get('threads', default_thread_num) for test in tests)
+    statistics = stats.Statistics(workers)
     for test in tests:
-        if test.get('use_admin', False):
-            manager = admin_manager
-        else:
-            manager = clients.Manager()
-        for p_number in xrange(test.get('threads', default_thread_num)):
+        threads = test.get('threads', default_thread_num)
+        # The threads of a test share its processes, which are only needed
+        # to use more than one core
+        process_num = max(1, min(test.get('processes', 1), threads))
+        runs = []
+        for p_number in xrange(threads):
+            # NOTE: the http objects of the clients are not thread safe, so
+            # every thread gets its own manager. They share their tokens
+            # through the process wide token cache.
             if test.get('use_isolated_tenants', False):
                 username = data_utils.rand_name("stress_user")
                 tenant_name = data_utils.rand_name("stress_tenant")
@@ -142,6 +274,10 @@ def stress_openstack(tests, duration, max_runs=None, stop_on_error=False):
                 manager = clients.Manager(username=username,
                                           password="pass",
                                           tenant_name=tenant_name)
+            elif test.get('use_admin', False):
+                manager = clients.AdminManager()
+            else:
+                manager = clients.Manager()
 
             test_obj = importutils.import_class(test['action'])
             test_run = test_obj(manager, max_runs, stop_on_error)
@@ -152,25 +288,42 @@ def stress_openstack(tests, duration, max_runs=None, stop_on_error=False):
             LOG.debug("calling Target Object %s" %
                       test_run.__class__.__name__)
 
-            mp_manager = multiprocessing.Manager()
-            shared_statistic = mp_manager.dict()
-            shared_statistic['runs'] = 0
-            shared_statistic['fails'] = 0
-
-            p = multiprocessing.Process(target=test_run.execute,
-                                        args=(shared_statistic,))
-
-            process = {'process': p,
+            shared_statistic = statistics.worker(len(processes))
+            process = {'process': None,
                        'p_number': p_number,
                        'action': test_run.action,
                        'statistic': shared_statistic}
-
             processes.append(process)
+            runs.append((test_run, process))
+        if not all(test_run.shares_process for test_run, _ in runs):
+            process_num = threads
+        pools = [runs[index::process_num] for index in xrange(process_num)]
+        for index, pool in enumerate(pools):
+            if not pool:
+                continue
+            actions, pool_processes = zip(*pool)
+            pool_statistics = [entry['statistic'] for entry in pool_processes]
+            profile = schedule.get_profile(test, process_num, index)
+            if profile is None:
+                p = multiprocessing.Process(
+                    target=run_closed_loop, args=(actions, pool_statistics))
+            else:
+                p = multiprocessing.Process(
+                    target=run_open_loop,
+                    args=(actions, pool_statistics, profile, duration,
+                          max_runs))
+            for entry in pool_processes:
+                entry['process'] = p
             p.start()
     if stop_on_error:
         # NOTE(mkoderer): only the parent should register the handler
         signal.signal(signal.SIGCHLD, sigchld_handler)
-    end_time = time.time() + duration
+    start_time = time.time()
+    end_time = start_time + duration
+    next_log_check = start_time + log_check_interval
+    interval = log_check_interval
+    if reporters and report_interval:
+        interval = min(interval, report_interval)
     had_errors = False
     while True:
         if max_runs is None:
@@ -178,7 +331,7 @@ def stress_openstack(tests, duration, max_runs=None, stop_on_error=False):
             if remaining <= 0:
                 break
         else:
-            remaining = log_check_interval
+            remaining = interval
             all_proc_term = True
             for process in processes:
                 if process['process'].is_alive():
@@ -187,20 +340,30 @@ def stress_openstack(tests, duration, max_runs=None, stop_on_error=False):
             if all_proc_term:
                 break
 
-        time.sleep(min(remaining, log_check_interval))
+        if stop_event.wait(min(remaining, interval)):
+            LOG.info("Stress run stopped")
+            break
+        for reporter in reporters:
+            reporter(processes, time.time() - start_time)
         if stop_on_error:
             for process in processes:
                 if process['statistic']['fails'] > 0:
                     break
 
-        if not logfiles:
+        if not logfiles or time.time() < next_log_check:
             continue
-        if _has_error_in_logs(logfiles, computes, ssh_user, ssh_key,
-                              stop_on_error):
+        next_log_check += log_check_interval
+        errors = log_watcher.check(computes)
+        for node, logfile, trace in errors:
+            LOG.error('%s: %s: %s' % (node, logfile, trace))
+        if errors:
             had_errors = True
             break
 
+    elapsed = time.time() - start_time
     terminate_all_processes()
+    for reporter in reporters:
+        reporter(processes, elapsed)
 
     sum_fails = 0
     sum_runs = 0
@@ -216,11 +379,17 @@ def stress_openstack(tests, duration, max_runs=None, stop_on_error=False):
                   process['action'],
                   process['statistic']['runs'],
                      process['statistic']['fails']))
+    LOG.info("Statistics (per action):")
+    summaries = stats.summarize(
+        [(process['action'], process['statistic']) for process in processes],
+        elapsed)
+    for action, summary in summaries.items():
+        LOG.info(" %s: %s" % (action, format_summary(summary)))
     LOG.info("Summary:")
     LOG.info("Run %d actions (%d failed)" %
              (sum_runs, sum_fails))
 
-    if not had_errors:
+    if not had_errors and clean_up:
         LOG.info("cleaning up")
         cleanup.cleanup()
     if had_errors:
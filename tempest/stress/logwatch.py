@@ -0,0 +1,191 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import pipes
+import re
+
+import yaml
+
+from tempest.common import ssh
+from tempest.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+# Same log line format as tools/find_stack_traces.py, plus CRITICAL
+NOVA_TIMESTAMP = r"\d\d\d\d-\d\d-\d\d \d\d:\d\d:\d\d\.\d\d\d"
+NOVA_REGEX = re.compile(
+    r"(?P<timestamp>%s) (?P<pid>\d+ )?(?P<level>(ERROR|CRITICAL|TRACE)) "
+    r"(?P<module>[\w\.]+) (?P<msg>.*)" % NOVA_TIMESTAMP)
+
+# Parts of the traces which differ between two occurrences of the same error
+VOLATILE_REGEX = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|"
+    r"0x[0-9a-f]+|\b\d+\b")
+
+HEADER_REGEX = re.compile(r"^==> (?P<size>\d+) (?P<end>\d+) (?P<name>.*) <==$")
+
+
+class StackTrace(object):
+    """ERROR, CRITICAL and TRACE lines logged together."""
+
+    def __init__(self, timestamp, pid, level, module, msg):
+        self.timestamp = timestamp
+        self.pid = pid
+        self.level = level
+        self.module = module
+        self.lines = [msg]
+
+    def is_same(self, data):
+        return (data['timestamp'] == self.timestamp and
+                data['level'] == self.level)
+
+    @property
+    def signature(self):
+        """Identifies the occurrences of a same error."""
+        return (self.level, self.module,
+                VOLATILE_REGEX.sub('#', '\n'.join(self.lines)))
+
+    def __str__(self):
+        return "<%s %s %s>\n%s" % (self.timestamp, self.level, self.module,
+                                   '\n'.join(self.lines))
+
+
+def find_stack_traces(lines):
+    """Groups the error lines like tools/find_stack_traces.py does."""
+    traces = []
+    trace = None
+    for line in lines:
+        m = NOVA_REGEX.match(line)
+        if not m:
+            trace = None
+            continue
+        data = m.groupdict()
+        if trace is not None and trace.is_same(data):
+            trace.lines.append(data['msg'])
+        else:
+            trace = StackTrace(data['timestamp'], data['pid'], data['level'],
+                               data['module'], data['msg'])
+            traces.append(trace)
+    return traces
+
+
+def load_whitelist(path):
+    """Loads a whitelist file in the format of etc/whitelist.yaml."""
+    with open(path) as whitelist_file:
+        return yaml.safe_load(whitelist_file) or {}
+
+
+class LogWatcher(object):
+    """
+    Incrementally scans log files of remote nodes for new errors.
+
+    Only the bytes written since the previous check are fetched, as the
+    offset reached in each file of each node is remembered. An error is
+    reported the first time it is seen, and not at all if it matches the
+    whitelist entries of the log file. Like in tools/check_logs.py the
+    whitelist is keyed by service name (e.g. n-cpu): the entries of a
+    service apply to the log files whose name contain it.
+    """
+
+    def __init__(self, logfiles, ssh_user, ssh_key=None, whitelist=None,
+                 timeout=60, max_workers=16):
+        """
+        :param logfiles: shell pattern of the log files on the nodes
+        :param whitelist: dict of whitelist entries by service name
+        """
+        self.logfiles = logfiles
+        self.ssh_user = ssh_user
+        self.ssh_key = ssh_key
+        self.whitelist = whitelist or {}
+        self.timeout = timeout
+        self.max_workers = max_workers
+        # Offset of the end of the last complete line read, by node and file
+        self.offsets = {}
+        self.seen = set()
+
+    def _command(self, node):
+        """Prints the new content of each file after a header line."""
+        offsets = ''.join("%s) off=%d;; " % (pipes.quote(name), offset)
+                          for (host, name), offset in self.offsets.items()
+                          if host == node)
+        return ('for f in %(logfiles)s; do [ -f "$f" ] || continue; '
+                'size=$(stat -c %%s "$f"); '
+                'case "$f" in %(offsets)s*) off=0;; esac; '
+                '[ "$size" -lt "$off" ] && off=0; '
+                'echo "==> $((size - off)) $size $f <=="; '
+                'tail -c +$((off + 1)) "$f" | head -c $((size - off)); '
+                'done' % {'logfiles': self.logfiles, 'offsets': offsets})
+
+    def _parse(self, node, output):
+        """Yields the file names and complete new lines of each file."""
+        pos = 0
+        while pos < len(output):
+            eol = output.find('\n', pos)
+            if eol == -1:
+                break
+            m = HEADER_REGEX.match(output[pos:eol])
+            if not m:
+                LOG.warning("Unexpected log output from %s: %s",
+                            node, output[pos:eol])
+                break
+            size, end = int(m.group('size')), int(m.group('end'))
+            content = output[eol + 1:eol + 1 + size]
+            pos = eol + 1 + size
+            # An incomplete last line is read again with the next check
+            complete = content.rfind('\n') + 1
+            self.offsets[(node, m.group('name'))] = end - size + complete
+            yield m.group('name'), content[:complete].splitlines()
+
+    def _is_whitelisted(self, name, trace):
+        basename = os.path.basename(name)
+        line = "%s %s" % (trace.module, trace.lines[0])
+        for service, entries in self.whitelist.items():
+            if service not in basename:
+                continue
+            for entry in entries or []:
+                pattern = ".*%s.*%s.*" % (entry['module'].replace('.', '\\.'),
+                                          entry['message'])
+                if re.match(pattern, line):
+                    return True
+        return False
+
+    def check(self, nodes):
+        """
+        Scans what was logged on the nodes since the previous check.
+
+        :returns: a list of (node, file name, StackTrace) of the errors seen
+                  for the first time.
+        """
+        clients = [ssh.Client(node, self.ssh_user, key_filename=self.ssh_key,
+                              timeout=self.timeout)
+                   for node in nodes]
+        results = ssh.exec_command_on_hosts(clients, self._command,
+                                            max_workers=self.max_workers)
+        errors = []
+        for node, output in sorted(results.items()):
+            if isinstance(output, Exception):
+                LOG.error("Failed to read the logs of %s: %s", node, output)
+                continue
+            for name, lines in self._parse(node, output):
+                for trace in find_stack_traces(lines):
+                    if trace.signature in self.seen:
+                        continue
+                    self.seen.add(trace.signature)
+                    if self._is_whitelisted(name, trace):
+                        LOG.debug("Whitelisted error in %s:%s: %s",
+                                  node, name, trace)
+                        continue
+                    errors.append((node, name, trace))
+        return errors
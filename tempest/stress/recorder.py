@@ -0,0 +1,112 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import csv
+import json
+import os
+import time
+
+from tempest.stress import stats
+
+FIELDS = (['time', 'elapsed', 'action', 'runs', 'fails', 'in_flight',
+           'throughput', 'errors'] +
+          ['p%d' % percent for percent in stats.PERCENTILES])
+
+
+def summary_path(path):
+    """Returns the path of the summary of a time series file."""
+    return os.path.splitext(path)[0] + '.summary.json'
+
+
+class Recorder(object):
+    """
+    Records the statistics of a stress run as a time series.
+
+    It is a reporter of driver.stress_openstack: each call appends a sample
+    by action to the file, and rewrites the summary of the run so far. The
+    file is in CSV if its name ends with .csv, in JSON lines otherwise. The
+    fields of a sample are:
+
+    - time: when it was taken, in seconds since the epoch
+    - elapsed: seconds since the start of the run
+    - runs, fails: totals since the start of the run
+    - in_flight: runs in progress
+    - throughput, errors: runs per second and failed runs since the previous
+      sample
+    - p50, p95, p99: latency percentiles in seconds of the runs which ended
+      since the previous sample, empty if none did
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.summary_path = summary_path(path)
+        self.csv = path.endswith('.csv')
+        new = not os.path.exists(path) or not os.path.getsize(path)
+        self._file = open(path, 'ab')
+        if self.csv:
+            self._writer = csv.DictWriter(self._file, FIELDS)
+            if new:
+                self._writer.writerow(dict(zip(FIELDS, FIELDS)))
+        # Last snapshot and elapsed time of each action
+        self._previous = {}
+
+    def _sample(self, action, snapshot, now, elapsed):
+        previous, previous_elapsed = self._previous.get(action, (None, 0))
+        # A snapshot with fewer runs starts a new stress run
+        if previous is None or snapshot['runs'] < previous['runs']:
+            previous, previous_elapsed = stats.Snapshot(), 0
+        self._previous[action] = (snapshot, elapsed)
+        interval = elapsed - previous_elapsed
+        runs = snapshot['runs'] - previous['runs']
+        histogram = stats.Histogram(
+            [count - previous_count for count, previous_count
+             in zip(snapshot.histogram().counts,
+                    previous.histogram().counts)])
+        sample = {'time': round(now, 3),
+                  'elapsed': round(elapsed, 3),
+                  'action': action,
+                  'runs': snapshot['runs'],
+                  'fails': snapshot['fails'],
+                  'in_flight': snapshot['in_flight'],
+                  'throughput': round(runs / interval, 3) if interval else 0,
+                  'errors': snapshot['fails'] - previous['fails']}
+        for percent in stats.PERCENTILES:
+            sample['p%d' % percent] = histogram.percentile(percent)
+        return sample
+
+    def __call__(self, processes, elapsed):
+        now = time.time()
+        workers = [(process['action'], process['statistic'])
+                   for process in processes]
+        for action, snapshot in stats.snapshot(workers).items():
+            sample = self._sample(action, snapshot, now, elapsed)
+            if self.csv:
+                self._writer.writerow(sample)
+            else:
+                self._file.write(json.dumps(sample, sort_keys=True) + '\n')
+        self._file.flush()
+        self.write_summary(workers, elapsed)
+
+    def write_summary(self, workers, elapsed):
+        """Replaces the summary file, never leaving it partially written."""
+        summary = {'time': round(time.time(), 3),
+                   'elapsed': round(elapsed, 3),
+                   'actions': stats.summarize(workers, elapsed)}
+        temp_path = self.summary_path + '.tmp'
+        with open(temp_path, 'wb') as summary_file:
+            json.dump(summary, summary_file, indent=2, sort_keys=True)
+        os.rename(temp_path, self.summary_path)
+
+    def close(self):
+        self._file.close()
@@ -26,7 +26,9 @@ except ImportError:
     from unittest2 import loader
 
 from tempest.openstack.common import log as logging
+from tempest.stress import distributed
 from tempest.stress import driver
+from tempest.stress import recorder
 
 LOG = logging.getLogger(__name__)
 
@@ -72,23 +74,46 @@ def discover_stress_tests(path="./", filter_attr=None, call_inherited=False):
 
 def main(ns):
     result = 0
+    if ns.agent:
+        host, port = distributed.parse_address(ns.agent,
+                                               default_host='127.0.0.1')
+        distributed.Agent(host, port).serve()
+        return result
+    if not ns.all and not ns.tests:
+        parser.error("one of the arguments -a/--all -t/--tests is required")
     if not ns.all:
         tests = json.load(open(ns.tests, 'r'))
     else:
         tests = discover_stress_tests(filter_attr=ns.type,
                                       call_inherited=ns.call_inherited)
 
+    reporters = []
+    if ns.record:
+        reporters.append(recorder.Recorder(ns.record))
+
+    if ns.agents:
+        agents = [distributed.parse_address(agent)
+                  for agent in ns.agents.split(',')]
+
+        def run(tests, duration, max_runs, stop_on_error):
+            coordinator = distributed.Coordinator(
+                agents, report_interval=ns.record_interval,
+                reporters=reporters)
+            return coordinator.run(tests, duration, max_runs, stop_on_error)
+    else:
+        def run(tests, duration, max_runs, stop_on_error):
+            return driver.stress_openstack(tests, duration, max_runs,
+                                           stop_on_error, reporters,
+                                           ns.record_interval)
+
     if ns.serial:
         for test in tests:
-            step_result = driver.stress_openstack([test],
-                                                  ns.duration,
-                                                  ns.number,
-                                                  ns.stop)
+            step_result = run([test], ns.duration, ns.number, ns.stop)
             # NOTE(mkoderer): we just save the last result code
             if (step_result != 0):
                 result = step_result
     else:
-        driver.stress_openstack(tests, ns.duration, ns.number, ns.stop)
+        result = run(tests, ns.duration, ns.number, ns.stop)
     return result
 
 
@@ -101,7 +126,21 @@ parser.add_argument('-S', '--stop', action='store_true',
                     default=False, help="Stop on first error")
 parser.add_argument('-n', '--number', type=int,
                     help="How often an action is executed for each process")
-group = parser.add_mutually_exclusive_group(required=True)
+parser.add_argument('--agents',
+                    help="Comma separated host:port of the stress agents "
+                         "among which the tests are split")
+parser.add_argument('--agent', metavar='[HOST:]PORT',
+                    help="Run as a stress agent listening on this address, "
+                         "on 127.0.0.1 unless HOST is given. The agent runs "
+                         "the jobs of anyone who can connect to it")
+parser.add_argument('--record', metavar='FILE',
+                    help="Append the statistics of each action sampled "
+                         "during the run to FILE, in CSV if it ends with "
+                         ".csv and in JSON lines otherwise. The summary of "
+                         "the run is written next to it in JSON")
+parser.add_argument('--record-interval', type=int, default=10,
+                    help="Seconds between two samples of the statistics")
+group = parser.add_mutually_exclusive_group()
 group.add_argument('-a', '--all', action='store_true',
                    help="Execute all stress tests")
 parser.add_argument('-T', '--type',
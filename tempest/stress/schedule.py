@@ -0,0 +1,177 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import Queue
+import random
+import threading
+import time
+
+from tempest import exceptions
+
+
+class ConstantRate(object):
+    """Arrivals evenly spaced at rate per second."""
+
+    def __init__(self, rate):
+        self.rate = float(rate)
+
+    def arrivals(self):
+        """Yields the arrival times in seconds from the start."""
+        count = 0
+        while True:
+            yield count / self.rate
+            count += 1
+
+
+class PoissonRate(object):
+    """Arrivals of a Poisson process of rate per second."""
+
+    def __init__(self, rate, seed=None):
+        self.rate = float(rate)
+        self.random = random.Random(seed)
+
+    def arrivals(self):
+        arrival = 0.0
+        while True:
+            yield arrival
+            arrival += self.random.expovariate(self.rate)
+
+
+class StepRate(object):
+    """Constant rate arrivals, changing rate at each step.
+
+    The arrivals stop at the end of the last step.
+    """
+
+    def __init__(self, steps):
+        """:param steps: list of (duration, rate) tuples"""
+        self.steps = [(float(duration), float(rate))
+                      for duration, rate in steps]
+
+    def arrivals(self):
+        step_start = 0.0
+        for duration, rate in self.steps:
+            if rate > 0:
+                count = 0
+                while count / rate < duration:
+                    yield step_start + count / rate
+                    count += 1
+            step_start += duration
+
+
+def get_profile(test, processes=1, index=0):
+    """
+    Returns the arrival profile of a test of the stress json file, None if
+    it runs in closed loop. The test keys used are:
+
+    - rate: runs per second, for the constant and poisson profiles
+    - profile: constant (the default), poisson or step
+    - steps: list of [duration, rate] for the step profile
+    - seed: random seed of the poisson profile
+
+    When the test is run by many processes, each gets the profile of its
+    share of the rate.
+
+    :param processes: number of processes running the test
+    :param index: index of the process, from 0
+    """
+    profile = test.get('profile')
+    if profile is None and 'rate' not in test:
+        return None
+    if profile in (None, 'constant'):
+        return ConstantRate(float(test['rate']) / processes)
+    if profile == 'poisson':
+        seed = test.get('seed')
+        if seed is not None:
+            seed += index
+        return PoissonRate(float(test['rate']) / processes, seed)
+    if profile == 'step':
+        return StepRate([(duration, float(rate) / processes)
+                         for duration, rate in test['steps']])
+    raise exceptions.InvalidConfiguration(
+        "Unknown stress arrival profile %s" % profile)
+
+
+class OpenLoopScheduler(object):
+    """
+    Runs actions at the times set by an arrival profile.
+
+    The offered load does not depend on how fast the cloud answers: each
+    arrival is dispatched to the first free action of a pool of threads.
+    When none is free the run waits in a queue, its queueing delay is
+    recorded and the deadline counted as missed if it starts more than
+    late_threshold seconds late. The latency of a run is measured from its
+    arrival time, so it includes the queueing delay.
+    """
+
+    def __init__(self, actions, statistics, profile, late_threshold=0.1):
+        """
+        :param actions: StressAction instances, one per thread of the pool
+        :param statistics: WorkerStatistics of each action
+        :param profile: arrival profile
+        """
+        self.actions = actions
+        self.statistics = statistics
+        self.profile = profile
+        self.late_threshold = late_threshold
+        self._queue = Queue.Queue()
+        self._stopped = threading.Event()
+        # Threads of the pool, once run
+        self.threads = []
+
+    def _worker(self, action, statistic):
+        while True:
+            due = self._queue.get()
+            if due is None or self._stopped.is_set():
+                return
+            delay = max(0.0, time.time() - due)
+            statistic.record_queue_delay(delay)
+            if delay > self.late_threshold:
+                statistic['missed'] += 1
+            action.run_once(statistic, start=due)
+
+    def stop(self):
+        """Stops dispatching new runs, the queued runs are dropped."""
+        self._stopped.set()
+
+    def run(self, duration=None, max_runs=None):
+        """
+        Dispatches runs until duration seconds passed, max_runs were
+        dispatched, the profile ended or stop() was called, then waits for
+        the runs in progress, and the queued ones unless stopped.
+        """
+        self.threads = threads = [
+            threading.Thread(target=self._worker, args=(action, statistic))
+            for action, statistic in zip(self.actions, self.statistics)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        start = time.time()
+        for count, arrival in enumerate(self.profile.arrivals()):
+            if max_runs is not None and count >= max_runs:
+                break
+            if duration is not None and arrival >= duration:
+                break
+            wait = start + arrival - time.time()
+            if wait > 0 and self._stopped.wait(wait):
+                break
+            if self._stopped.is_set():
+                break
+            self._queue.put(start + arrival)
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            # A join with a timeout lets the signal handlers run meanwhile
+            while thread.is_alive():
+                thread.join(1)
@@ -0,0 +1,260 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import ctypes
+import multiprocessing
+
+# Latencies are recorded in microseconds in log-linear buckets, like HDR
+# histograms: values below 2 * SUB_BUCKETS have their own bucket, then each
+# power of two is split in SUB_BUCKETS buckets, which bounds the relative
+# error to 1 / SUB_BUCKETS. Latencies up to about an hour are covered.
+SUB_BUCKETS = 16
+MAX_EXPONENT = 27
+BUCKETS = SUB_BUCKETS * (MAX_EXPONENT + 2)
+
+# Counters of a worker slot, followed by the buckets of its latency and
+# queueing delay histograms
+RUNS = 0
+FAILS = 1
+LATENCY_SUM = 2
+MISSED = 3
+IN_FLIGHT = 4
+SLOT_HEADER = 5
+QUEUE_BUCKETS = SLOT_HEADER + BUCKETS
+SLOT_SIZE = QUEUE_BUCKETS + BUCKETS
+
+PERCENTILES = (50, 95, 99)
+
+
+def bucket_index(latency):
+    """Returns the bucket of a latency in seconds."""
+    value = max(0, int(latency * 1000000))
+    exponent = value.bit_length() - SUB_BUCKETS.bit_length()
+    if exponent <= 0:
+        return min(value, BUCKETS - 1)
+    index = SUB_BUCKETS * exponent + (value >> exponent)
+    return min(index, BUCKETS - 1)
+
+
+def bucket_latency(index):
+    """Returns the middle of a bucket, in seconds."""
+    if index < 2 * SUB_BUCKETS:
+        return index / 1000000.0
+    exponent = index // SUB_BUCKETS - 1
+    low = (index - SUB_BUCKETS * exponent) << exponent
+    return (low + (1 << exponent) / 2.0) / 1000000.0
+
+
+class Histogram(object):
+    """Latency histogram of one or many workers."""
+
+    def __init__(self, counts=None):
+        self.counts = list(counts) if counts is not None else [0] * BUCKETS
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def add(self, latency):
+        self.counts[bucket_index(latency)] += 1
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+
+    def percentile(self, percent):
+        """Returns the latency under which percent of the values are."""
+        total = self.count
+        if not total:
+            return None
+        rank = total * percent / 100.0
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return bucket_latency(index)
+
+
+class WorkerStatistics(object):
+    """
+    Statistics of a single worker, stored in its slot of a Statistics array.
+
+    Only the worker writes to its slot, so no lock is needed. The 'runs',
+    'fails', 'missed' (deadlines, in open-loop mode) and 'in_flight' (runs
+    in progress) counters can be accessed like the keys of a dict.
+    """
+
+    KEYS = {'runs': RUNS, 'fails': FAILS, 'missed': MISSED,
+            'in_flight': IN_FLIGHT}
+
+    def __init__(self, counters, slot):
+        self._counters = counters
+        self._offset = slot * SLOT_SIZE
+
+    def __getitem__(self, key):
+        return self._counters[self._offset + self.KEYS[key]]
+
+    def __setitem__(self, key, value):
+        self._counters[self._offset + self.KEYS[key]] = value
+
+    def record_latency(self, latency):
+        counters, offset = self._counters, self._offset
+        counters[offset + LATENCY_SUM] += int(latency * 1000000)
+        counters[offset + SLOT_HEADER + bucket_index(latency)] += 1
+
+    def record_queue_delay(self, delay):
+        """Records how late a run started after it was due."""
+        self._counters[self._offset + QUEUE_BUCKETS +
+                       bucket_index(delay)] += 1
+
+    @property
+    def latency_sum(self):
+        return self._counters[self._offset + LATENCY_SUM] / 1000000.0
+
+    def histogram(self):
+        start = self._offset + SLOT_HEADER
+        return Histogram(self._counters[start:start + BUCKETS])
+
+    def queue_histogram(self):
+        start = self._offset + QUEUE_BUCKETS
+        return Histogram(self._counters[start:start + BUCKETS])
+
+
+class Statistics(object):
+    """
+    Statistics of all the workers in a single block of shared memory.
+
+    It has to be created before the worker processes are started, which
+    then record in their own slot.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._counters = multiprocessing.Array(ctypes.c_longlong,
+                                               workers * SLOT_SIZE,
+                                               lock=False)
+
+    def worker(self, slot):
+        return WorkerStatistics(self._counters, slot)
+
+
+def summarize(workers, elapsed):
+    """
+    Aggregates the statistics of the workers running the same action.
+
+    :param workers: list of (action, WorkerStatistics) tuples
+    :param elapsed: duration of the run in seconds
+    :returns: an OrderedDict of summaries by action, each a dict of the
+              runs, fails, throughput (runs per second), mean and
+              percentile latencies in seconds. Actions run in open-loop
+              mode also have their missed deadlines and queueing delay
+              percentiles (queue_p50...).
+    """
+    actions = collections.OrderedDict()
+    for action, statistic in workers:
+        summary = actions.setdefault(action, {'runs': 0, 'fails': 0,
+                                              'missed': 0,
+                                              'latency_sum': 0.0,
+                                              'histogram': Histogram(),
+                                              'queue': Histogram()})
+        summary['runs'] += statistic['runs']
+        summary['fails'] += statistic['fails']
+        summary['missed'] += statistic['missed']
+        summary['latency_sum'] += statistic.latency_sum
+        summary['histogram'].merge(statistic.histogram())
+        summary['queue'].merge(statistic.queue_histogram())
+    for summary in actions.values():
+        histogram = summary.pop('histogram')
+        queue = summary.pop('queue')
+        latency_sum = summary.pop('latency_sum')
+        summary['throughput'] = summary['runs'] / elapsed if elapsed else 0.0
+        summary['mean'] = latency_sum / histogram.count if histogram.count \
+            else None
+        for percent in PERCENTILES:
+            summary['p%d' % percent] = histogram.percentile(percent)
+        if queue.count:
+            for percent in PERCENTILES:
+                summary['queue_p%d' % percent] = queue.percentile(percent)
+        else:
+            del summary['missed']
+    return actions
+
+
+class Snapshot(object):
+    """
+    Statistics of one or many workers copied out of the shared memory.
+
+    Unlike a WorkerStatistics it can be sent to another host, see to_dict,
+    and it can be passed in its place to summarize.
+    """
+
+    def __init__(self):
+        self.counters = {'runs': 0, 'fails': 0, 'missed': 0, 'in_flight': 0}
+        self.latency_sum = 0.0
+        self._histogram = Histogram()
+        self._queue = Histogram()
+
+    def __getitem__(self, key):
+        return self.counters[key]
+
+    def add(self, statistic):
+        """Adds the statistics of a worker or of another snapshot."""
+        for key in self.counters:
+            self.counters[key] += statistic[key]
+        self.latency_sum += statistic.latency_sum
+        self._histogram.merge(statistic.histogram())
+        self._queue.merge(statistic.queue_histogram())
+
+    def histogram(self):
+        return self._histogram
+
+    def queue_histogram(self):
+        return self._queue
+
+    def to_dict(self):
+        """Returns the snapshot as a dict of JSON serializable values."""
+        data = dict(self.counters)
+        data['latency_sum'] = self.latency_sum
+        # Most of the buckets are empty, only the others are kept
+        data['histogram'] = [(index, count) for index, count
+                             in enumerate(self._histogram.counts) if count]
+        data['queue'] = [(index, count) for index, count
+                         in enumerate(self._queue.counts) if count]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        snapshot = cls()
+        for key in snapshot.counters:
+            snapshot.counters[key] = data.get(key, 0)
+        snapshot.latency_sum = data['latency_sum']
+        for index, count in data['histogram']:
+            snapshot._histogram.counts[index] = count
+        for index, count in data['queue']:
+            snapshot._queue.counts[index] = count
+        return snapshot
+
+
+def snapshot(workers):
+    """
+    Copies the statistics of the workers running the same action.
+
+    :param workers: list of (action, WorkerStatistics) tuples
+    :returns: an OrderedDict of Snapshot by action
+    """
+    actions = collections.OrderedDict()
+    for action, statistic in workers:
+        actions.setdefault(action, Snapshot()).add(statistic)
+    return actions
@@ -14,12 +14,18 @@
 
 import signal
 import sys
+import time
 
 from tempest.openstack.common import log as logging
+from tempest.stress import stats
 
 
 class StressAction(object):
 
+    # Whether the action may run in a thread of a process running other
+    # actions, False when it changes state shared by the process
+    shares_process = True
+
     def __init__(self, manager, max_runs=None, stop_on_error=False):
         full_cname = self.__module__ + "." + self.__class__.__name__
         self.logger = logging.getLogger(full_cname)
@@ -61,27 +67,57 @@ class StressAction(object):
         """This is the main execution entry point called
         by the driver.   We register a signal handler to
         allow us to tearDown gracefully, and then exit.
-        We also keep track of how many runs we do.
+        We also keep track of how many runs we do, and
+        of their latency when shared_statistic is a
+        stats.WorkerStatistics.
         """
         signal.signal(signal.SIGHUP, self._shutdown_handler)
         signal.signal(signal.SIGTERM, self._shutdown_handler)
 
+        if not self.run_loop(shared_statistic):
+            self.tearDown()
+            sys.exit(1)
+
+    def run_loop(self, shared_statistic, stop_event=None):
+        """Runs the action until max_runs is reached or stop_event is set.
+
+        :returns: False if the loop stopped because of the
+                  "stop-on-error" argument, True otherwise.
+        """
         while self.max_runs is None or (shared_statistic['runs'] <
                                         self.max_runs):
+            if stop_event is not None and stop_event.is_set():
+                break
             self.logger.debug("Trigger new run (run %d)" %
                               shared_statistic['runs'])
-            try:
-                self.run()
-            except Exception:
-                shared_statistic['fails'] += 1
-                self.logger.exception("Failure in run")
-            finally:
-                shared_statistic['runs'] += 1
-                if self.stop_on_error and (shared_statistic['fails'] > 1):
-                    self.logger.warn("Stop process due to"
-                                     "\"stop-on-error\" argument")
-                    self.tearDown()
-                    sys.exit(1)
+            self.run_once(shared_statistic)
+            if self.stop_on_error and (shared_statistic['fails'] > 1):
+                self.logger.warn("Stop process due to"
+                                 "\"stop-on-error\" argument")
+                return False
+        return True
+
+    def run_once(self, shared_statistic, start=None):
+        """Runs the action once and records it in shared_statistic.
+
+        :param start: when the run was due, the latency is measured from
+                      then. Defaults to now.
+        """
+        if start is None:
+            start = time.time()
+        recorded = isinstance(shared_statistic, stats.WorkerStatistics)
+        if recorded:
+            shared_statistic['in_flight'] += 1
+        try:
+            self.run()
+        except Exception:
+            shared_statistic['fails'] += 1
+            self.logger.exception("Failure in run")
+        finally:
+            if recorded:
+                shared_statistic.record_latency(time.time() - start)
+                shared_statistic['in_flight'] -= 1
+            shared_statistic['runs'] += 1
 
     def run(self):
         """This method is where the stress test code runs."""
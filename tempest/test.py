@@ -14,9 +14,13 @@
 #    under the License.
 
 import atexit
+import collections
+import copy
 import functools
+import hashlib
 import json
 import os
+import re
 import time
 import urllib
 import uuid
@@ -29,6 +33,8 @@ import testtools
 from tempest import clients
 from tempest.common import generate_json
 from tempest.common import isolated_creds
+from tempest.common import request_timing
+from tempest.common.utils import misc
 from tempest import config
 from tempest import exceptions
 from tempest.openstack.common import log as logging
@@ -40,6 +46,11 @@ CONF = config.CONF
 # All the successful HTTP status codes from RFC 2616
 HTTP_SUCCESS = (200, 201, 202, 203, 204, 205, 206)
 
+# Ids and numbers in the error responses, ignored when clustering them
+VOLATILE_REGEX = re.compile(
+    r"[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?"
+    r"[0-9a-fA-F]{12}|[0-9a-fA-F]{32}|[0-9]+")
+
 
 def attr(*args, **kwargs):
     """A decorator which applies the nose and testtools attr decorator
@@ -237,6 +248,11 @@ class BaseTestCase(testtools.TestCase,
         if hasattr(super(BaseTestCase, cls), 'setUpClass'):
             super(BaseTestCase, cls).setUpClass()
         cls.setUpClassCalled = True
+        request_timing.set_test(cls._class_id())
+
+    @classmethod
+    def _class_id(cls):
+        return '%s.%s' % (cls.__module__, cls.__name__)
 
     @classmethod
     def tearDownClass(cls):
@@ -251,6 +267,10 @@ class BaseTestCase(testtools.TestCase,
                                "setUpClass in the "
                                + self.__class__.__name__)
         at_exit_set.add(self.__class__)
+        # The timing events of the class fixtures are told apart from the
+        # ones of its tests
+        request_timing.set_test(self.id())
+        self.addCleanup(request_timing.set_test, self._class_id())
         test_timeout = os.environ.get('OS_TEST_TIMEOUT', 0)
         try:
             test_timeout = int(test_timeout)
@@ -364,6 +384,20 @@ class NegativeAutoTest(BaseTestCase):
         os = cls.get_client_manager()
         cls.client = os.negative_client
 
+    # Directory of the schema files
+    schema_dir = os.path.join(
+        os.path.abspath(os.path.dirname(os.path.dirname(__file__))),
+        "etc", "schemas")
+
+    # Invalid variants generated from the schema files, one file for each
+    # content of a schema file and version of the generator, see
+    # expand_schema
+    scenario_cache_dir = os.path.join(schema_dir, ".scenario-cache")
+
+    # Variants already expanded by this process, by cache key
+    _expanded = {}
+    _generator_hash = None
+
     @staticmethod
     def load_schema(file):
         """
@@ -372,12 +406,79 @@ class NegativeAutoTest(BaseTestCase):
         :param file: the file name
         """
         #NOTE(mkoderer): must be extended for xml support
-        fn = os.path.join(
-            os.path.abspath(os.path.dirname(os.path.dirname(__file__))),
-            "etc", "schemas", file)
+        fn = os.path.join(NegativeAutoTest.schema_dir, file)
         LOG.debug("Open schema file: %s" % (fn))
         return json.load(open(fn))
 
+    @staticmethod
+    def _generator_version():
+        # The variants also change with the code generating them
+        if NegativeAutoTest._generator_hash is None:
+            path = os.path.splitext(generate_json.__file__)[0] + '.py'
+            with open(path) as generator_file:
+                NegativeAutoTest._generator_hash = hashlib.sha1(
+                    generator_file.read()).hexdigest()
+        return NegativeAutoTest._generator_hash
+
+    @staticmethod
+    def _read_expansion(key):
+        path = os.path.join(NegativeAutoTest.scenario_cache_dir,
+                            key + '.json')
+        try:
+            with open(path) as cache_file:
+                return json.load(cache_file)
+        except (IOError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_expansion(key, invalids):
+        path = os.path.join(NegativeAutoTest.scenario_cache_dir,
+                            key + '.json')
+        # The file of a key never changes, the workers discovering the tests
+        # in parallel may only replace it with the same content, and never
+        # leave it partial
+        temp_path = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            if not os.path.isdir(NegativeAutoTest.scenario_cache_dir):
+                os.makedirs(NegativeAutoTest.scenario_cache_dir)
+            with open(temp_path, 'w') as cache_file:
+                json.dump(invalids, cache_file)
+            os.rename(temp_path, path)
+        except (IOError, OSError) as e:
+            # Like for the .pyc files, a read-only tree is not an error
+            LOG.debug("Could not write the scenario cache %s: %s", path, e)
+
+    @staticmethod
+    def expand_schema(description_file):
+        """
+        Returns the description of a schema file and the invalid variants
+        generated from its json-schema, as (name, invalid data, expected
+        result) lists.
+
+        The file is validated and expanded once, the variants are then read
+        from the scenario cache as long as the content of the file and the
+        generator are the same.
+        """
+        fn = os.path.join(NegativeAutoTest.schema_dir, description_file)
+        with open(fn) as schema_file:
+            content = schema_file.read()
+        description = json.loads(content)
+        key = hashlib.sha1(NegativeAutoTest._generator_version() +
+                           content).hexdigest()
+        invalids = NegativeAutoTest._expanded.get(key)
+        if invalids is None:
+            invalids = NegativeAutoTest._read_expansion(key)
+        if invalids is None:
+            generate_json.validate_negative_test_schema(description)
+            schema = description.get("json-schema", None)
+            invalids = []
+            if schema is not None:
+                invalids = [list(invalid) for invalid
+                            in generate_json.generate_invalid(schema)]
+            NegativeAutoTest._write_expansion(key, invalids)
+        NegativeAutoTest._expanded[key] = invalids
+        return description, invalids
+
     @staticmethod
     def generate_scenario(description_file):
         """
@@ -399,10 +500,9 @@ class NegativeAutoTest(BaseTestCase):
                 the data is used to generate query strings appended to the url,
                 otherwise for the body of the http call.
         """
-        description = NegativeAutoTest.load_schema(description_file)
+        description, invalids = NegativeAutoTest.expand_schema(
+            description_file)
         LOG.debug(description)
-        generate_json.validate_negative_test_schema(description)
-        schema = description.get("json-schema", None)
         resources = description.get("resources", [])
         scenario_list = []
         for resource in resources:
@@ -411,11 +511,10 @@ class NegativeAutoTest(BaseTestCase):
             scenario_list.append((scn_name, {"resource": (resource,
                                                           str(uuid.uuid4()))
                                              }))
-        if schema is not None:
-            for invalid in generate_json.generate_invalid(schema):
-                scenario_list.append((invalid[0],
-                                      {"schema": invalid[1],
-                                       "expected_result": invalid[2]}))
+        for invalid in invalids:
+            scenario_list.append((invalid[0],
+                                  {"schema": invalid[1],
+                                   "expected_result": invalid[2]}))
         LOG.debug(scenario_list)
         return scenario_list
 
@@ -471,6 +570,83 @@ class NegativeAutoTest(BaseTestCase):
                                                        resources, body=body)
             self._check_negative_response(resp.status, resp_body)
 
+    def execute_batch(self, description_file, max_workers=8):
+        """
+        Executes all the scenarios of generate_scenario in a single test,
+        sending their requests from at most max_workers threads at a time.
+        A test method calls it in a class without scenarios.
+
+        Each response is checked like by execute. The outcomes of the
+        variants are logged and attached to the test as the
+        negative-variants detail, grouped by identical responses, and the
+        test fails listing the variants which failed.
+        """
+        description = NegativeAutoTest.load_schema(description_file)
+        LOG.info("Executing the variants of %s" % description["name"])
+        method = description["http-method"]
+        url = description["url"]
+        schema = description.get("json-schema", None)
+        args_list = []
+        for name, variant in NegativeAutoTest.generate_scenario(
+                description_file):
+            invalid_resource = variant.get("resource")
+            resources = []
+            for resource in description.get("resources", []):
+                if invalid_resource and invalid_resource[0] == resource:
+                    resources.append(invalid_resource[1])
+                else:
+                    resources.append(self.get_resource(resource))
+            if invalid_resource:
+                data = None
+                if schema:
+                    data = generate_json.generate_valid(schema)
+            else:
+                data = variant["schema"]
+            new_url, body = self._http_arguments(data, url, method)
+            args_list.append((name, method, new_url, resources, body,
+                              variant.get("expected_result")))
+        results = misc.run_concurrently(self._send_variant, args_list,
+                                        max_workers)
+
+        report = []
+        for (passed, status, body), names in cluster_negative_results(
+                results).items():
+            report.append("%s %s (%d variants): %s\n    %s" %
+                          ("PASS" if passed else "FAIL", status, len(names),
+                           body[:200], ", ".join(names)))
+        self.addDetail('negative-variants',
+                       testtools.content.text_content("\n".join(report)))
+        failures = ["%s: %s" % (name, error)
+                    for name, _, _, error in results if error is not None]
+        if failures:
+            self.fail("%d of %d variants failed:\n%s" %
+                      (len(failures), len(results), "\n".join(failures)))
+
+    def _send_variant(self, name, method, url, resources, body,
+                      expected_result):
+        """
+        Sends the request of a variant, returns its name, the response
+        status and body, and the error of its check, None if it passed.
+        """
+        # A HTTP transport is not shared between threads
+        client = copy.copy(self.client)
+        client.http_obj = client._get_http()
+        try:
+            resp, resp_body = client.send_request(method, url, resources,
+                                                  body=body)
+        except Exception as e:
+            LOG.info("Variant %s: FAIL %s" % (name, e))
+            return name, None, str(e), "%s: %s" % (type(e).__name__, e)
+        error = None
+        try:
+            self._check_negative_response(resp.status, resp_body,
+                                          expected_result)
+        except self.failureException as e:
+            error = str(e)
+        LOG.info("Variant %s: %s %s" %
+                 (name, "PASS" if error is None else "FAIL", resp.status))
+        return name, resp.status, resp_body, error
+
     def _http_arguments(self, json_dict, url, method):
         LOG.debug("dict: %s url: %s method: %s" % (json_dict, url, method))
         if not json_dict:
@@ -480,8 +656,9 @@ class NegativeAutoTest(BaseTestCase):
         else:
             return url, json.dumps(json_dict)
 
-    def _check_negative_response(self, result, body):
-        expected_result = getattr(self, "expected_result", None)
+    def _check_negative_response(self, result, body, expected_result=None):
+        if expected_result is None:
+            expected_result = getattr(self, "expected_result", None)
         self.assertTrue(result >= 400 and result < 500 and result != 413,
                         "Expected client error, got %s:%s" %
                         (result, body))
@@ -519,6 +696,20 @@ class NegativeAutoTest(BaseTestCase):
         return None
 
 
+def cluster_negative_results(results):
+    """
+    Groups the results of execute_batch whose outcome, status and body are
+    the same, the ids and numbers of the bodies aside. Returns a dict of
+    the names of the variants by (passed, status, body), in the order of
+    the results.
+    """
+    clusters = collections.OrderedDict()
+    for name, status, body, error in results:
+        key = (error is None, status, VOLATILE_REGEX.sub('#', str(body)))
+        clusters.setdefault(key, []).append(name)
+    return clusters
+
+
 def call_until_true(func, duration, sleep_for):
     """
     Call the given function until it returns True (and return True) or
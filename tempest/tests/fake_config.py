@@ -20,7 +20,19 @@ class FakeConfig(object):
         build_timeout = 10
 
     class fake_identity(object):
+        catalog_type = 'identity'
         disable_ssl_certificate_validation = True
+        http_keep_alive = False
+
+    class fake_debug(object):
+        request_timing = False
+        request_timing_log = None
+        request_log_sample_rate = 1
+
+    class fake_object_storage(object):
+        catalog_type = 'object-store'
 
     compute = fake_compute()
     identity = fake_identity()
+    debug = fake_debug()
+    object_storage = fake_object_storage()
@@ -0,0 +1,120 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+import mock
+
+from tempest.stress import distributed
+from tempest.stress import stats
+from tempest.tests import base
+
+
+class FakeRunner(object):
+    """Runs max_runs of 10ms per thread of each test, or until stopped."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def __call__(self, tests, duration, max_runs=None, stop_on_error=False,
+                 reporters=(), report_interval=None, stop_event=None,
+                 clean_up=True):
+        # Only the coordinator cleans up
+        assert not clean_up
+        self.jobs.append(tests)
+        workers = [(test['action'], None) for test in tests
+                   for _ in range(test['threads'])]
+        statistics = stats.Statistics(len(workers))
+        processes = [{'action': action, 'statistic': statistics.worker(slot)}
+                     for slot, (action, _) in enumerate(workers)]
+        runs = 0
+        while max_runs is None or runs < max_runs:
+            if stop_event.wait(0.01):
+                break
+            runs += 1
+            for process in processes:
+                process['statistic']['runs'] += 1
+                process['statistic'].record_latency(0.01)
+            for reporter in reporters:
+                reporter(processes, runs * 0.01)
+        return 0
+
+
+class TestSplitTests(base.TestCase):
+
+    def test_split_threads(self):
+        jobs = distributed.split_tests([{'action': 'a', 'threads': 5},
+                                        {'action': 'b', 'threads': 1}], 2)
+        self.assertEqual([3, 1], [test['threads'] for test in jobs[0]])
+        self.assertEqual([2], [test['threads'] for test in jobs[1]])
+
+    def test_split_rate(self):
+        jobs = distributed.split_tests([{'action': 'a', 'threads': 4,
+                                         'rate': 10,
+                                         'steps': [[10, 4]]}], 2)
+        for job in jobs:
+            self.assertEqual(5, job[0]['rate'])
+            self.assertEqual([[10, 2]], job[0]['steps'])
+
+    def test_parse_address(self):
+        self.assertEqual(('host', 80), distributed.parse_address('host:80'))
+        self.assertEqual(('localhost', 80), distributed.parse_address('80'))
+
+    def test_agent_loopback_by_default(self):
+        agent = distributed.Agent(port=0)
+        self.addCleanup(agent.close)
+        self.assertEqual('127.0.0.1', agent.address[0])
+
+
+class TestDistributed(base.TestCase):
+
+    def setUp(self):
+        super(TestDistributed, self).setUp()
+        self.clean_up = mock.Mock()
+
+    def _start_agents(self, count):
+        self.runner = FakeRunner()
+        addresses = []
+        for _ in range(count):
+            agent = distributed.Agent('127.0.0.1', 0, runner=self.runner)
+            self.addCleanup(agent.close)
+            thread = threading.Thread(target=agent.serve, args=(1,))
+            thread.daemon = True
+            thread.start()
+            addresses.append(agent.address)
+        return addresses
+
+    def test_run(self):
+        coordinator = distributed.Coordinator(self._start_agents(2),
+                                              clean_up=self.clean_up)
+        result = coordinator.run([{'action': 'a', 'threads': 3}], 10,
+                                 max_runs=5)
+        self.assertEqual(0, result)
+        self.assertEqual(2, len(self.runner.jobs))
+        summary = coordinator.summarize()['a']
+        # 3 threads on the agents, 5 runs each
+        self.assertEqual(15, summary['runs'])
+        # Once for all the agents
+        self.clean_up.assert_called_once_with()
+        self.assertAlmostEqual(0.01, summary['p50'], places=3)
+
+    def test_stop(self):
+        coordinator = distributed.Coordinator(self._start_agents(2),
+                                              clean_up=self.clean_up)
+        timer = threading.Timer(0.2, coordinator.stop)
+        timer.start()
+        self.addCleanup(timer.cancel)
+        result = coordinator.run([{'action': 'a', 'threads': 2}], 10)
+        self.assertEqual(0, result)
+        self.assertEqual(2, len(coordinator.results))
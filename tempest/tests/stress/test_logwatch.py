@@ -0,0 +1,87 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import subprocess
+
+import fixtures
+
+from tempest.stress import logwatch
+from tempest.tests import base
+
+ERROR = ("2014-01-01 10:00:0%d.000 123 ERROR nova.compute.manager "
+         "[req-%d] Instance failed to spawn\n")
+TRACE = ("2014-01-01 10:00:0%d.000 123 TRACE nova.compute.manager "
+         "Traceback (most recent call last):\n")
+OTHER = ("2014-01-01 10:00:0%d.000 123 ERROR nova.network.api "
+         "Failed to allocate network\n")
+INFO = "2014-01-01 10:00:00.000 123 INFO nova.compute.manager started\n"
+
+
+class TestLogWatcher(base.TestCase):
+
+    def setUp(self):
+        super(TestLogWatcher, self).setUp()
+        self.log_dir = self.useFixture(fixtures.TempDir()).path
+        self.log_file = os.path.join(self.log_dir, 'screen-n-cpu.log')
+        self.watcher = logwatch.LogWatcher(
+            os.path.join(self.log_dir, '*.log'), 'user')
+        # Run the commands of the watcher locally
+        self.patch('tempest.common.ssh.exec_command_on_hosts',
+                   side_effect=self._exec_command_on_hosts)
+
+    def _exec_command_on_hosts(self, clients, command, max_workers):
+        return dict((client.host,
+                     subprocess.check_output(['sh', '-c',
+                                              command(client.host)]))
+                    for client in clients)
+
+    def _log(self, data):
+        with open(self.log_file, 'a') as log_file:
+            log_file.write(data)
+
+    def test_incremental_check(self):
+        self._log(INFO + ERROR % (1, 1) + TRACE % 1 + TRACE % 1)
+        errors = self.watcher.check(['node'])
+        self.assertEqual(2, len(errors))
+        node, name, trace = errors[1]
+        self.assertEqual(('node', self.log_file), (node, name))
+        self.assertEqual('TRACE', trace.level)
+        self.assertEqual(2, len(trace.lines))
+        # Nothing new
+        self.assertEqual([], self.watcher.check(['node']))
+        # The same error again is not reported, a new one is, an
+        # incomplete line is left for the next check
+        self._log(ERROR % (2, 2) + INFO + OTHER % 3 + (OTHER % 4)[:20])
+        errors = self.watcher.check(['node'])
+        self.assertEqual(['nova.network.api'],
+                         [t.module for _, _, t in errors])
+        self.assertEqual(os.path.getsize(self.log_file) - 20,
+                         self.watcher.offsets[('node', self.log_file)])
+
+    def test_truncated_file(self):
+        self._log(INFO * 3)
+        self.watcher.check(['node'])
+        open(self.log_file, 'w').close()
+        self._log(OTHER % 1)
+        self.assertEqual(1, len(self.watcher.check(['node'])))
+
+    def test_whitelist(self):
+        self.watcher.whitelist = {
+            'n-cpu': [{'module': 'nova.compute.manager',
+                       'message': 'Instance failed to spawn'}]}
+        self._log(ERROR % (1, 1) + INFO + OTHER % 2)
+        errors = self.watcher.check(['node'])
+        self.assertEqual(['nova.network.api'],
+                         [trace.module for _, _, trace in errors])
@@ -0,0 +1,83 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import csv
+import json
+import os
+
+import fixtures
+
+from tempest.stress import recorder
+from tempest.stress import stats
+from tempest.tests import base
+
+
+class TestRecorder(base.TestCase):
+
+    def setUp(self):
+        super(TestRecorder, self).setUp()
+        self.path = self.useFixture(fixtures.TempDir()).path
+
+    def _run(self, path):
+        rec = recorder.Recorder(path)
+        self.addCleanup(rec.close)
+        statistics = stats.Statistics(2)
+        processes = [{'action': 'create',
+                      'statistic': statistics.worker(slot)}
+                     for slot in range(2)]
+        first, second = [process['statistic'] for process in processes]
+        for _ in range(4):
+            first['runs'] += 1
+            first.record_latency(0.1)
+        rec(processes, 2.0)
+        first['runs'] += 2
+        first['fails'] += 1
+        first.record_latency(1.0)
+        first.record_latency(1.0)
+        second['in_flight'] += 1
+        rec(processes, 4.0)
+        return rec
+
+    def test_json_lines(self):
+        rec = self._run(os.path.join(self.path, 'run.jsonl'))
+        with open(rec.path) as series:
+            samples = [json.loads(line) for line in series]
+        self.assertEqual(2, len(samples))
+        self.assertEqual(2.0, samples[0]['throughput'])
+        self.assertAlmostEqual(0.1, samples[0]['p50'], delta=0.01)
+        last = samples[1]
+        self.assertEqual('create', last['action'])
+        self.assertEqual(6, last['runs'])
+        self.assertEqual(1, last['in_flight'])
+        self.assertEqual(1.0, last['throughput'])
+        self.assertEqual(1, last['errors'])
+        # Only the runs since the previous sample count
+        self.assertAlmostEqual(1.0, last['p50'], delta=0.1)
+        with open(rec.summary_path) as summary_file:
+            summary = json.load(summary_file)
+        self.assertEqual(4.0, summary['elapsed'])
+        self.assertEqual(6, summary['actions']['create']['runs'])
+
+    def test_csv(self):
+        path = os.path.join(self.path, 'run.csv')
+        self._run(path)
+        # A second run appends to the same file
+        self._run(path)
+        with open(path) as series:
+            rows = list(csv.DictReader(series))
+        self.assertEqual(4, len(rows))
+        self.assertEqual('6', rows[1]['runs'])
+        self.assertEqual('4', rows[2]['runs'])
+        self.assertEqual(os.path.join(self.path, 'run.summary.json'),
+                         recorder.summary_path(path))
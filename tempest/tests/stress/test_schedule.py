@@ -0,0 +1,106 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import itertools
+import time
+
+from tempest import exceptions
+from tempest.stress import schedule
+from tempest.stress import stats
+from tempest.stress import stressaction
+from tempest.tests import base
+
+
+class SleepAction(stressaction.StressAction):
+
+    def setUp(self, **kwargs):
+        self.sleep = kwargs.get('sleep', 0)
+
+    def run(self):
+        time.sleep(self.sleep)
+
+
+def _take(profile, count):
+    return list(itertools.islice(profile.arrivals(), count))
+
+
+class TestProfiles(base.TestCase):
+
+    def test_constant(self):
+        self.assertEqual([0, 0.25, 0.5, 0.75],
+                         _take(schedule.ConstantRate(4), 4))
+
+    def test_step(self):
+        profile = schedule.StepRate([(1, 2), (1, 0), (1, 4)])
+        self.assertEqual([0, 0.5, 2, 2.25, 2.5, 2.75],
+                         _take(profile, 10))
+
+    def test_poisson(self):
+        arrivals = _take(schedule.PoissonRate(10, seed=42), 1001)
+        self.assertEqual(sorted(arrivals), arrivals)
+        # 1000 arrivals at 10 per second take about 100 seconds
+        self.assertTrue(90 < arrivals[-1] < 110)
+
+    def test_get_profile(self):
+        self.assertIsNone(schedule.get_profile({'threads': 2}))
+        self.assertIsInstance(schedule.get_profile({'rate': 2}),
+                              schedule.ConstantRate)
+        self.assertIsInstance(
+            schedule.get_profile({'rate': 2, 'profile': 'poisson'}),
+            schedule.PoissonRate)
+        self.assertRaises(exceptions.InvalidConfiguration,
+                          schedule.get_profile, {'profile': 'sine'})
+
+    def test_get_profile_share(self):
+        profile = schedule.get_profile({'rate': 8}, processes=2)
+        self.assertEqual(4, profile.rate)
+        profile = schedule.get_profile({'profile': 'step',
+                                        'steps': [[1, 6]]}, processes=3)
+        self.assertEqual([(1, 2)], profile.steps)
+        # The processes do not all draw the same arrivals
+        test = {'rate': 2, 'profile': 'poisson', 'seed': 1}
+        self.assertNotEqual(
+            _take(schedule.get_profile(test, 2, 0), 5),
+            _take(schedule.get_profile(test, 2, 1), 5))
+
+
+class TestOpenLoopScheduler(base.TestCase):
+
+    def _run(self, workers, rate, sleep, runs):
+        statistics = stats.Statistics(workers)
+        actions = []
+        for _ in range(workers):
+            action = SleepAction(None)
+            action.setUp(sleep=sleep)
+            actions.append(action)
+        worker_statistics = [statistics.worker(i) for i in range(workers)]
+        scheduler = schedule.OpenLoopScheduler(
+            actions, worker_statistics, schedule.ConstantRate(rate),
+            late_threshold=0.05)
+        scheduler.run(max_runs=runs)
+        return stats.summarize([('sleep', s) for s in worker_statistics],
+                               1)['sleep']
+
+    def test_keeps_up(self):
+        summary = self._run(workers=2, rate=100, sleep=0, runs=10)
+        self.assertEqual(10, summary['runs'])
+        self.assertEqual(0, summary['missed'])
+
+    def test_missed_deadlines(self):
+        # A single worker taking 0.1s per run cannot follow 50 runs/s
+        summary = self._run(workers=1, rate=50, sleep=0.1, runs=5)
+        self.assertEqual(5, summary['runs'])
+        self.assertTrue(summary['missed'] >= 3)
+        # The latency includes the time spent waiting for the worker
+        self.assertTrue(summary['p99'] > 0.3)
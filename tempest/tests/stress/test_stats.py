@@ -0,0 +1,95 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import multiprocessing
+
+from tempest.stress import stats
+from tempest.tests import base
+
+
+def _record(statistic):
+    statistic['runs'] += 2
+    statistic['fails'] += 1
+    statistic.record_latency(0.5)
+    statistic.record_latency(1.5)
+
+
+class TestHistogram(base.TestCase):
+
+    def test_bucket_precision(self):
+        for latency in (0.000005, 0.0123, 0.87, 12.5, 600):
+            bucket = stats.bucket_latency(stats.bucket_index(latency))
+            self.assertAlmostEqual(latency, bucket,
+                                   delta=latency / stats.SUB_BUCKETS)
+
+    def test_buckets_increase(self):
+        latencies = [stats.bucket_latency(i) for i in range(stats.BUCKETS)]
+        self.assertEqual(sorted(latencies), latencies)
+        self.assertEqual(stats.BUCKETS - 1, stats.bucket_index(10 ** 6))
+
+    def test_percentile(self):
+        histogram = stats.Histogram()
+        self.assertIsNone(histogram.percentile(50))
+        for i in range(1, 101):
+            histogram.add(i / 100.0)
+        self.assertAlmostEqual(0.5, histogram.percentile(50), delta=0.04)
+        self.assertAlmostEqual(0.95, histogram.percentile(95), delta=0.06)
+        self.assertAlmostEqual(1.0, histogram.percentile(100), delta=0.06)
+
+
+class TestStatistics(base.TestCase):
+
+    def test_shared_between_processes(self):
+        statistics = stats.Statistics(2)
+        process = multiprocessing.Process(target=_record,
+                                          args=(statistics.worker(1),))
+        process.start()
+        process.join()
+        self.assertEqual(0, statistics.worker(0)['runs'])
+        worker = statistics.worker(1)
+        self.assertEqual(2, worker['runs'])
+        self.assertEqual(1, worker['fails'])
+        self.assertEqual(2.0, worker.latency_sum)
+        self.assertEqual(2, worker.histogram().count)
+
+    def test_summarize(self):
+        statistics = stats.Statistics(3)
+        for slot in range(3):
+            _record(statistics.worker(slot))
+        summaries = stats.summarize(
+            [('create', statistics.worker(0)),
+             ('create', statistics.worker(1)),
+             ('delete', statistics.worker(2))], 2.0)
+        self.assertEqual(['create', 'delete'], summaries.keys())
+        create = summaries['create']
+        self.assertEqual(4, create['runs'])
+        self.assertEqual(2, create['fails'])
+        self.assertEqual(2.0, create['throughput'])
+        self.assertEqual(1.0, create['mean'])
+        self.assertAlmostEqual(0.5, create['p50'], delta=0.05)
+        self.assertAlmostEqual(1.5, create['p99'], delta=0.1)
+
+    def test_snapshot_round_trip(self):
+        statistics = stats.Statistics(2)
+        for slot in range(2):
+            _record(statistics.worker(slot))
+        snapshots = stats.snapshot([('create', statistics.worker(0)),
+                                    ('create', statistics.worker(1))])
+        data = json.loads(json.dumps(snapshots['create'].to_dict()))
+        snapshot = stats.Snapshot.from_dict(data)
+        self.assertEqual(4, snapshot['runs'])
+        summary = stats.summarize([('create', snapshot)], 2.0)['create']
+        self.assertEqual(1.0, summary['mean'])
+        self.assertAlmostEqual(1.5, summary['p99'], delta=0.1)
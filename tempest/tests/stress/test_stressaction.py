@@ -13,6 +13,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+import time
+
+import mock
+
+from tempest.stress.actions import unit_test
+from tempest.stress import driver
+from tempest.stress import stats as stress_stats
 import tempest.stress.stressaction as stressaction
 import tempest.test
 
@@ -30,6 +38,26 @@ class FakeStressAction(stressaction.StressAction):
         return self._run_called
 
 
+class FakeStressActionSlow(stressaction.StressAction):
+    """Checks that it is not torn down while a run is in progress."""
+
+    def __init__(self, manager, max_runs=None, stop_on_error=False):
+        super(FakeStressActionSlow, self).__init__(manager, max_runs,
+                                                   stop_on_error)
+        self.started = threading.Event()
+        self.running = False
+        self.torn_down_running = None
+
+    def run(self):
+        self.running = True
+        self.started.set()
+        time.sleep(0.1)
+        self.running = False
+
+    def tearDown(self):
+        self.torn_down_running = self.running
+
+
 class FakeStressActionFailing(stressaction.StressAction):
     def run(self):
         raise Exception('FakeStressActionFailing raise exception')
@@ -61,3 +89,85 @@ class TestStressAction(tempest.test.BaseTestCase):
         stressAction.execute(stats)
         self.assertEqual(stats['runs'], 1)
         self.assertEqual(stats['fails'], 1)
+
+    def testStressTestRunLatency(self):
+        stressAction = FakeStressAction(manager=None, max_runs=3)
+        stats = stress_stats.Statistics(1).worker(0)
+        stressAction.execute(stats)
+        self.assertEqual(stats['runs'], 3)
+        self.assertEqual(stats.histogram().count, 3)
+        self.assertEqual(stats['in_flight'], 0)
+
+    def testStressRunLoopStopEvent(self):
+        stressAction = FakeStressAction(manager=None)
+        stop = threading.Event()
+        stop.set()
+        stats = self._bulid_stats_dict()
+        self.assertTrue(stressAction.run_loop(stats, stop))
+        self.assertEqual(stats['runs'], 0)
+
+    def testStressRunLoopStopOnError(self):
+        stressAction = FakeStressActionFailing(manager=None, max_runs=5,
+                                               stop_on_error=True)
+        stats = self._bulid_stats_dict()
+        self.assertFalse(stressAction.run_loop(stats))
+        self.assertEqual(stats['fails'], 2)
+
+
+class TestUnitTestAction(tempest.test.BaseTestCase):
+
+    def _action(self, class_setup_per):
+        action = unit_test.UnitTest(manager=None)
+        action.setUp(test_method=__name__ + '.FakeStressAction.run',
+                     class_setup_per=class_setup_per)
+        return action
+
+    def test_shares_process(self):
+        self.assertFalse(self._action('process').shares_process)
+        self.assertFalse(self._action('action').shares_process)
+        with mock.patch.object(FakeStressAction, 'setUpClass',
+                               create=True) as set_up_class:
+            self.assertTrue(self._action('application').shares_process)
+        set_up_class.assert_called_once_with()
+
+
+class TestClosedLoop(tempest.test.BaseTestCase):
+
+    @mock.patch('signal.signal')
+    def testRunClosedLoopThreads(self, signal_mock):
+        statistics = stress_stats.Statistics(4)
+        actions = [FakeStressAction(manager=None, max_runs=3)
+                   for _ in range(4)]
+        workers = [statistics.worker(slot) for slot in range(4)]
+        driver.run_closed_loop(actions, workers)
+        for stats in workers:
+            self.assertEqual(stats['runs'], 3)
+
+    @mock.patch('signal.signal')
+    def testRunClosedLoopShutdown(self, signal_mock):
+        statistics = stress_stats.Statistics(2)
+        actions = [FakeStressActionSlow(manager=None) for _ in range(2)]
+        thread = threading.Thread(
+            target=driver.run_closed_loop,
+            args=(actions, [statistics.worker(0), statistics.worker(1)]))
+        thread.daemon = True
+        thread.start()
+        for action in actions:
+            action.started.wait(5)
+        handler = signal_mock.call_args[0][1]
+        self.assertRaises(SystemExit, handler, None, None)
+        self.assertEqual([False, False],
+                         [action.torn_down_running for action in actions])
+
+    @mock.patch.object(stressaction.StressAction, 'tearDown')
+    @mock.patch('signal.signal')
+    def testRunClosedLoopStopOnError(self, signal_mock, tear_down):
+        statistics = stress_stats.Statistics(2)
+        failing = FakeStressActionFailing(manager=None, max_runs=1000,
+                                          stop_on_error=True)
+        other = FakeStressAction(manager=None)
+        exc = self.assertRaises(SystemExit, driver.run_closed_loop,
+                                [failing, other],
+                                [statistics.worker(0), statistics.worker(1)])
+        self.assertEqual(1, exc.code)
+        self.assertEqual(2, tear_down.call_count)
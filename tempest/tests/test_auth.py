@@ -0,0 +1,132 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+import fixtures
+import mock
+
+from tempest import auth
+from tempest.tests import base
+
+KEY = ('KeystoneV2AuthProvider', 'json', 'user', 'tenant', None)
+AUTH_DATA = ('token', {'token': {'id': 'token'}})
+
+
+class TestTokenCache(base.TestCase):
+
+    def setUp(self):
+        super(TestTokenCache, self).setUp()
+        self.cache_dir = self.useFixture(fixtures.TempDir()).path
+        self.expiry = datetime.datetime.now() + datetime.timedelta(hours=1)
+
+    def test_get_put(self):
+        cache = auth.TokenCache()
+        self.assertIsNone(cache.get(KEY))
+        cache.put(KEY, AUTH_DATA, self.expiry)
+        self.assertEqual(AUTH_DATA, cache.get(KEY))
+        cache.invalidate(KEY)
+        self.assertIsNone(cache.get(KEY))
+
+    def test_expiry_margin(self):
+        cache = auth.TokenCache(expiry_margin=60)
+        expiry = datetime.datetime.now() + datetime.timedelta(seconds=30)
+        cache.put(KEY, AUTH_DATA, expiry)
+        self.assertIsNone(cache.get(KEY))
+
+    def test_persistent_shared_between_caches(self):
+        cache = auth.TokenCache(cache_dir=self.cache_dir)
+        other = auth.TokenCache(cache_dir=self.cache_dir)
+        cache.put(KEY, AUTH_DATA, self.expiry, persistent=True)
+        self.assertEqual(AUTH_DATA, other.get(KEY))
+        cache.invalidate(KEY)
+        self.assertIsNone(other.get(KEY))
+
+    def test_not_persistent(self):
+        cache = auth.TokenCache(cache_dir=self.cache_dir)
+        other = auth.TokenCache(cache_dir=self.cache_dir)
+        cache.put(KEY, AUTH_DATA, self.expiry)
+        self.assertIsNone(other.get(KEY))
+
+
+class TestBaseUrl(base.TestCase):
+
+    CATALOG = {'serviceCatalog': [
+        {'type': 'compute',
+         'endpoints': [{'region': 'r1', 'publicURL': 'http://r1/v2'},
+                       {'region': 'r2', 'publicURL': 'http://r2/v2'}]}]}
+
+    def setUp(self):
+        super(TestBaseUrl, self).setUp()
+        self.patch('tempest.auth.get_token_cache', return_value=None)
+        self.patch('tempest.auth.KeystoneV2AuthProvider._auth_client')
+        self.provider = auth.KeystoneV2AuthProvider(
+            dict(username='user', password='pass', tenant_name='tenant'))
+        self.lookup = self.patch(
+            'tempest.auth.KeystoneV2AuthProvider._base_url',
+            side_effect=auth.KeystoneV2AuthProvider._base_url.im_func,
+            autospec=True)
+
+    def test_base_url(self):
+        filters = dict(service='compute', region='r2', api_version='v3')
+        self.assertEqual(
+            'http://r2/v3',
+            self.provider.base_url(filters, ('token', self.CATALOG)))
+        self.assertEqual(
+            'http://r2/v3',
+            self.provider.base_url(filters, ('token', self.CATALOG)))
+        self.assertEqual(1, self.lookup.call_count)
+
+    def test_base_url_per_token(self):
+        filters = dict(service='compute', region='r1')
+        self.provider.base_url(filters, ('token', self.CATALOG))
+        self.provider.base_url(filters, ('other', self.CATALOG))
+        self.provider.base_url(dict(filters, skip_path=True),
+                               ('other', self.CATALOG))
+        self.assertEqual(3, self.lookup.call_count)
+
+
+class TestTokenCacheKey(base.TestCase):
+
+    def setUp(self):
+        super(TestTokenCacheKey, self).setUp()
+        self.cache = auth.TokenCache()
+        self.patch('tempest.auth.get_token_cache', return_value=self.cache)
+        self.patch('tempest.auth.KeystoneV2AuthProvider._auth_client',
+                   side_effect=lambda: mock.Mock(auth_url='http://id/v2.0'))
+
+    def _provider(self, **credentials):
+        creds = dict(username='user', password='pass', tenant_name='tenant')
+        creds.update(credentials)
+        return auth.KeystoneV2AuthProvider(creds)
+
+    def test_key_includes_password_and_uri(self):
+        provider = self._provider()
+        self.assertNotEqual(provider.token_cache_key,
+                            self._provider(password='other').token_cache_key)
+        self.assertNotIn('pass', provider.token_cache_key)
+        other = self._provider()
+        other.auth_client.auth_url = 'http://other/v2.0'
+        self.assertNotEqual(provider.token_cache_key, other.token_cache_key)
+
+    def test_disable_token_cache(self):
+        provider = self._provider()
+        self.cache.put(provider.token_cache_key, AUTH_DATA,
+                       datetime.datetime.now() + datetime.timedelta(hours=1))
+        self.patch('tempest.auth.KeystoneV2AuthProvider._request_auth',
+                   return_value=('other', {}))
+        provider.disable_token_cache()
+        self.assertEqual(('other', {}), provider.auth_data)
+        provider.clear_auth()
+        self.assertEqual(AUTH_DATA, self.cache.get(provider.token_cache_key))
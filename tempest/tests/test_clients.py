@@ -0,0 +1,92 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+
+import mock
+
+from tempest import clients
+from tempest import exceptions
+from tempest.tests import base
+from tempest.tests import fake_auth_provider
+
+
+class TestManager(base.TestCase):
+
+    def setUp(self):
+        super(TestManager, self).setUp()
+        self.conf = self.patch('tempest.clients.CONF')
+        self.conf.identity.auth_version = 'v2'
+        self.auth_provider = fake_auth_provider.FakeAuthProvider()
+        self.patch('tempest.clients.Manager.get_auth_provider',
+                   return_value=self.auth_provider)
+        self.servers_client = mock.Mock()
+
+    def _manager(self, interface='json'):
+        manager = clients.Manager('user', 'pass', 'tenant',
+                                  interface=interface, service='compute')
+        manager.client_classes['servers_client'] = self.servers_client
+        return manager
+
+    def test_clients_created_on_access(self):
+        manager = self._manager()
+        self.assertFalse(self.servers_client.called)
+        client = manager.servers_client
+        self.servers_client.assert_called_once_with(self.auth_provider)
+        self.assertIs(client, manager.servers_client)
+        self.assertEqual(1, self.servers_client.call_count)
+
+    def test_created_once_by_threads(self):
+        def create(auth_provider):
+            # Leaves the time to the other threads to ask for the client
+            time.sleep(0.01)
+            return object()
+        self.servers_client.side_effect = create
+        manager = self._manager()
+        clients_got = []
+        threads = [threading.Thread(
+            target=lambda: clients_got.append(manager.servers_client))
+            for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, self.servers_client.call_count)
+        self.assertEqual(1, len(set(map(id, clients_got))))
+
+    def test_attribute_error_in_client(self):
+        self.servers_client.side_effect = AttributeError('region')
+        manager = self._manager()
+        self.assertRaises(exceptions.ClientCreationError,
+                          getattr, manager, 'servers_client')
+
+    def test_unknown_client(self):
+        manager = self._manager()
+        self.assertRaises(AttributeError, getattr, manager, 'foo_client')
+        self.assertFalse(hasattr(manager, 'servers_v3_client_xml'))
+
+    def test_disabled_service(self):
+        self.conf.service_available.ceilometer = False
+        manager = self._manager()
+        self.assertFalse(hasattr(manager, 'telemetry_client'))
+
+    def test_xml_has_no_v3_clients(self):
+        manager = self._manager('xml')
+        self.assertFalse(hasattr(manager, 'servers_v3_client'))
+
+    def test_unsupported_interface(self):
+        self.assertRaises(exceptions.InvalidConfiguration,
+                          clients.Manager, 'user', 'pass', 'tenant',
+                          interface='yaml')
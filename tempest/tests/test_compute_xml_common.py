@@ -65,3 +65,68 @@ class TestXMLParser(base.TestCase):
           </health_monitor>''')
         body = common.xml_to_json(node, 'elements')
         self.assertEqual(body['elements'], ['first_element', 'second_element'])
+
+    def test_xml_to_json_parser_type_precedence(self):
+        node = etree.fromstring('''<health_monitor
+        xmlns:quantum="http://openstack.org/quantum/api/v2.0">
+          <a quantum:type="long" other="int">3</a>
+          <b quantum:type="int" other="bool">True</b>
+          <c quantum:type="x" other="y">z</c>
+          </health_monitor>''')
+        body = common.xml_to_json(node)
+        self.assertEqual({'a': 3, 'b': True, 'c': 'z'}, body)
+        self.assertIsInstance(body['a'], int)
+
+    def test_xml_to_json_parser_nested_plurals(self):
+        node = etree.fromstring('''<servers
+        xmlns="http://docs.openstack.org/compute/api/v1.1">
+          <server id="1">
+            <metadata><meta key="k">v</meta></metadata>
+            <links/>
+            <empty attr="value"/>
+          </server>
+          </servers>''')
+        body = common.xml_to_json(node, ['metadata', 'links'])
+        self.assertEqual({'server': {'id': '1', 'metadata': ['v'],
+                                     'links': [],
+                                     'empty': {'attr': 'value'}}}, body)
+        self.assertEqual({'server': {'id': '1', 'metadata': {'meta': 'v'},
+                                     'links': {},
+                                     'empty': {'attr': 'value'}}},
+                         common.xml_to_json(node))
+
+
+class TestXMLSerialization(base.TestCase):
+
+    def test_document(self):
+        server = common.Element('server', name='vm')
+        server.append(common.Element('metadata',
+                                     common.Element('meta', 'v', key='k')))
+        server.append(common.Element('links'))
+        declaration, body = str(common.Document(server)).split('\n')
+        self.assertEqual('<?xml ', declaration[:6])
+        self.assertEqual('<server name="vm"><metadata >'
+                         '<meta key="k">v</meta></metadata>'
+                         '<links /></server>', body)
+
+    def test_escaping(self):
+        meta = common.Element('meta', common.Text('a < b & "c"'),
+                              key='<"k">', empty=None)
+        body = str(common.Document(meta))
+        node = etree.fromstring(body)
+        self.assertEqual('a < b & "c"', node.text)
+        self.assertEqual('<"k">', node.get('key'))
+        self.assertEqual('', node.get('empty'))
+        self.assertEqual('<value >1 &amp; 2</value>',
+                         str(common.Element('value', '1 & 2')))
+
+    def test_write(self):
+        parts = []
+        ports = common.Element('ports')
+        for i in range(3):
+            ports.append(common.Element('port', common.Element('id', i)))
+        ports.write(parts.append)
+        self.assertEqual(str(ports), ''.join(parts))
+        self.assertEqual(['0', '1', '2'],
+                         [port.find('id').text
+                          for port in etree.fromstring(str(ports))])
@@ -0,0 +1,67 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+
+from lxml import etree
+
+from tempest import config
+from tempest.openstack.common.fixture import mockpatch
+from tempest.services.identity.v3.xml import credentials_client
+from tempest.tests import base
+from tempest.tests import fake_auth_provider
+from tempest.tests import fake_config
+
+
+class TestCredentialsClientXML(base.TestCase):
+
+    def setUp(self):
+        super(TestCredentialsClientXML, self).setUp()
+        self.stubs.Set(config, 'TempestConfigPrivate', fake_config.FakeConfig)
+        self.client = credentials_client.CredentialsClientXML(
+            fake_auth_provider.FakeAuthProvider())
+        self.requests = []
+        for method in ('post', 'patch'):
+            self.useFixture(mockpatch.PatchObject(self.client, method,
+                                                  side_effect=self._echo))
+
+    def _echo(self, url, body, headers):
+        # The server echoes the credential back, so the blob round trips
+        self.requests.append(body)
+        return {'status': '201'}, body
+
+    def _sent_blob(self):
+        node = etree.fromstring(self.requests[-1])
+        blob = node.find('{%s}blob' % credentials_client.XMLNS)
+        return json.loads(blob.text)
+
+    def test_create_credential_blob(self):
+        resp, body = self.client.create_credential('ac"<ess', 'sec&ret',
+                                                   'user', 'project')
+        expected = {'access': 'ac"<ess', 'secret': 'sec&ret'}
+        self.assertEqual(expected, self._sent_blob())
+        self.assertEqual(expected, body['blob'])
+        self.assertNotIn('&amp;quot;', self.requests[-1])
+
+    def test_update_credential_blob(self):
+        current = {'type': 'ec2', 'project_id': 'project',
+                   'user_id': 'user',
+                   'blob': {'access': 'old', 'secret': 'old'}}
+        self.useFixture(mockpatch.PatchObject(
+            self.client, 'get_credential',
+            return_value=({'status': '200'}, current)))
+        resp, body = self.client.update_credential('cred', access_key='new')
+        expected = {'access': 'new', 'secret': 'old'}
+        self.assertEqual(expected, self._sent_blob())
+        self.assertEqual(expected, body['blob'])
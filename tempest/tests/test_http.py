@@ -0,0 +1,183 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import httplib
+import socket
+
+import httplib2
+import mock
+
+from tempest.common import http
+from tempest.tests import base
+
+
+class TestConnectionPool(base.TestCase):
+
+    def setUp(self):
+        super(TestConnectionPool, self).setUp()
+        self.pool = http.ConnectionPool(max_size=1, idle_timeout=10)
+        self.t_mock = self.patch('time.time')
+        self.t_mock.return_value = 1000
+
+    def test_get_reuses_idle_connection(self):
+        http_obj, reused = self.pool.get('http:host')
+        self.assertFalse(reused)
+        self.pool.put('http:host', http_obj)
+        again, reused = self.pool.get('http:host')
+        self.assertTrue(reused)
+        self.assertIs(http_obj, again)
+        _, reused = self.pool.get('http:other')
+        self.assertFalse(reused)
+
+    def test_put_bounded(self):
+        first, _ = self.pool.get('http:host')
+        second, _ = self.pool.get('http:host')
+        conn = mock.MagicMock()
+        second.connections['http:host'] = conn
+        self.pool.put('http:host', first)
+        self.pool.put('http:host', second)
+        conn.close.assert_called_once_with()
+        self.assertEqual(1, len(self.pool._idle['http:host']))
+
+    def test_idle_eviction(self):
+        http_obj, _ = self.pool.get('http:host')
+        conn = mock.MagicMock()
+        http_obj.connections['http:host'] = conn
+        self.pool.put('http:host', http_obj)
+        self.t_mock.return_value = 1011
+        _, reused = self.pool.get('http:host')
+        self.assertFalse(reused)
+        conn.close.assert_called_once_with()
+
+
+class TestSingleAttemptHttp(base.TestCase):
+
+    def setUp(self):
+        super(TestSingleAttemptHttp, self).setUp()
+        self.http = http.SingleAttemptHttp()
+        self.conn = mock.Mock()
+
+    def _conn_request(self):
+        return self.http._conn_request(self.conn, '/', 'GET', None, {})
+
+    def test_send_error(self):
+        self.conn.request.side_effect = socket.error()
+        self.assertRaises(socket.error, self._conn_request)
+        self.assertTrue(self.http.no_response)
+        self.conn.request.assert_called_once_with('GET', '/', None, {})
+
+    def test_closed_without_answer(self):
+        self.conn.getresponse.side_effect = httplib.BadStatusLine('')
+        self.assertRaises(httplib.BadStatusLine, self._conn_request)
+        self.assertTrue(self.http.no_response)
+        self.assertEqual(1, self.conn.request.call_count)
+
+    def test_response_started(self):
+        self.conn.getresponse.side_effect = httplib.BadStatusLine('garbage')
+        self.assertRaises(httplib.BadStatusLine, self._conn_request)
+        self.assertFalse(self.http.no_response)
+        self.conn.getresponse.side_effect = socket.error()
+        self.assertRaises(socket.error, self._conn_request)
+        self.assertFalse(self.http.no_response)
+
+    def test_timeout(self):
+        self.conn.request.side_effect = socket.timeout()
+        self.assertRaises(socket.timeout, self._conn_request)
+        self.assertFalse(self.http.no_response)
+
+
+class TestPooledHttp(base.TestCase):
+
+    def setUp(self):
+        super(TestPooledHttp, self).setUp()
+        self.pool = http.ConnectionPool()
+        self.http = http.PooledHttp(self.pool)
+        self.results = []
+        self.no_response = True
+        self.request = self.patch('httplib2.Http.request', autospec=True,
+                                  side_effect=self._request)
+
+    def _request(self, http_obj, *args, **kwargs):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            http_obj.no_response = self.no_response
+            raise result
+        return result
+
+    def _reuse(self, method='GET'):
+        # Leaves a connection in the pool, then fails once on it
+        self.results = [(httplib2.Response({}), ''),
+                        httplib.BadStatusLine(''),
+                        (httplib2.Response({}), 'body')]
+        self.http.request('http://host/', method)
+
+    def test_request_keeps_connection(self):
+        self.results = [(httplib2.Response({}), '')] * 2
+        self.http.request('http://host:5000/v2.0', 'GET')
+        self.http.request('http://host:5000/v2.0', 'GET')
+        self.assertEqual(1, len(self.pool._idle['http:host:5000']))
+
+    def test_request_connection_close(self):
+        self.results = [(httplib2.Response({'connection': 'close'}), '')]
+        self.http.request('http://host/', 'GET')
+        self.assertEqual([], self.pool._idle['http:host'])
+
+    def test_stale_connection_retried(self):
+        self._reuse()
+        _, body = self.http.request('http://host/', 'GET')
+        self.assertEqual('body', body)
+        self.assertEqual(3, self.request.call_count)
+
+    def test_new_connection_not_retried(self):
+        self.results = [httplib.BadStatusLine('')]
+        self.assertRaises(httplib.BadStatusLine, self.http.request,
+                          'http://host/', 'GET')
+        self.assertEqual(1, self.request.call_count)
+
+    def test_post_not_retried(self):
+        self._reuse(method='POST')
+        self.assertRaises(httplib.BadStatusLine, self.http.request,
+                          'http://host/', 'POST')
+        self.assertEqual(2, self.request.call_count)
+
+    def test_response_started_not_retried(self):
+        self._reuse()
+        self.no_response = False
+        self.assertRaises(httplib.BadStatusLine, self.http.request,
+                          'http://host/', 'GET')
+        self.assertEqual(2, self.request.call_count)
+
+
+class TestRequestTiming(base.TestCase):
+
+    def setUp(self):
+        super(TestRequestTiming, self).setUp()
+        self.patch('httplib2.HTTPConnectionWithTimeout.connect')
+        self.patch('httplib2.HTTPConnectionWithTimeout.getresponse')
+        self.t_mock = self.patch('time.time')
+
+    def test_timed_connection(self):
+        self.t_mock.side_effect = [1000, 1000.5, 1001]
+        http.timing.reset(999)
+        conn = http.TimedHTTPConnection('host')
+        conn.connect()
+        conn.getresponse()
+        self.assertEqual(0.5, http.timing.connect)
+        self.assertEqual(2, http.timing.first_byte)
+
+    def test_closing_http_times_connections(self):
+        request = self.patch('httplib2.Http.request')
+        http.ClosingHttp().request('https://host/', 'GET')
+        self.assertEqual(http.TimedHTTPSConnection,
+                         request.call_args[1]['connection_type'])
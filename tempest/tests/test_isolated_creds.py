@@ -0,0 +1,79 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import subprocess
+import sys
+
+import fixtures
+
+from tempest.common import isolated_creds
+from tempest.tests import base
+
+NO_NETWORK = {'network': False, 'router': False, 'subnet': False,
+              'dhcp': False}
+
+
+def _cred_set(network_resources=None):
+    return {'network_resources': network_resources,
+            'creds': {'primary': [{'id': 'u1', 'name': 'user'},
+                                  {'id': 't1', 'name': 'tenant'}]},
+            'net_resources': {}}
+
+
+class TestCredentialPool(base.TestCase):
+
+    def setUp(self):
+        super(TestCredentialPool, self).setUp()
+        path = self.useFixture(fixtures.TempDir()).path
+        self.pool = isolated_creds.CredentialPool(path)
+        self.pool.save([_cred_set(), _cred_set(NO_NETWORK)])
+
+    def test_lease_release(self):
+        cred_set, lease = self.pool.lease()
+        self.assertEqual(0, lease[0])
+        self.assertIsNone(cred_set['network_resources'])
+        # The only matching set is in use
+        self.assertEqual((None, None), self.pool.lease({}))
+        self.pool.release(lease)
+        cred_set, lease = self.pool.lease({})
+        self.assertEqual(0, lease[0])
+        self.pool.release(lease)
+
+    def test_lease_locks_file(self):
+        # The lease blocks the other processes until it is released
+        lock_file = self.pool._lock_file(0)
+        try_lock = [sys.executable, '-c',
+                    'import fcntl, sys; '
+                    'fcntl.lockf(open(sys.argv[1], "w"), '
+                    'fcntl.LOCK_EX | fcntl.LOCK_NB)', lock_file]
+        cred_set, lease = self.pool.lease()
+        self.assertNotEqual(0, subprocess.call(try_lock,
+                                               stderr=subprocess.PIPE))
+        self.pool.release(lease)
+        self.assertTrue(lease[1].closed)
+        self.assertEqual(0, subprocess.call(try_lock))
+
+    def test_lease_matches_network_resources(self):
+        cred_set, lease = self.pool.lease(NO_NETWORK)
+        self.assertEqual(1, lease[0])
+        self.assertEqual(NO_NETWORK, cred_set['network_resources'])
+        self.pool.release(lease)
+
+    def test_pooled_resource(self):
+        cred_set, lease = self.pool.lease()
+        self.addCleanup(self.pool.release, lease)
+        user = isolated_creds._PooledResource(cred_set['creds']['primary'][0])
+        self.assertEqual('user', user.name)
+        self.assertEqual('user', user.get('name'))
+        self.assertRaises(AttributeError, getattr, user, 'email')
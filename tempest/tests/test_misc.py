@@ -0,0 +1,33 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from tempest.common.utils import misc
+from tempest.tests import base
+
+
+class TestRunConcurrently(base.TestCase):
+
+    @staticmethod
+    def _check(value):
+        if value == 2:
+            raise ValueError(value)
+        return value
+
+    def test_results_in_order(self):
+        self.assertEqual([1, 3, 4], misc.run_concurrently(
+            self._check, [(1,), (3,), (4,)], 2))
+
+    def test_raises(self):
+        self.assertRaises(ValueError, misc.run_concurrently, self._check,
+                          [(1,), (2,), (3,)], 2)
@@ -0,0 +1,193 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import os
+
+import fixtures
+
+from tempest.common import generate_json
+from tempest import test
+from tempest.tests import base
+
+NESTED_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "minLength": 2},
+        "server": {
+            "type": "object",
+            "properties": {
+                "ram": {"type": "integer", "minimum": 1},
+                "metadata": {
+                    "type": "object",
+                    "properties": {"key": {"type": "string"}},
+                },
+            },
+            "required": ["ram"],
+        },
+    },
+    "required": ["name"],
+}
+
+DESCRIPTION = {
+    "name": "list-flavors",
+    "http-method": "GET",
+    "url": "flavors/%s",
+    "resources": ["flavor"],
+    "json-schema": {
+        "type": "object",
+        "properties": {"minRam": {"type": "integer"}},
+    },
+}
+
+
+class TestGenerateInvalid(base.TestCase):
+
+    def test_nested(self):
+        valid = generate_json.generate_valid(NESTED_SCHEMA)
+        invalids = dict((name, data) for name, data, _ in
+                        generate_json.generate_invalid(NESTED_SCHEMA))
+        self.assertNotIn('name', invalids['gen_obj_remove_attr'])
+        self.assertEqual(
+            0, invalids['prop_server_prop_ram_gen_int_min']['server']['ram'])
+        self.assertEqual(
+            4,
+            invalids['prop_server_prop_metadata_prop_key_gen_int']
+            ['server']['metadata']['key'])
+        # Only the changed leaf differs from the valid object
+        changed = invalids['prop_server_prop_ram_gen_int_min']
+        self.assertEqual(valid['name'], changed['name'])
+        self.assertEqual(valid['server']['metadata'],
+                         changed['server']['metadata'])
+        self.assertEqual(1, valid['server']['ram'])
+
+
+class TestExpandSchema(base.TestCase):
+
+    def setUp(self):
+        super(TestExpandSchema, self).setUp()
+        self.path = self.useFixture(fixtures.TempDir()).path
+        self.useFixture(fixtures.MonkeyPatch(
+            'tempest.test.NegativeAutoTest.schema_dir', self.path))
+        self.useFixture(fixtures.MonkeyPatch(
+            'tempest.test.NegativeAutoTest.scenario_cache_dir',
+            os.path.join(self.path, 'cache')))
+        self._new_process()
+        self._write(DESCRIPTION)
+        self.validate = self.patch(
+            'tempest.common.generate_json.validate_negative_test_schema')
+
+    def _new_process(self):
+        self.useFixture(fixtures.MonkeyPatch(
+            'tempest.test.NegativeAutoTest._expanded', {}))
+
+    def _write(self, description):
+        with open(os.path.join(self.path, 'list.json'), 'w') as schema_file:
+            json.dump(description, schema_file)
+
+    def test_generate_scenario(self):
+        scenarios = dict(test.NegativeAutoTest.generate_scenario('list.json'))
+        self.assertEqual('flavor', scenarios['inv_res_flavor']['resource'][0])
+        self.assertEqual({'schema': {'minRam': 'XXXXXX'},
+                          'expected_result': None},
+                         scenarios['prop_minRam_gen_string'])
+
+    def test_cached(self):
+        first = test.NegativeAutoTest.generate_scenario('list.json')
+        second = test.NegativeAutoTest.generate_scenario('list.json')
+        self.assertEqual(1, self.validate.call_count)
+        # The invalid resources are still random
+        self.assertNotEqual(first[0], second[0])
+        self.assertEqual(first[1:], second[1:])
+
+    def test_cached_across_processes(self):
+        _, first = test.NegativeAutoTest.expand_schema('list.json')
+        self._new_process()
+        _, second = test.NegativeAutoTest.expand_schema('list.json')
+        self.assertEqual(1, self.validate.call_count)
+        self.assertEqual(first, second)
+
+    def test_changed_generator_expanded_again(self):
+        test.NegativeAutoTest.expand_schema('list.json')
+        self.useFixture(fixtures.MonkeyPatch(
+            'tempest.test.NegativeAutoTest._generator_hash', 'changed'))
+        test.NegativeAutoTest.expand_schema('list.json')
+        self.assertEqual(2, self.validate.call_count)
+
+    def test_changed_file_expanded_again(self):
+        test.NegativeAutoTest.expand_schema('list.json')
+        self._write(dict(DESCRIPTION, **{
+            "json-schema": {"type": "object",
+                            "properties": {"minDisk": {"type": "integer"}}}}))
+        _, invalids = test.NegativeAutoTest.expand_schema('list.json')
+        self.assertEqual(2, self.validate.call_count)
+        self.assertIn('prop_minDisk_gen_none',
+                      [invalid[0] for invalid in invalids])
+
+
+class FakeResponse(object):
+
+    def __init__(self, status):
+        self.status = status
+
+
+class FakeNegativeClient(object):
+    """Answers 400 with the id of the request, and 200 for some queries."""
+
+    def __init__(self):
+        self.requests = []
+
+    def _get_http(self):
+        return None
+
+    def send_request(self, method, url_template, resources, body=None):
+        self.requests.append(url_template % tuple(resources))
+        if 'minRam=None' in url_template:
+            return FakeResponse(200), '{}'
+        return FakeResponse(400), ('{"badRequest": {"message": "Invalid '
+                                   'request %d"}}' % len(self.requests))
+
+
+class TestExecuteBatch(TestExpandSchema):
+
+    def setUp(self):
+        super(TestExecuteBatch, self).setUp()
+
+        class NegativeBatchTest(test.NegativeAutoTest):
+
+            def test_batch(self):
+                self.execute_batch('list.json')
+
+        self.case = NegativeBatchTest('test_batch')
+        self.case.client = FakeNegativeClient()
+
+    def test_failed_variants(self):
+        e = self.assertRaises(self.case.failureException,
+                              self.case.execute_batch, 'list.json', 2)
+        self.assertIn('1 of 3 variants failed', str(e))
+        self.assertIn('prop_minRam_gen_none', str(e))
+        self.assertEqual(3, len(self.case.client.requests))
+        report = self.case.getDetails()['negative-variants'].as_text()
+        # The error responses differing by a number are one cluster
+        self.assertIn('PASS 400 (2 variants)', report)
+        self.assertIn('FAIL 200 (1 variants)', report)
+
+    def test_cluster(self):
+        clusters = test.cluster_negative_results([
+            ('a', 400, 'Invalid 1', None),
+            ('b', 400, 'Invalid 2', None),
+            ('c', 404, 'Invalid 3', None),
+            ('d', 200, '{}', 'Expected client error')])
+        self.assertEqual([['a', 'b'], ['c'], ['d']], clusters.values())
+        self.assertEqual((True, 400, 'Invalid #'), clusters.keys()[0])
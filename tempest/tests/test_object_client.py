@@ -0,0 +1,335 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import BaseHTTPServer
+import cStringIO
+import hashlib
+import json
+import os
+import SocketServer
+import threading
+
+import fixtures
+
+from tempest.common import http
+from tempest.common import request_timing
+from tempest import config
+from tempest import exceptions
+from tempest.openstack.common.fixture import mockpatch
+from tempest.services.object_storage import object_client
+from tempest.tests import base
+from tempest.tests import fake_auth_provider
+from tempest.tests import fake_config
+
+
+class FakeSwiftServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class FakeSwiftHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Stores the objects PUT, chunked or not, and serves them back."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _read_body(self):
+        if self.headers.get('transfer-encoding') == 'chunked':
+            self.server.chunked.append(self.path)
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+                if not size:
+                    return ''.join(chunks)
+        return self.rfile.read(int(self.headers['content-length']))
+
+    def _reply(self, status, body='', etag=None, length=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length',
+                         str(len(body) if length is None else length))
+        self.send_header('Etag', etag or hashlib.md5(body).hexdigest())
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _rate_limited(self):
+        with self.server.lock:
+            self.server.connections.add(self.client_address)
+            if not self.server.rate_limited:
+                return False
+            self.server.rate_limited -= 1
+        body = json.dumps({'overLimit': {'message': 'slow down'}})
+        self.send_response(413)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Retry-After', '0')
+        self.end_headers()
+        self.wfile.write(body)
+        return True
+
+    def do_PUT(self):
+        body = self._read_body()
+        if self._rate_limited():
+            return
+        self.server.objects[self.path] = body
+        self.server.headers[self.path] = self.headers
+        self._reply(201, etag=hashlib.md5(body).hexdigest())
+
+    def do_HEAD(self):
+        body = self.server.objects[self.path]
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Etag', self.server.etags.get(
+            self.path, hashlib.md5(body).hexdigest()))
+        self.end_headers()
+
+    def do_GET(self):
+        if self._rate_limited():
+            return
+        if self.path not in self.server.objects:
+            self._reply(404, 'Not Found')
+            return
+        body = self.server.objects[self.path]
+        if 'range' in self.headers and not self.server.ignore_ranges:
+            self.server.ranges.append(self.headers['range'])
+            start, end = self.headers['range'][len('bytes='):].split('-')
+            # Drops the last byte of the ranges when short_ranges is set
+            end = int(end) + 1 - self.server.short_ranges
+            self._reply(206, body[int(start):end])
+        else:
+            self._reply(200, body)
+
+
+class FakeAuthProvider(fake_auth_provider.FakeAuthProvider):
+    """Sends the requests to the URL of a fake swift server."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def auth_request(self, method, url, headers=None, body=None, filters=None):
+        return self.base_url + '/' + url, headers, body
+
+
+class TestObjectClientStreaming(base.TestCase):
+
+    def setUp(self):
+        super(TestObjectClientStreaming, self).setUp()
+        self.stubs.Set(config, 'TempestConfigPrivate', fake_config.FakeConfig)
+        server = FakeSwiftServer(('127.0.0.1', 0), FakeSwiftHandler)
+        server.lock = threading.Lock()
+        server.connections = set()
+        server.rate_limited = 0
+        server.objects = {}
+        server.chunked = []
+        server.headers = {}
+        server.etags = {}
+        server.ranges = []
+        server.ignore_ranges = False
+        server.short_ranges = False
+        self.server = server
+        thread = threading.Thread(target=server.serve_forever, args=(0.01,))
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.client = object_client.ObjectClient(FakeAuthProvider(
+            'http://127.0.0.1:%d' % server.server_port))
+        self.useFixture(mockpatch.PatchObject(self.client, '_get_region',
+                                              return_value='fake region'))
+        self.container = 'c'
+        self.path = self.useFixture(fixtures.TempDir()).path
+
+    def test_upload_file(self):
+        data = os.urandom(100000)
+        path = os.path.join(self.path, 'data')
+        with open(path, 'wb') as data_file:
+            data_file.write(data)
+        with open(path, 'rb') as data_file:
+            resp, _ = self.client.create_object(self.container, 'o',
+                                                data_file, chunk_size=4096)
+        self.assertEqual(201, resp.status)
+        self.assertEqual(data, self.server.objects['/c/o'])
+        # The size of a file is known
+        self.assertEqual([], self.server.chunked)
+
+    def test_upload_iterator_chunked(self):
+        resp, _ = self.client.create_object_segments(
+            self.container, 'o', '1', iter(['ab', '', 'cde']))
+        self.assertEqual(201, resp.status)
+        self.assertEqual('abcde', self.server.objects['/c/o/1'])
+        self.assertEqual(['/c/o/1'], self.server.chunked)
+
+    def test_upload_with_length(self):
+        self.client.create_object(self.container, 'o',
+                                  cStringIO.StringIO('abcde'), length=5)
+        self.assertEqual('abcde', self.server.objects['/c/o'])
+        self.assertEqual([], self.server.chunked)
+
+    def test_string_not_streamed(self):
+        self.patch('tempest.common.rest_client.RestClient.put')
+        self.client.put.return_value = ('resp', '')
+        self.client.create_object(self.container, 'o', 'abcde')
+        self.assertEqual(1, self.client.put.call_count)
+
+    def test_get_object_stream(self):
+        self.server.objects['/c/o'] = 'x' * 10000
+        resp, body = self.client.get_object_stream(self.container, 'o',
+                                                   chunk_size=4096)
+        self.assertEqual(200, resp.status)
+        self.assertEqual([4096, 4096, 1808], [len(chunk) for chunk in body])
+
+    def test_download_object(self):
+        data = os.urandom(10000)
+        self.server.objects['/c/o'] = data
+        path = os.path.join(self.path, 'download')
+        resp, checksum = self.client.download_object(self.container, 'o',
+                                                     path, chunk_size=4096)
+        self.assertEqual(resp['etag'], checksum)
+        with open(path, 'rb') as download:
+            self.assertEqual(data, download.read())
+
+    def test_download_missing(self):
+        self.assertRaises(exceptions.NotFound,
+                          self.client.get_object_stream, self.container, 'x')
+
+    def test_timing_event(self):
+        events = []
+        request_timing.add_listener(events.append)
+        self.addCleanup(request_timing.remove_listener, events.append)
+        self.server.objects['/c/o'] = 'x' * 10000
+        self.client.create_object(self.container, 'p',
+                                  cStringIO.StringIO('abcde'))
+        _, body = self.client.get_object_stream(self.container, 'o')
+        self.assertEqual(1, len(events))
+        ''.join(body)
+        self.assertEqual([('PUT', 201, 5, 0), ('GET', 200, 0, 10000)],
+                         [(event.method, event.status, event.request_bytes,
+                           event.response_bytes) for event in events])
+        self.assertEqual('object-store', events[1].service)
+        self.assertIsNotNone(events[1].first_byte)
+
+    def test_keep_alive(self):
+        pool = http.ConnectionPool()
+        self.addCleanup(pool.clear)
+        self.client.http_obj = http.PooledHttp(pool)
+        self.server.objects['/c/o'] = 'abcde'
+        for _ in range(3):
+            _, body = self.client.get_object_stream(self.container, 'o')
+            self.assertEqual('abcde', ''.join(body))
+        self.client.create_object(self.container, 'p',
+                                  cStringIO.StringIO('abcde'))
+        self.assertEqual(1, len(self.server.connections))
+
+    def test_rate_limited_retried(self):
+        self.server.rate_limited = 2
+        resp, _ = self.client.create_object(self.container, 'o',
+                                            cStringIO.StringIO('abcde'))
+        self.assertEqual(201, resp.status)
+        self.assertEqual('abcde', self.server.objects['/c/o'])
+
+    def test_rate_limited_iterator_not_retried(self):
+        self.server.rate_limited = 1
+        self.assertRaises(exceptions.RateLimitExceeded,
+                          self.client.create_object, self.container, 'o',
+                          iter(['abcde']))
+
+
+class TestLargeObjects(TestObjectClientStreaming):
+
+    def setUp(self):
+        super(TestLargeObjects, self).setUp()
+        self.data = os.urandom(10000)
+        self.data_path = os.path.join(self.path, 'data')
+        with open(self.data_path, 'wb') as data_file:
+            data_file.write(self.data)
+
+    def _segments(self):
+        return [self.server.objects['/c/o/%08d' % index]
+                for index in range(3)]
+
+    def test_upload_dynamic(self):
+        resp, segments = self.client.upload_large_object(
+            self.container, 'o', self.data_path, segment_size=4096)
+        self.assertEqual(201, resp.status)
+        self.assertEqual(self.data, ''.join(self._segments()))
+        self.assertEqual([4096, 4096, 1808],
+                         [segment['size_bytes'] for segment in segments])
+        self.assertEqual('/c/o/00000002', segments[2]['path'])
+        self.assertEqual('c/o/',
+                         self.server.headers['/c/o']['x-object-manifest'])
+
+    def test_upload_static(self):
+        _, segments = self.client.upload_large_object(
+            self.container, 'o', self.data_path, segment_size=4096,
+            static=True)
+        self.assertEqual(self.data, ''.join(self._segments()))
+        self.assertEqual(
+            segments,
+            json.loads(self.server.objects['/c/o?multipart-manifest=put']))
+        self.assertEqual(hashlib.md5(self._segments()[0]).hexdigest(),
+                         segments[0]['etag'])
+
+    def test_download(self):
+        self.server.objects['/c/o'] = self.data
+        path = os.path.join(self.path, 'download')
+        resp, checksum = self.client.download_large_object(
+            self.container, 'o', path, range_size=4096)
+        self.assertEqual(hashlib.md5(self.data).hexdigest(), checksum)
+        with open(path, 'rb') as download:
+            self.assertEqual(self.data, download.read())
+        self.assertEqual(['bytes=0-4095', 'bytes=4096-8191',
+                          'bytes=8192-9999'], sorted(self.server.ranges))
+
+    def test_download_manifest_etag(self):
+        self.server.objects['/c/o'] = self.data
+        segments = [self.data[offset:offset + 4096]
+                    for offset in range(0, len(self.data), 4096)]
+        etag = hashlib.md5(''.join(hashlib.md5(segment).hexdigest()
+                                   for segment in segments)).hexdigest()
+        self.server.etags['/c/o'] = '"%s"' % etag
+        path = os.path.join(self.path, 'download')
+        self.client.download_large_object(self.container, 'o', path,
+                                          range_size=4096)
+        self.assertRaises(exceptions.ChecksumMismatch,
+                          self.client.download_large_object,
+                          self.container, 'o', path, range_size=5000)
+
+    def test_download_range_ignored(self):
+        self.server.objects['/c/o'] = self.data
+        self.server.ignore_ranges = True
+        self.assertRaises(exceptions.InvalidRangeResponse,
+                          self.client.download_large_object,
+                          self.container, 'o',
+                          os.path.join(self.path, 'download'),
+                          range_size=4096)
+
+    def test_download_short_range(self):
+        self.server.objects['/c/o'] = self.data
+        self.server.short_ranges = True
+        self.assertRaises(exceptions.InvalidRangeResponse,
+                          self.client.download_large_object,
+                          self.container, 'o',
+                          os.path.join(self.path, 'download'),
+                          range_size=4096)
+
+    def test_download_checksum_mismatch(self):
+        self.server.objects['/c/o'] = self.data
+        self.assertRaises(exceptions.ChecksumMismatch,
+                          self.client.download_large_object,
+                          self.container, 'o',
+                          os.path.join(self.path, 'download'),
+                          checksum='0' * 32)
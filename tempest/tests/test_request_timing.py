@@ -0,0 +1,114 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import os
+
+import fixtures
+
+from tempest.common import request_timing
+from tempest.tests import base
+
+
+def _event(url, total, method='GET'):
+    return request_timing.RequestEvent(
+        start=0, service='compute', method=method, url=url, status=200,
+        request_bytes=0, response_bytes=10, connect=None, first_byte=total,
+        total=total)
+
+
+class TestUrlTemplate(base.TestCase):
+
+    def test_ids_stripped(self):
+        self.assertEqual(
+            '/v2/{id}/servers/{id}/os-volume_attachments/{id}',
+            request_timing.url_template(
+                'http://nova:8774/v2/0a5c4e8f4b2a4c3e9d6c1b7a8e9f0d1c/servers/'
+                '3c8f2d10-5b4e-4d8a-9f3c-1a2b3c4d5e6f/os-volume_attachments/'
+                '42?detail=1'))
+
+    def test_names_kept(self):
+        self.assertEqual('servers/detail',
+                         request_timing.url_template('servers/detail'))
+
+
+class TestEndpointStatistics(base.TestCase):
+
+    def test_report(self):
+        statistics = request_timing.EndpointStatistics()
+        for i in range(1, 21):
+            statistics(_event('servers/{id}', i / 10.0))
+        statistics(_event('servers', 5.0, method='POST'))
+        report = statistics.report()
+        self.assertEqual(['GET', 'POST'],
+                         [entry['method'] for entry in report])
+        entry = report[0]
+        self.assertEqual(20, entry['count'])
+        self.assertAlmostEqual(21.0, entry['total'])
+        self.assertEqual(1.9, entry['p95'])
+        self.assertEqual(200, entry['bytes'])
+
+    def test_dump(self):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'report.json')
+        statistics = request_timing.EndpointStatistics()
+        statistics(_event('servers', 1.0))
+        statistics.dump(path)
+        with open(path) as report_file:
+            self.assertEqual(1, json.load(report_file)[0]['count'])
+
+    def test_failing_listener(self):
+        def fail(event):
+            raise ValueError()
+        events = []
+        request_timing.add_listener(fail)
+        self.addCleanup(request_timing.remove_listener, fail)
+        request_timing.add_listener(events.append)
+        self.addCleanup(request_timing.remove_listener, events.append)
+        request_timing.notify(_event('servers', 1.0))
+        self.assertEqual(1, len(events))
+
+
+class TestEventLog(base.TestCase):
+
+    def setUp(self):
+        super(TestEventLog, self).setUp()
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'events')
+        self.log = request_timing.EventLog(self.path)
+        self.addCleanup(self.log.close)
+        self.useFixture(fixtures.MonkeyPatch(
+            'tempest.common.request_timing._event_log', self.log))
+        self.useFixture(fixtures.MonkeyPatch(
+            'tempest.common.request_timing.current_test', 'a.B.test'))
+
+    def _events(self):
+        with open(self.path) as events:
+            return [json.loads(line) for line in events]
+
+    def test_request(self):
+        self.log(_event('servers/{id}', 0.5))
+        event = self._events()[0]
+        self.assertEqual('request', event['kind'])
+        self.assertEqual('a.B.test', event['test'])
+        self.assertEqual(0.5, event['duration'])
+        self.assertEqual('servers/{id}', event['url'])
+
+    def test_span(self):
+        with request_timing.span('ssh', host='host'):
+            with request_timing.span('ssh', host='nested'):
+                pass
+        events = self._events()
+        self.assertEqual(1, len(events))
+        self.assertEqual('host', events[0]['host'])
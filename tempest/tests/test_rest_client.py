@@ -13,7 +13,9 @@
 #    under the License.
 
 import httplib2
+import mock
 
+from tempest.common import request_timing
 from tempest.common import rest_client
 from tempest import config
 from tempest import exceptions
@@ -90,3 +92,64 @@ class TestRestClientNotFoundHandling(BaseRestClientTestClass):
     def test_post(self):
         self.assertRaises(exceptions.NotFound, self.rest_client.post,
                           'fake_endpoint', {}, {})
+
+
+class TestRestClientRequestTiming(BaseRestClientTestClass):
+    def setUp(self):
+        self.fake_http = fake_http.fake_httplib2(200)
+        super(TestRestClientRequestTiming, self).setUp()
+        self.events = []
+        request_timing.add_listener(self.events.append)
+        self.addCleanup(request_timing.remove_listener, self.events.append)
+
+    def test_request_event(self):
+        self.rest_client.post('servers/9c6a1e5e-3b1c-4f4c-8a37-2e9d46f3f5fa'
+                              '/action', 'body', {})
+        self.assertEqual(1, len(self.events))
+        event = self.events[0]
+        self.assertEqual('POST', event.method)
+        self.assertEqual('servers/{id}/action', event.url)
+        self.assertEqual(200, event.status)
+        self.assertEqual(4, event.request_bytes)
+        self.assertEqual(len('fake_body'), event.response_bytes)
+        self.assertTrue(event.total >= 0)
+
+
+class TestRestClientLogging(BaseRestClientTestClass):
+    def setUp(self):
+        self.fake_http = fake_http.fake_httplib2(200)
+        super(TestRestClientLogging, self).setUp()
+        self.log = mock.Mock()
+        self.useFixture(mockpatch.PatchObject(self.rest_client, 'LOG',
+                                              self.log))
+
+    def test_no_body_formatting_above_debug(self):
+        self.log.isEnabledFor.return_value = False
+        md5 = self.useFixture(mockpatch.Patch('hashlib.md5')).mock
+        self.rest_client._log_request('POST', 'url', {'a': 'b'}, 'x' * 4096)
+        self.assertFalse(self.log.debug.called)
+        self.assertFalse(md5.called)
+
+    def test_body_logged_at_debug(self):
+        self.log.isEnabledFor.return_value = True
+        self.rest_client._log_request('POST', 'url', {'a': 'b'}, 'x' * 4096)
+        self.assertEqual(3, self.log.debug.call_count)
+
+    def test_sampling(self):
+        self.rest_client.log_sample_rate = 3
+        log_request = self.useFixture(mockpatch.PatchObject(
+            self.rest_client, '_log_request')).mock
+        for i in range(6):
+            self.rest_client.get('sampled/%d' % i)
+        self.assertEqual(2, log_request.call_count)
+
+    def test_failed_requests_logged(self):
+        self.rest_client.log_sample_rate = 1000
+        self.stubs.Set(httplib2.Http, 'request',
+                       fake_http.fake_httplib2(404).request)
+        log_request = self.useFixture(mockpatch.PatchObject(
+            self.rest_client, '_log_request')).mock
+        for i in range(2):
+            self.assertRaises(exceptions.NotFound, self.rest_client.get,
+                              'failed/%d' % i)
+        self.assertEqual(2, log_request.call_count)
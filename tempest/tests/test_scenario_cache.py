@@ -0,0 +1,88 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+import fixtures
+import mock
+
+from tempest.common.utils import test_utils
+from tempest.tests import base
+
+SCENARIOS = {'images': [('cirros', {'image_ref': 'i1'})],
+             'flavors': [('m1nano', {'flavor_ref': 'f1'})]}
+
+
+class TestScenarioCache(base.TestCase):
+
+    def setUp(self):
+        super(TestScenarioCache, self).setUp()
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'scenarios')
+        self.cache = test_utils.ScenarioCache(self.path, 60)
+        self.discover = mock.Mock(return_value=SCENARIOS)
+        self.time = self.patch('time.time')
+        self.time.return_value = 1000
+
+    def test_cached(self):
+        self.assertEqual(SCENARIOS, self.cache.load('key', self.discover))
+        self.assertEqual(SCENARIOS, self.cache.load('key', self.discover))
+        self.assertEqual(1, self.discover.call_count)
+        # The entries are keyed by cloud and regexes
+        self.cache.load('other', self.discover)
+        self.assertEqual(2, self.discover.call_count)
+
+    def test_expired(self):
+        self.cache.load('key', self.discover)
+        self.time.return_value = 1061
+        self.cache.load('key', self.discover)
+        self.assertEqual(2, self.discover.call_count)
+
+    def test_refresh(self):
+        self.cache.load('key', self.discover)
+        self.cache.load('key', self.discover, refresh=True)
+        self.assertEqual(2, self.discover.call_count)
+
+    def test_expired_used_when_discovery_fails(self):
+        self.cache.load('key', self.discover)
+        self.time.return_value = 2000
+        self.discover.side_effect = Exception('No cloud')
+        self.assertEqual(SCENARIOS, self.cache.load('key', self.discover))
+        self.assertRaises(Exception, self.cache.load, 'other', self.discover)
+
+    def test_clear(self):
+        self.cache.load('key', self.discover)
+        self.cache.clear()
+        self.assertIsNone(self.cache.read('key'))
+        self.cache.clear()
+
+    def test_file_per_key(self):
+        self.cache.load('key', self.discover)
+        self.cache.load('other', self.discover)
+        self.assertEqual(['key.json', 'other.json'],
+                         sorted(os.listdir(self.path)))
+
+    def test_write_error_logged(self):
+        # The cache directory can not be created under a file
+        open(self.path, 'w').close()
+        log = self.patch('tempest.common.utils.test_utils.LOG')
+        self.assertEqual(SCENARIOS, self.cache.load('key', self.discover))
+        self.assertTrue(log.warning.called)
+        self.assertIsNone(self.cache.read('key'))
+
+    def test_key(self):
+        self.assertEqual(test_utils.ScenarioCache.key('uri', '^cirros'),
+                         test_utils.ScenarioCache.key('uri', '^cirros'))
+        self.assertNotEqual(test_utils.ScenarioCache.key('uri', '^cirros'),
+                            test_utils.ScenarioCache.key('uri', '^ubuntu'))
@@ -200,3 +200,103 @@ class TestSshClient(base.TestCase):
         chan_mock.recv_stderr.assert_called_once_with(1024)
         chan_mock.recv_exit_status.assert_called_once_with()
         closed_prop.assert_called_once_with()
+
+    def _mock_channel(self, chunks, exit_status=0):
+        # chunks is a list of (stdout, stderr) pairs to read
+        self.patch('select.poll').return_value.poll.return_value = [1]
+        chan_mock = mock.MagicMock()
+        chan_mock.recv.side_effect = [c[0] for c in chunks] + ['']
+        chan_mock.recv_stderr.side_effect = [c[1] for c in chunks] + ['']
+        type(chan_mock).closed = mock.PropertyMock(
+            side_effect=[False] * len(chunks) + [True])
+        chan_mock.recv_exit_status.return_value = exit_status
+        return chan_mock
+
+    def test_persistent_connection(self):
+        gsc_mock = self.patch('tempest.common.ssh.Client._get_ssh_connection')
+        chan_mock = self._mock_channel([('out', '')])
+        open_session = gsc_mock.return_value.get_transport.return_value.\
+            open_session
+        open_session.return_value = chan_mock
+
+        client = ssh.Client('localhost', 'root', persistent=True,
+                            buf_size=4096)
+        self.assertEqual('out', client.exec_command('test'))
+        chan_mock.recv.assert_called_with(4096)
+        chan_mock.recv.side_effect = ['again', '']
+        chan_mock.recv_stderr.side_effect = ['', '']
+        type(chan_mock).closed = mock.PropertyMock(side_effect=[False, True])
+        self.assertEqual('again', client.exec_command('test'))
+        # Both commands ran in their own channel of the same connection
+        gsc_mock.assert_called_once_with()
+        self.assertEqual(2, open_session.call_count)
+        self.assertFalse(gsc_mock.return_value.close.called)
+        client.close()
+        gsc_mock.return_value.close.assert_called_once_with()
+
+    def test_persistent_connection_reconnect(self):
+        gsc_mock = self.patch('tempest.common.ssh.Client._get_ssh_connection')
+        chan_mock = self._mock_channel([('out', '')])
+        broken = mock.MagicMock()
+        broken.get_transport.return_value.open_session.side_effect = (
+            EOFError())
+        fresh = mock.MagicMock()
+        fresh.get_transport.return_value.open_session.return_value = chan_mock
+        gsc_mock.side_effect = [broken, fresh]
+
+        client = ssh.Client('localhost', 'root', persistent=True)
+        self.assertEqual('out', client.exec_command('test'))
+        broken.close.assert_called_once_with()
+        self.assertEqual(2, gsc_mock.call_count)
+        self.assertFalse(fresh.close.called)
+
+    def test_persistent_connection_reconnect_once(self):
+        gsc_mock = self.patch('tempest.common.ssh.Client._get_ssh_connection')
+        gsc_mock.return_value.get_transport.return_value.open_session.\
+            side_effect = socket.error()
+
+        client = ssh.Client('localhost', 'root', persistent=True)
+        self.assertRaises(socket.error, client.exec_command, 'test')
+        self.assertEqual(2, gsc_mock.call_count)
+
+    def test_iter_command(self):
+        gsc_mock = self.patch('tempest.common.ssh.Client._get_ssh_connection')
+        chan_mock = self._mock_channel([('a', ''), ('b', 'err')],
+                                       exit_status=1)
+        gsc_mock.return_value.get_transport.return_value.open_session.\
+            return_value = chan_mock
+
+        client = ssh.Client('localhost', 'root')
+        output = client.iter_command('test')
+        self.assertEqual(('stdout', 'a'), next(output))
+        self.assertEqual(('stdout', 'b'), next(output))
+        self.assertEqual(('stderr', 'err'), next(output))
+        exc = self.assertRaises(exceptions.SSHExecCommandFailed, next, output)
+        self.assertIn('err', str(exc))
+        chan_mock.close.assert_called_once_with()
+        gsc_mock.return_value.close.assert_called_once_with()
+
+
+class TestExecCommandOnHosts(base.TestCase):
+
+    def test_exec_command_on_hosts(self):
+        clients = []
+        for host in ('h1', 'h2', 'h3'):
+            client = mock.Mock(host=host)
+            client.exec_command.return_value = host + ' output'
+            clients.append(client)
+        failure = exceptions.SSHTimeout(host='h3', user='root',
+                                        password=None)
+        clients[2].exec_command.side_effect = failure
+        results = ssh.exec_command_on_hosts(clients, 'uptime', max_workers=2)
+        self.assertEqual({'h1': 'h1 output', 'h2': 'h2 output',
+                          'h3': failure}, results)
+        for client in clients:
+            client.exec_command.assert_called_once_with('uptime')
+
+    def test_check_authentication(self):
+        client = mock.Mock(host='h1')
+        self.assertEqual({'h1': None},
+                         ssh.exec_command_on_hosts([client], None))
+        client.test_connection_auth.assert_called_once_with()
+        self.assertFalse(client.exec_command.called)
@@ -0,0 +1,131 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+from tempest.common import teardown
+from tempest.tests import base
+
+
+class TestResourceCleaner(base.TestCase):
+
+    def setUp(self):
+        super(TestResourceCleaner, self).setUp()
+        self.cleaner = teardown.ResourceCleaner(max_workers=4)
+        self.deleted = []
+        self.lock = threading.Lock()
+
+    def _delete(self, name):
+        def delete():
+            with self.lock:
+                self.deleted.append(name)
+        return delete
+
+    def test_dependencies(self):
+        # Added in creation order
+        self.cleaner.add('volume', self._delete('volume'), kind='volume')
+        self.cleaner.add('server', self._delete('server'), kind='server')
+        self.cleaner.add('snapshot', self._delete('snapshot'),
+                         kind='snapshot')
+        self.cleaner.add('fip', self._delete('fip'), kind='floating_ip')
+        self.assertEqual([], self.cleaner.run())
+        self.assertEqual(4, len(self.deleted))
+        order = self.deleted.index
+        self.assertTrue(order('fip') < order('server') < order('volume'))
+        self.assertTrue(order('snapshot') < order('volume'))
+
+    def test_owners_deleted_last(self):
+        self.cleaner.add('tenant', self._delete('tenant'), kind='tenant')
+        self.cleaner.add('user', self._delete('user'), kind='user')
+        self.cleaner.add('server', self._delete('server'), kind='server')
+        self.cleaner.add('keypair', self._delete('keypair'), kind='keypair')
+        self.assertEqual([], self.cleaner.run())
+        self.assertEqual(['user', 'tenant'], self.deleted[2:])
+
+    def test_unknown_kind_keeps_order(self):
+        for name in ('first', 'second', 'third'):
+            self.cleaner.add(name, self._delete(name))
+        self.cleaner.run()
+        self.assertEqual(['third', 'second', 'first'], self.deleted)
+
+    def test_independent_deletions_run_in_parallel(self):
+        barrier = threading.Semaphore(0)
+
+        def delete():
+            # Only completes if the other deletion runs at the same time
+            barrier.release()
+            self.assertTrue(self._acquire(barrier))
+
+        self.cleaner.add('a', delete, kind='image')
+        self.cleaner.add('b', delete, kind='image')
+        self.assertEqual([], self.cleaner.run())
+
+    def _acquire(self, semaphore):
+        for _ in range(100):
+            if semaphore.acquire(False):
+                return True
+            threading.Event().wait(0.01)
+        return False
+
+    def test_errors(self):
+        def fail():
+            raise ValueError()
+
+        self.cleaner.add('network', self._delete('network'), kind='network')
+        self.cleaner.add('port', fail, kind='port')
+        errors = self.cleaner.run()
+        self.assertEqual(1, len(errors))
+        self.assertEqual('port', errors[0][0])
+        self.assertIs(ValueError, errors[0][1][0])
+        # Resources depending on a failed deletion are still attempted
+        self.assertEqual(['network'], self.deleted)
+        self.assertEqual(0, len(self.cleaner))
+
+
+class FakeClient(object):
+
+    def __init__(self):
+        self.http_obj = object()
+
+    def _get_http(self):
+        return object()
+
+    def delete_thing(self, thing_id):
+        return thing_id, self.http_obj
+
+
+class TestThreadClient(base.TestCase):
+
+    def test_transport_per_thread(self):
+        client = FakeClient()
+        results = []
+        call = teardown.client_call(client, 'delete_thing', 'id')
+
+        def worker():
+            results.append(call())
+            results.append(call())
+
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(['id'] * 4, [thing_id for thing_id, _ in results])
+        transports = [http_obj for _, http_obj in results]
+        # The same in a thread, different between threads and from the
+        # transport of the client
+        self.assertIs(transports[0], transports[1])
+        self.assertIs(transports[2], transports[3])
+        self.assertIsNot(transports[0], transports[2])
+        self.assertNotIn(client.http_obj, transports)
@@ -0,0 +1,101 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import cStringIO
+import datetime
+import imp
+import json
+import os
+
+import fixtures
+import subunit
+from subunit import iso8601
+
+from tempest.tests import base
+
+timing_report = imp.load_source(
+    'timing_report', os.path.join(os.path.dirname(__file__), '..', '..',
+                                  'tools', 'timing_report.py'))
+
+
+def _write_stream(path, durations):
+    start = datetime.datetime(2014, 1, 1, tzinfo=iso8601.Utc())
+    with open(path, 'wb') as stream:
+        result = subunit.StreamResultToBytes(stream)
+        for test_id, duration in durations:
+            result.status(test_id=test_id, test_status='inprogress',
+                          timestamp=start)
+            start += datetime.timedelta(seconds=duration)
+            result.status(test_id=test_id, test_status='success',
+                          timestamp=start)
+
+
+def _write_events(path, events):
+    with open(path, 'w') as events_file:
+        for test, kind, duration in events:
+            event = {'test': test, 'kind': kind, 'duration': duration,
+                     'start': 0}
+            if kind == 'request':
+                event.update(service='compute', method='GET',
+                             url='servers/{id}')
+            events_file.write(json.dumps(event) + '\n')
+
+
+class TestTimingReport(base.TestCase):
+
+    def setUp(self):
+        super(TestTimingReport, self).setUp()
+        self.path = self.useFixture(fixtures.TempDir()).path
+
+    def _run(self, name, durations, events):
+        stream = os.path.join(self.path, name + '.subunit')
+        events_path = os.path.join(self.path, name + '.events')
+        _write_stream(stream, durations)
+        _write_events(events_path, events)
+        return timing_report.load_run(stream, events_path)
+
+    def test_report(self):
+        run = self._run('run',
+                        [('a.B.test_1[gate]', 10), ('a.B.test_2', 2)],
+                        [('a.B.test_1', 'request', 3),
+                         ('a.B.test_1', 'sleep', 5),
+                         ('a.B.test_2', 'ssh', 1),
+                         ('a.B', 'request', 4)])
+        self.assertEqual({'a.B.test_1': 10, 'a.B.test_2': 2}, run.durations)
+        breakdown = run.breakdown()
+        self.assertEqual(3, breakdown['request'])
+        self.assertEqual(5, breakdown['sleep'])
+        self.assertEqual(1, breakdown['ssh'])
+        self.assertEqual(3, breakdown['other'])
+        self.assertEqual(['a.B'], run.fixtures())
+        out = cStringIO.StringIO()
+        timing_report.report(run, 10, out)
+        self.assertIn('2 tests, 12.0s', out.getvalue())
+
+    def test_attributed_events(self):
+        run = self._run('run', [('a.B.test_1[gate,smoke]', 10)],
+                        [('a.B.test_1[gate,smoke]', 'request', 3)])
+        self.assertEqual({'a.B.test_1': 10}, run.durations)
+        self.assertEqual(3, run.breakdown()['request'])
+        self.assertEqual([], run.fixtures())
+
+    def test_compare(self):
+        baseline = self._run('baseline', [('a.B.test_1', 2)],
+                             [('a.B.test_1', 'request', 0.1)])
+        run = self._run('run', [('a.B.test_1', 10)],
+                        [('a.B.test_1', 'request', 1)])
+        out = cStringIO.StringIO()
+        timing_report.compare(run, baseline, 1.2, 1.0, 10, out)
+        self.assertIn('+8.0s', out.getvalue())
+        self.assertIn('compute GET servers/{id}', out.getvalue())
@@ -0,0 +1,95 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from tempest.common import waiters
+from tempest import exceptions
+from tempest.tests import base
+
+
+class TestWaitForResourcesStatus(base.TestCase):
+
+    def setUp(self):
+        super(TestWaitForResourcesStatus, self).setUp()
+        self.now = [0]
+        self.patch('time.time', side_effect=lambda: self.now[0])
+        self.sleep = self.patch('time.sleep', side_effect=self._sleep)
+
+    def _sleep(self, seconds):
+        self.now[0] += seconds
+
+    def test_all_active(self):
+        listings = [
+            [{'id': 'a', 'status': 'BUILD'}, {'id': 'b', 'status': 'BUILD'}],
+            [{'id': 'a', 'status': 'ACTIVE'}, {'id': 'b', 'status': 'BUILD'}],
+            [{'id': 'a', 'status': 'ACTIVE'}, {'id': 'b', 'status': 'ACTIVE'}],
+        ]
+        list_resources = mock.Mock(side_effect=listings)
+        transitions = waiters.wait_for_resources_status(
+            list_resources, ['a', 'b'], 'ACTIVE', 1, 60)
+        self.assertEqual(3, list_resources.call_count)
+        self.assertEqual([('BUILD', 0), ('ACTIVE', 1)], transitions['a'])
+        self.assertEqual([('BUILD', 0), ('ACTIVE', 2)], transitions['b'])
+
+    def test_backoff(self):
+        building = [mock.Mock(id='a', status='BUILD')]
+        list_resources = mock.Mock(
+            side_effect=[building] * 4 + [[]])
+        waiters.wait_for_resources_status(
+            list_resources, ['a'], 'DELETED', 1, 60, max_interval=4)
+        self.assertEqual([mock.call(1), mock.call(2), mock.call(4),
+                          mock.call(4)], self.sleep.call_args_list)
+
+    def test_missing_confirmed_with_get(self):
+        # 'b' is on another page of the listing, 'a' was deleted
+        list_resources = mock.Mock(return_value=[])
+        resources = {'b': {'id': 'b', 'status': 'ACTIVE'}}
+
+        def get_resource(resource_id):
+            if resource_id not in resources:
+                raise exceptions.NotFound()
+            return resources[resource_id]
+
+        transitions = waiters.wait_for_resources_status(
+            list_resources, ['b'], 'ACTIVE', 1, 10,
+            get_resource=get_resource)
+        self.assertEqual([('ACTIVE', 0)], transitions['b'])
+        transitions = waiters.wait_for_resources_status(
+            list_resources, ['a'], 'DELETED', 1, 10,
+            get_resource=get_resource)
+        self.assertEqual([('DELETED', 0)], transitions['a'])
+
+    def test_error(self):
+        list_resources = mock.Mock(return_value=[{'id': 'a',
+                                                  'status': 'error'}])
+        self.assertRaises(exceptions.ResourceErrorException,
+                          waiters.wait_for_resources_status,
+                          list_resources, ['a'], 'available', 1, 60)
+
+    def test_timeout(self):
+        list_resources = mock.Mock(return_value=[{'id': 'a',
+                                                  'status': 'BUILD'}])
+        self.assertRaises(exceptions.TimeoutException,
+                          waiters.wait_for_resources_status,
+                          list_resources, ['a'], 'ACTIVE', 1, 10)
+        self.assertEqual(10, self.now[0])
+
+    def test_get_resource_errors_escape(self):
+        list_resources = mock.Mock(return_value=[])
+        get_resource = mock.Mock(side_effect=exceptions.Unauthorized())
+        self.assertRaises(exceptions.Unauthorized,
+                          waiters.wait_for_resources_status,
+                          list_resources, ['a'], 'DELETED', 1, 10,
+                          get_resource=get_resource)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Manage the pool of pre-provisioned isolated credentials.
+
+The pool is stored in the directory set by credential_pool_path in the
+[identity] section of tempest.conf. Test classes using tenant isolation
+lease credential sets from it instead of creating new tenants and users.
+"""
+
+import argparse
+import sys
+
+from tempest.common import isolated_creds
+from tempest import config
+
+CONF = config.CONF
+
+
+def create(ns):
+    pool = isolated_creds.CredentialPool(ns.path)
+    network_resources = None
+    if ns.no_network:
+        network_resources = {'network': False, 'router': False,
+                             'subnet': False, 'dhcp': False}
+    cred_sets = pool.provision(ns.number, network_resources)
+    print("%d credential sets in %s" % (len(cred_sets), pool.pool_file))
+
+
+def delete(ns):
+    pool = isolated_creds.CredentialPool(ns.path)
+    if not pool.exists():
+        print("No credential pool in %s" % pool.path)
+        return 1
+    pool.destroy()
+    print("Deleted the credential pool in %s" % pool.path)
+
+
+def list_sets(ns):
+    pool = isolated_creds.CredentialPool(ns.path)
+    for index, cred_set in enumerate(pool.load()):
+        users = ', '.join('%s: %s' % (cred_type, user['name'])
+                          for cred_type, (user, _) in
+                          sorted(cred_set['creds'].items()))
+        print("%d: %s" % (index, users))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description='Manage the isolated credential pool')
+    parser.add_argument('-p', '--path',
+                        default=CONF.identity.credential_pool_path,
+                        help="Pool directory (default: credential_pool_path "
+                             "from tempest.conf)")
+    subparsers = parser.add_subparsers()
+    create_parser = subparsers.add_parser(
+        'create', help="Add credential sets to the pool")
+    create_parser.add_argument('-n', '--number', type=int,
+                               default=CONF.identity.credential_pool_size,
+                               help="Number of credential sets to create")
+    create_parser.add_argument('--no-network', action='store_true',
+                               help="Do not create network resources, for "
+                                    "test classes which do not need them")
+    create_parser.set_defaults(func=create)
+    delete_parser = subparsers.add_parser(
+        'delete', help="Delete all the pooled credentials")
+    delete_parser.set_defaults(func=delete)
+    list_parser = subparsers.add_parser(
+        'list', help="List the pooled credential sets")
+    list_parser.set_defaults(func=list_sets)
+    ns = parser.parse_args(argv)
+    if not ns.path:
+        parser.error("No pool directory, set credential_pool_path in "
+                     "tempest.conf or use --path")
+    return ns.func(ns)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Manage the cache of the input scenarios.
+
+The cache is the directory set by cache_dir in the [input-scenario] section
+of tempest.conf. It holds the images and flavors matching the regexes of that
+section, which the input scenario tests are generated from, so that they
+can be discovered without reaching the cloud. Refresh it before a run
+whenever the images or flavors of the cloud have changed.
+"""
+
+import argparse
+import sys
+
+from tempest.common.utils import test_utils
+from tempest import config
+
+CONF = config.CONF
+
+
+def refresh(utils):
+    utils.load(refresh=True)
+    print("%d images and %d flavors cached in %s" %
+          (len(utils.scenario_images), len(utils.scenario_flavors),
+           utils.cache.path))
+
+
+def show(utils):
+    entry = utils.cache.read(utils.cache_key)
+    if not entry:
+        print("No input scenarios cached for this cloud in %s" %
+              utils.cache.path)
+        return 1
+    for kind in ('images', 'flavors'):
+        print("%s:" % kind)
+        for name, parameters in entry[kind]:
+            print("  %s %s" % (name, parameters.values()[0]))
+
+
+def clear(utils):
+    utils.cache.clear()
+    print("Deleted the scenarios cached in %s" % utils.cache.path)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description='Manage the cache of the input scenarios')
+    parser.add_argument('-p', '--path',
+                        default=CONF.input_scenario.cache_dir,
+                        help="Cache directory (default: cache_dir from the "
+                             "input-scenario section of tempest.conf)")
+    subparsers = parser.add_subparsers()
+    subparsers.add_parser(
+        'refresh', help="List the images and flavors and cache them"
+    ).set_defaults(func=refresh)
+    subparsers.add_parser(
+        'show', help="Show the cached images and flavors"
+    ).set_defaults(func=show)
+    subparsers.add_parser(
+        'clear', help="Delete the cache"
+    ).set_defaults(func=clear)
+    ns = parser.parse_args(argv)
+    if not ns.path:
+        parser.error("No cache directory, set cache_dir in the "
+                     "input-scenario section of tempest.conf or use --path")
+    utils = test_utils.InputScenarioUtils()
+    utils.cache = test_utils.ScenarioCache(ns.path,
+                                           CONF.input_scenario.cache_ttl)
+    return ns.func(utils)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Reports where the wall-clock time of a tempest run goes.
+
+It joins the durations of the tests, from a subunit stream (e.g. testr last
+--subunit), with the events written to the file of the request_timing_log
+option of the debug group: the REST requests, the sleeps of the polling
+loops and the SSH commands of each test. The events of a test class outside
+of its tests are those of its setUpClass and tearDownClass.
+
+Given the stream and events of a previous run, it also lists the tests and
+API endpoints which got slower.
+"""
+
+import argparse
+import collections
+import json
+import re
+import sys
+
+import subunit
+import testtools
+
+KINDS = ('request', 'sleep', 'ssh')
+KIND_NAMES = {'request': 'API latency', 'sleep': 'polling sleeps',
+              'ssh': 'SSH'}
+
+# Attributes of the test ids in the subunit streams, like [gate,smoke]
+ATTRIBUTES_REGEX = re.compile(r'\[.*\]$')
+
+
+def _test_id(test_id):
+    return ATTRIBUTES_REGEX.sub('', test_id)
+
+
+def read_subunit(stream):
+    """
+    Returns a dict of the duration in seconds of each test of a subunit
+    stream, version 1 or 2, by test id.
+    """
+    durations = {}
+
+    def on_test(test):
+        start, end = test['timestamps']
+        if start is None or end is None:
+            return
+        durations[_test_id(test['id'])] = (end - start).total_seconds()
+
+    result = testtools.StreamToDict(on_test)
+    result.startTestRun()
+    # The packets of the version 2 start with a signature byte
+    version_2 = stream.read(1) == '\xb3'
+    stream.seek(0)
+    if version_2:
+        source = subunit.ByteStreamToStreamResult(
+            stream, non_subunit_name='stdout')
+        source.run(result)
+    else:
+        case = subunit.ProtocolTestCase(stream)
+        case.run(testtools.ExtendedToStreamDecorator(result))
+    result.stopTestRun()
+    return durations
+
+
+class Run(object):
+    """Durations of the tests of a run, and their timing events."""
+
+    def __init__(self, durations):
+        self.durations = durations
+        # Seconds and number of events by test or class, then by kind
+        self.times = collections.defaultdict(
+            lambda: collections.defaultdict(float))
+        self.counts = collections.defaultdict(
+            lambda: collections.defaultdict(int))
+        self.endpoints = collections.defaultdict(list)
+
+    def read_events(self, lines):
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                # The last line of an interrupted run may be partial
+                continue
+            kind = event['kind']
+            # BaseTestCase.id() carries the attributes, like the stream
+            test = _test_id(event.get('test') or 'unknown')
+            self.times[test][kind] += event['duration']
+            self.counts[test][kind] += 1
+            if kind == 'request':
+                key = (event['service'], event['method'], event['url'])
+                self.endpoints[key].append(event['duration'])
+
+    def fixtures(self):
+        """Returns the ids of the classes and modules with events."""
+        return [test for test in self.times if test not in self.durations]
+
+    def breakdown(self):
+        """Returns the seconds of each kind, and the rest, in the tests."""
+        totals = collections.OrderedDict((kind, 0.0) for kind in KINDS)
+        for test in self.durations:
+            times = self.times.get(test, {})
+            for kind in KINDS:
+                totals[kind] += times.get(kind, 0.0)
+        totals['other'] = sum(self.durations.values()) - sum(totals.values())
+        return totals
+
+    def endpoint_stats(self):
+        """Returns a dict of (count, total, p95) by endpoint."""
+        stats = {}
+        for key, durations in self.endpoints.items():
+            durations.sort()
+            p95 = durations[max(0, int(round(len(durations) * 0.95)) - 1)]
+            stats[key] = (len(durations), sum(durations), p95)
+        return stats
+
+
+def _percent(part, total):
+    return 100.0 * part / total if total else 0.0
+
+
+def report(run, top, out):
+    total = sum(run.durations.values())
+    out.write("%d tests, %.1fs\n" % (len(run.durations), total))
+    for kind, seconds in run.breakdown().items():
+        out.write("  %-16s %10.1fs %5.1f%%\n" %
+                  (KIND_NAMES.get(kind, kind), seconds,
+                   _percent(seconds, total)))
+    fixtures = run.fixtures()
+    fixture_time = sum(sum(run.times[test].values()) for test in fixtures)
+    out.write("  %-16s %10.1fs (outside of the test durations)\n" %
+              ('setup/teardown', fixture_time))
+
+    out.write("\nSlowest tests:\n")
+    out.write("%9s %9s %9s %9s %8s  %s\n" %
+              ('total', 'api', 'sleep', 'ssh', 'requests', 'test'))
+    for test, duration in sorted(run.durations.items(),
+                                 key=lambda item: item[1],
+                                 reverse=True)[:top]:
+        times = run.times.get(test, {})
+        out.write("%8.1fs %8.1fs %8.1fs %8.1fs %8d  %s\n" %
+                  (duration, times.get('request', 0), times.get('sleep', 0),
+                   times.get('ssh', 0),
+                   run.counts.get(test, {}).get('request', 0), test))
+
+    out.write("\nSlowest class setups and teardowns:\n")
+    for test in sorted(fixtures,
+                       key=lambda test: sum(run.times[test].values()),
+                       reverse=True)[:top]:
+        times = run.times[test]
+        out.write("%8.1fs %8.1fs %8.1fs %8.1fs %8d  %s\n" %
+                  (sum(times.values()), times.get('request', 0),
+                   times.get('sleep', 0), times.get('ssh', 0),
+                   run.counts[test].get('request', 0), test))
+
+    out.write("\nSlowest API endpoints:\n")
+    out.write("%9s %8s %9s  %s\n" % ('total', 'count', 'p95', 'endpoint'))
+    endpoints = run.endpoint_stats()
+    for key, (count, seconds, p95) in sorted(
+            endpoints.items(), key=lambda item: item[1][1],
+            reverse=True)[:top]:
+        out.write("%8.1fs %8d %8.3fs  %s %s %s\n" %
+                  ((seconds, count, p95) + key))
+
+
+def compare(run, baseline, threshold, min_delta, top, out):
+    """Writes the tests and endpoints slower than in the baseline run."""
+    regressions = []
+    for test, duration in run.durations.items():
+        before = baseline.durations.get(test)
+        if before is None:
+            continue
+        if duration - before >= min_delta and \
+                duration >= before * threshold:
+            regressions.append((duration - before, before, duration, test))
+    out.write("\nTests slower than in the baseline:\n")
+    for delta, before, after, test in sorted(regressions,
+                                             reverse=True)[:top]:
+        out.write("%+8.1fs %8.1fs -> %8.1fs  %s\n" %
+                  (delta, before, after, test))
+
+    regressions = []
+    before_stats = baseline.endpoint_stats()
+    for key, (count, seconds, p95) in run.endpoint_stats().items():
+        if key not in before_stats:
+            continue
+        before_p95 = before_stats[key][2]
+        if p95 >= before_p95 * threshold and p95 - before_p95 >= 0.01:
+            regressions.append((p95 - before_p95, before_p95, p95, key))
+    out.write("\nAPI endpoints slower (p95) than in the baseline:\n")
+    for delta, before, after, key in sorted(regressions,
+                                            reverse=True)[:top]:
+        out.write("%+8.3fs %8.3fs -> %8.3fs  %s %s %s\n" %
+                  ((delta, before, after) + key))
+
+
+def load_run(subunit_path, events_path):
+    with open(subunit_path, 'rb') as stream:
+        run = Run(read_subunit(stream))
+    if events_path:
+        with open(events_path) as events:
+            run.read_events(events)
+    return run
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Reports where the time of a tempest run goes")
+    parser.add_argument('subunit', help="Subunit stream of the run")
+    parser.add_argument('events', nargs='?',
+                        help="File of the request_timing_log option")
+    parser.add_argument('--baseline', metavar='SUBUNIT',
+                        help="Subunit stream of a run to compare with")
+    parser.add_argument('--baseline-events', metavar='EVENTS',
+                        help="Timing events of the run to compare with")
+    parser.add_argument('--top', type=int, default=20,
+                        help="Number of entries of each ranking")
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help="Ratio from which a test or endpoint is slower")
+    parser.add_argument('--min-delta', type=float, default=1.0,
+                        help="Seconds from which a test is slower")
+    ns = parser.parse_args(argv)
+    run = load_run(ns.subunit, ns.events)
+    report(run, ns.top, sys.stdout)
+    if ns.baseline:
+        baseline = load_run(ns.baseline, ns.baseline_events)
+        compare(run, baseline, ns.threshold, ns.min_delta, ns.top,
+                sys.stdout)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())